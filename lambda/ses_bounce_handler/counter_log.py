@@ -0,0 +1,175 @@
+"""
+Write-behind log of bounce and complaint counter increments.
+
+Incrementing bounce_count in Airtable means reading the current value and
+writing it back, which costs a lookup and a PATCH per event and lets
+concurrent invocations overwrite each other's increments. Instead the
+handler appends each invocation's increments to this log as one batch, and
+handler.flush_counters folds all pending batches into Airtable at once from
+a single scheduled invocation.
+
+Batches are JSON lists of per-address entries:
+    email: The bounced/complained address
+    bounces: Number of bounces
+    last_bounce: [timestamp, bounce type] of the latest bounce, or null
+    permanent: Whether any of the bounces was permanent
+    complaints: Number of complaints
+    last_complaint: Timestamp of the latest complaint, or null
+
+A flush that fails after some of its PATCHes succeeded saves its progress:
+the ids of the batches it flushed and of the records it already wrote. The
+next flush retries exactly those batches and skips those records, so no
+record is incremented twice.
+
+Logs:
+    S3CounterLog: one object per batch in S3; the batch id is the Lambda
+        request id, so a retried invocation overwrites its own batch
+        instead of counting twice
+    LocalCounterLog: in-memory stand-in for tests and local runs
+"""
+import json
+import threading
+
+# DeleteObjects limit
+S3_MAX_DELETE = 1000
+
+# Batch id the flush progress is stored under; never a Lambda request id
+PROGRESS_ID = '_progress'
+
+
+class LocalCounterLog:
+    """In-memory counter log; batches live as long as the process."""
+
+    def __init__(self):
+        self._batches = {}
+        self._progress = None
+        self._lock = threading.Lock()
+
+    def append(self, batch_id: str, entries: list[dict]):
+        """Store a batch of entries (copied, as S3 would serialize them)."""
+        with self._lock:
+            self._batches[batch_id] = json.loads(json.dumps(entries))
+
+    def pending(self, max_batches: int) -> list[tuple[str, list[dict]]]:
+        """Return up to max_batches (batch id, entries) pairs, oldest first."""
+        with self._lock:
+            return list(self._batches.items())[:max_batches]
+
+    def read(self, batch_ids: list[str]) -> list[tuple[str, list[dict]]]:
+        """Return the (batch id, entries) pairs of the given batches that still exist."""
+        with self._lock:
+            return [(batch_id, self._batches[batch_id]) for batch_id in batch_ids if batch_id in self._batches]
+
+    def remove(self, batch_ids: list[str]):
+        """Drop flushed batches."""
+        with self._lock:
+            for batch_id in batch_ids:
+                self._batches.pop(batch_id, None)
+
+    def progress(self) -> dict | None:
+        """Return the saved flush progress, {'batches': [...], 'written': [...]}, or None."""
+        with self._lock:
+            return self._progress
+
+    def save_progress(self, batch_ids: list[str], written):
+        """Save the batches a failed flush read and the record ids it already wrote."""
+        with self._lock:
+            self._progress = {'batches': list(batch_ids), 'written': sorted(written)}
+
+    def clear_progress(self):
+        """Drop the saved flush progress."""
+        with self._lock:
+            self._progress = None
+
+
+class S3CounterLog:
+    """
+    Counter log stored as JSON objects at <prefix><batch id>.json in S3.
+    Pending batches are listed in key order; batches the flush removed are
+    deleted with DeleteObjects. The flush progress is <prefix>_progress.json.
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def key(self, batch_id: str) -> str:
+        """S3 key of a batch."""
+        return f"{self.prefix}{batch_id}.json"
+
+    def append(self, batch_id: str, entries: list[dict]):
+        """Write a batch of entries."""
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self.key(batch_id),
+            Body=json.dumps(entries, separators=(',', ':')).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+    def get(self, batch_id: str):
+        """Read one batch, or None if it does not exist."""
+        try:
+            body = self.s3_client.get_object(Bucket=self.bucket, Key=self.key(batch_id))['Body'].read()
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return json.loads(body)
+
+    def pending(self, max_batches: int) -> list[tuple[str, list[dict]]]:
+        """Read up to max_batches (batch id, entries) pairs."""
+        keys = []
+        kwargs = {'Bucket': self.bucket, 'Prefix': self.prefix}
+        while len(keys) < max_batches:
+            response = self.s3_client.list_objects_v2(**kwargs)
+            keys.extend(item['Key'] for item in response.get('Contents', []) if item['Key'] != self.key(PROGRESS_ID))
+            if not response.get('IsTruncated'):
+                break
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+        batches = []
+        for key in keys[:max_batches]:
+            body = self.s3_client.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+            batches.append((key[len(self.prefix):].removesuffix('.json'), json.loads(body)))
+        return batches
+
+    def read(self, batch_ids: list[str]) -> list[tuple[str, list[dict]]]:
+        """Read the given batches, skipping those that no longer exist."""
+        batches = []
+        for batch_id in batch_ids:
+            entries = self.get(batch_id)
+            if entries is not None:
+                batches.append((batch_id, entries))
+        return batches
+
+    def remove(self, batch_ids: list[str]):
+        """
+        Delete flushed batches.
+
+        Raises:
+            RuntimeError: If S3 could not delete any of them
+        """
+        for start in range(0, len(batch_ids), S3_MAX_DELETE):
+            objects = [{'Key': self.key(batch_id)} for batch_id in batch_ids[start:start + S3_MAX_DELETE]]
+            response = self.s3_client.delete_objects(Bucket=self.bucket, Delete={'Objects': objects, 'Quiet': True})
+            if response.get('Errors'):
+                codes = sorted({error.get('Code') for error in response['Errors']})
+                raise RuntimeError(f"S3 failed to delete {len(response['Errors'])} counter batches: {', '.join(codes)}")
+
+    def progress(self) -> dict | None:
+        """Read the saved flush progress, {'batches': [...], 'written': [...]}, or None."""
+        return self.get(PROGRESS_ID)
+
+    def save_progress(self, batch_ids: list[str], written):
+        """Save the batches a failed flush read and the record ids it already wrote."""
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self.key(PROGRESS_ID),
+            Body=json.dumps({'batches': list(batch_ids), 'written': sorted(written)}).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+    def clear_progress(self):
+        """Delete the saved flush progress."""
+        self.s3_client.delete_object(Bucket=self.bucket, Key=self.key(PROGRESS_ID))
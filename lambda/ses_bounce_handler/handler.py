@@ -1,18 +1,42 @@
-import boto3
 import os
+import itertools
 import json
-import urllib.request
-import urllib.error
-import urllib.parse
-import sentry_sdk
-from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import airtable_client
+import counter_log
+import log
+import s3_conditional
+import suppression
+import telemetry
+from lazy_module import LazyModule
+
+# boto3 and sentry_sdk are imported on first use so notifications that never
+# touch Secrets Manager or Sentry don't pay for them at cold start
+sentry_sdk = LazyModule('sentry_sdk')
 
 # Cache for secrets and config
 _secrets_cache = None
 _config_cache = None
 
-# AWS clients (initialized lazily)
+# AWS clients (initialized lazily, or prefetched during Lambda init by bootstrap())
 _secrets_client = None
+_s3_client = None
+
+# Write-behind counter log (see get_counter_log)
+_counter_log = None
+
+# Whether the runtime's boto3 can publish the suppression set (see suppression_writable)
+_suppression_writable = None
+
+# Normalized email address -> Airtable record ids (see get_record_ids)
+_record_ids = {}
+_record_ids_seeded_at = 0.0  # monotonic time of the last bulk seed
+
+_secrets_loaded_at = 0.0  # monotonic time the secret was last fetched
+_sentry_initialized = False
 
 
 def get_config():
@@ -21,7 +45,18 @@ def get_config():
     if _config_cache is None:
         _config_cache = {
             'airtable_secret_name': os.environ.get('AIRTABLE_SECRET_NAME', ''),
-            'environment': os.environ.get('ENVIRONMENT', 'production')
+            'environment': os.environ.get('ENVIRONMENT', 'production'),
+            'secret_ttl_seconds': int(os.environ.get('SECRET_TTL_SECONDS', '3600')),
+            'counter_log': os.environ.get('COUNTER_LOG', 'off').strip().lower(),
+            'counter_log_bucket': os.environ.get('COUNTER_LOG_BUCKET', ''),
+            'counter_log_prefix': os.environ.get('COUNTER_LOG_PREFIX', 'bounce-counters/'),
+            'counter_flush_max_batches': int(os.environ.get('COUNTER_FLUSH_MAX_BATCHES', '1000')),
+            'record_cache_seed_seconds': int(os.environ.get('RECORD_CACHE_SEED_SECONDS', '0')),
+            'record_cache_seed_max_pages': int(os.environ.get('RECORD_CACHE_SEED_MAX_PAGES', '10')),
+            'suppression_set': os.environ.get('SUPPRESSION_SET', 'off').strip().lower(),
+            'suppression_bucket': os.environ.get('SUPPRESSION_BUCKET', ''),
+            'suppression_key': os.environ.get('SUPPRESSION_KEY', 'suppression/addresses.json.gz'),
+            'suppression_republish_seconds': int(os.environ.get('SUPPRESSION_REPUBLISH_SECONDS', '86400'))
         }
     return _config_cache
 
@@ -30,141 +65,330 @@ def get_secrets_client():
     """Get Secrets Manager client with lazy initialization."""
     global _secrets_client
     if _secrets_client is None:
-        _secrets_client = boto3.client('secretsmanager', region_name='us-east-2')
+        import boto3
+        # A session per client: bootstrap() creates clients from several threads
+        _secrets_client = boto3.session.Session().client('secretsmanager', region_name='us-east-2')
     return _secrets_client
 
 
+def get_s3_client():
+    """Get S3 client with lazy initialization."""
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.session.Session().client('s3')
+    return _s3_client
+
+
+def get_counter_log():
+    """
+    Get the write-behind counter log selected by COUNTER_LOG: 's3' (batches
+    in COUNTER_LOG_BUCKET), 'local' (in-memory stand-in) or 'off' to write
+    counters to Airtable directly.
+
+    Returns:
+        counter_log.S3CounterLog, counter_log.LocalCounterLog or None when disabled
+    """
+    global _counter_log
+    if _counter_log is None:
+        config = get_config()
+        mode = config['counter_log']
+        if mode == 's3':
+            _counter_log = counter_log.S3CounterLog(get_s3_client(), config['counter_log_bucket'],
+                                                    config['counter_log_prefix'])
+        elif mode == 'local':
+            _counter_log = counter_log.LocalCounterLog()
+        elif mode != 'off':
+            raise ValueError(f"Unknown COUNTER_LOG: {mode}")
+    return _counter_log
+
+
+def suppression_enabled():
+    """Whether the suppression set is published (SUPPRESSION_SET: 's3' or 'off')."""
+    mode = get_config()['suppression_set']
+    if mode not in ('s3', 'off'):
+        raise ValueError(f"Unknown SUPPRESSION_SET: {mode}")
+    return mode == 's3'
+
+
+def suppression_writable():
+    """
+    Check, once per container, that the runtime's boto3 can send the
+    conditional puts the suppression set is published with. If it cannot,
+    the error is reported once and the set is left alone: the alias Status
+    in Airtable still applies.
+    """
+    global _suppression_writable
+    if _suppression_writable is None:
+        try:
+            s3_conditional.require_put_parameters(get_s3_client(), 'IfMatch', 'IfNoneMatch')
+            _suppression_writable = True
+        except RuntimeError as e:
+            log.error('Suppression set disabled', error=str(e))
+            sentry_sdk.capture_exception(e)
+            _suppression_writable = False
+    return _suppression_writable
+
+
+def secrets_expired():
+    """Check whether the cached secret is missing or older than SECRET_TTL_SECONDS."""
+    if _secrets_cache is None:
+        return True
+    return time.monotonic() - _secrets_loaded_at >= get_config()['secret_ttl_seconds']
+
+
 def get_airtable_credentials():
     """
     Fetch Airtable credentials from Secrets Manager with caching.
+    The secret is re-fetched once it is older than SECRET_TTL_SECONDS; if a
+    refresh fails the previous value keeps being used.
 
     Returns:
         dict: Contains airtable_api_key, airtable_base_id, airtable_table_name, sentry_dsn
     """
-    global _secrets_cache
-    if _secrets_cache is None:
+    global _secrets_cache, _secrets_loaded_at
+    if secrets_expired():
         config = get_config()
         secret_name = config['airtable_secret_name']
         try:
             secrets_client = get_secrets_client()
             response = secrets_client.get_secret_value(SecretId=secret_name)
             _secrets_cache = json.loads(response['SecretString'])
-            print(f"Successfully retrieved secrets from {secret_name}")
+            _secrets_loaded_at = time.monotonic()
+            log.info('Retrieved secrets', secret=secret_name)
         except Exception as e:
-            print(f"Error retrieving secrets from {secret_name}: {str(e)}")
-            raise
+            log.error('Error retrieving secrets', secret=secret_name, error=str(e))
+            if _secrets_cache is None:
+                raise
+            sentry_sdk.capture_exception(e)
+            # Retry on the next TTL window rather than on every call
+            _secrets_loaded_at = time.monotonic()
     return _secrets_cache
 
 
+def get_airtable_client():
+    """
+    Get a client for the alias table. Connections are pooled per container
+    by the shared airtable_client layer, so this is cheap to call.
+    """
+    credentials = get_airtable_credentials()
+    return airtable_client.AirtableClient(
+        credentials['airtable_api_key'],
+        credentials['airtable_base_id'],
+        credentials['airtable_table_name']
+    )
+
+
 def init_sentry():
-    """Initialize Sentry with DSN from Secrets Manager."""
+    """Initialize Sentry with DSN from Secrets Manager, once per container."""
+    global _sentry_initialized
+    if _sentry_initialized:
+        return
+
     try:
         config = get_config()
         credentials = get_airtable_credentials()
         sentry_dsn = credentials.get('sentry_dsn')
         if sentry_dsn:
+            from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
             sentry_sdk.init(
                 dsn=sentry_dsn,
                 integrations=[AwsLambdaIntegration()],
                 environment=config['environment'],
                 traces_sample_rate=0.1
             )
-            print("Sentry initialized successfully")
+            log.info('Sentry initialized')
         else:
-            print("No Sentry DSN found in secrets")
+            log.warning('No Sentry DSN found in secrets')
+        _sentry_initialized = True
     except Exception as e:
-        print(f"Error initializing Sentry: {str(e)}")
+        log.warning('Error initializing Sentry', error=str(e))
 
 
-def find_airtable_record_by_email(email):
+def bootstrap():
     """
-    Query Airtable to find record with matching Email field.
+    Warm the container during the Lambda init phase: fetch the secret, build
+    the S3 client (used by the counter log and the suppression set) and
+    import sentry_sdk in parallel, then initialize Sentry and check that the
+    runtime's boto3 can publish the suppression set. Failures are logged and
+    left for the first invocation to retry lazily. The record id cache is
+    seeded on first use, not here: init is capped at 10 seconds.
+    """
+    started = time.monotonic()
+    # The Sentry import is CPU bound; run it while the other tasks wait on the network
+    tasks = [get_airtable_credentials, get_s3_client, sentry_sdk.load]
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = [executor.submit(task) for task in tasks]
+    for future in futures:
+        if future.exception():
+            log.warning('Bootstrap step failed', error=str(future.exception()))
 
-    Args:
-        email: Email address to search for
+    init_sentry()
+    try:
+        if suppression_enabled():
+            suppression_writable()
+    except Exception as e:
+        log.warning('Bootstrap step failed', error=str(e))
+    log.info('Bootstrap completed', seconds=round(time.monotonic() - started, 3))
 
-    Returns:
-        dict with 'id' and 'fields', or None if not found
+
+# Fields read from matched records; everything else is left out of the response
+RECORD_FIELDS = ['Email', 'bounce_count', 'last_bounce_date', 'complaint_count', 'last_complaint_date']
+
+# Records per page of a list request (Airtable's maximum)
+PAGE_SIZE = 100
+
+# Overlap applied to the suppression rebuild's LAST_MODIFIED_TIME() window to absorb clock skew
+SUPPRESSION_REBUILD_OVERLAP_SECONDS = 300
+
+
+def normalize_email(email):
+    """Key for an address in the record id cache and in lookup results."""
+    return (email or '').strip().lower()
+
+
+def record_addresses(value):
     """
-    credentials = get_airtable_credentials()
-    base_id = credentials['airtable_base_id']
-    table_name = credentials['airtable_table_name']
-    api_key = credentials['airtable_api_key']
+    Split an Email field into addresses: shared aliases hold several, as a
+    list field or one string separated by commas, semicolons or newlines.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = re.split(r'[,;\n]', value)
+    return [address.strip() for address in value if address and address.strip()]
 
-    # URL encode the filter formula
-    filter_formula = f"{{Email}}='{email}'"
-    encoded_formula = urllib.parse.quote(filter_formula)
-    url = f"https://api.airtable.com/v0/{base_id}/{urllib.parse.quote(table_name)}?filterByFormula={encoded_formula}"
 
-    try:
-        # Create request with authorization header
-        req = urllib.request.Request(url)
-        req.add_header('Authorization', f'Bearer {api_key}')
+def seed_record_ids():
+    """
+    Replace the record id cache with a bulk, paginated load of the table's
+    Email field, at most RECORD_CACHE_SEED_MAX_PAGES pages. Addresses beyond
+    that are cached by lookups as usual. A shared alias's record is cached
+    under each of its addresses.
+    """
+    global _record_ids, _record_ids_seeded_at
+    record_ids = {}
+    max_records = get_config()['record_cache_seed_max_pages'] * PAGE_SIZE
+    records = get_airtable_client().list_records(fields=['Email'], page_size=PAGE_SIZE)
+    # islice stops before the page past the limit is requested
+    for record in itertools.islice(records, max_records):
+        for address in record_addresses(record.get('fields', {}).get('Email')):
+            ids = record_ids.setdefault(normalize_email(address), [])
+            if record['id'] not in ids:
+                ids.append(record['id'])
+    _record_ids = record_ids
+    _record_ids_seeded_at = time.monotonic()
+    log.info('Seeded record id cache', addresses=len(record_ids))
 
-        with urllib.request.urlopen(req) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            records = data.get('records', [])
 
-            if records:
-                print(f"Found Airtable record for {email}: {records[0]['id']}")
-                return records[0]
-            else:
-                print(f"No Airtable record found for {email}")
-                return None
+def get_record_ids():
+    """
+    Get the container's email -> record ids cache. Record ids almost never
+    change, so entries are kept until a PATCH to one of them fails with 404.
+    With RECORD_CACHE_SEED_SECONDS set, the cache is (re)loaded from the
+    table on first use and then at that interval; otherwise it fills from
+    lookups. If a seed fails the current entries keep being used until the
+    next interval.
 
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode('utf-8')
-        print(f"HTTP error querying Airtable for {email}: {e.code} - {error_body}")
-        raise
-    except Exception as e:
-        print(f"Error querying Airtable for {email}: {str(e)}")
-        raise
+    Returns:
+        dict: Normalized address -> list of record ids
+    """
+    global _record_ids_seeded_at
+    interval = get_config()['record_cache_seed_seconds']
+    if interval > 0 and (not _record_ids_seeded_at or time.monotonic() - _record_ids_seeded_at >= interval):
+        try:
+            seed_record_ids()
+        except Exception as e:
+            log.warning('Error seeding record id cache', error=str(e))
+            # Retry on the next interval rather than on every call
+            _record_ids_seeded_at = time.monotonic()
+    return _record_ids
 
 
-def update_airtable_record(record_id, updates):
+def find_airtable_records_by_emails(emails):
     """
-    Update Airtable record using PATCH API.
+    Query Airtable for the records whose Email field holds any of the
+    addresses, with as few requests as the formula length allows. Shared
+    aliases hold several addresses in one field, so the formula matches
+    records containing an address and the result is checked against the
+    record's split addresses (see record_addresses).
 
     Args:
-        record_id: Airtable record ID (starts with 'rec')
-        updates: Dict of field names to new values
+        emails: Email addresses to search for
+
+    Returns:
+        dict: Lowercased address -> list of matching records ('id' and 'fields')
     """
-    credentials = get_airtable_credentials()
-    base_id = credentials['airtable_base_id']
-    table_name = credentials['airtable_table_name']
-    api_key = credentials['airtable_api_key']
+    client = get_airtable_client()
+    found = {}
 
-    url = f"https://api.airtable.com/v0/{base_id}/{urllib.parse.quote(table_name)}/{record_id}"
+    for formula, chunk in airtable_client.match_any_formulas('Email', emails, contains=True):
+        try:
+            records = list(client.list_records(formula, RECORD_FIELDS))
+        except airtable_client.AirtableError as e:
+            log.error('HTTP error querying Airtable', emails=len(chunk), status=e.status, body=e.body)
+            raise
+        except Exception as e:
+            log.error('Error querying Airtable', emails=len(chunk), error=str(e))
+            raise
 
-    # Prepare the request body
-    body = {
-        'fields': updates
-    }
-    json_data = json.dumps(body).encode('utf-8')
+        wanted = {normalize_email(email) for email in chunk}
+        for record in records:
+            for address in {normalize_email(a) for a in record_addresses(record.get('fields', {}).get('Email'))}:
+                # FIND also matches longer addresses ending in the one searched for
+                if address in wanted:
+                    found.setdefault(address, []).append(record)
 
+        # Every lookup refreshes the record id cache for the addresses it covered
+        for email in chunk:
+            email = normalize_email(email)
+            if email in found:
+                _record_ids[email] = [record['id'] for record in found[email]]
+            else:
+                _record_ids.pop(email, None)
+
+    log.debug('Found Airtable records', emails=len(emails), found=len(found))
+    return found
+
+
+def update_airtable_records(updates, written=None):
+    """
+    Update Airtable records with multi-record PATCH requests (10 records each).
+
+    Args:
+        updates: List of {'id': record ID, 'fields': dict of field names to new values}
+        written: Optional list the ids of updated records are appended to as each PATCH succeeds
+
+    Returns:
+        list: The updated records
+    """
     try:
-        # Create PATCH request with authorization header
-        req = urllib.request.Request(url, data=json_data, method='PATCH')
-        req.add_header('Authorization', f'Bearer {api_key}')
-        req.add_header('Content-Type', 'application/json')
-
-        with urllib.request.urlopen(req) as response:
-            result = json.loads(response.read().decode('utf-8'))
-            print(f"Successfully updated Airtable record {record_id}")
-            return result
-
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode('utf-8')
-        print(f"HTTP error updating Airtable record {record_id}: {e.code} - {error_body}")
+        result = get_airtable_client().update_records(updates, written)
+        log.debug('Updated Airtable records', records=len(updates))
+        return result
+
+    except airtable_client.AirtableError as e:
+        log.error('HTTP error updating Airtable records', records=len(updates), status=e.status, body=e.body)
         raise
     except Exception as e:
-        print(f"Error updating Airtable record {record_id}: {str(e)}")
+        log.error('Error updating Airtable records', records=len(updates), error=str(e))
         raise
 
 
-def handle_bounce(message):
+def new_address_events():
+    """Events collected for one address during an invocation."""
+    return {
+        'bounces': 0,
+        'last_bounce': None,  # (timestamp, bounce type) of the latest bounce
+        'permanent': False,
+        'complaints': 0,
+        'last_complaint': None  # timestamp of the latest complaint
+    }
+
+
+def collect_bounce(message, events):
     """
-    Process SES bounce notification.
+    Add the recipients of an SES bounce notification to events.
 
     SNS message structure:
     {
@@ -183,46 +407,32 @@ def handle_bounce(message):
         "destination": ["user@example.com"]
       }
     }
+
+    Args:
+        message: Parsed SES notification
+        events: Dict of address -> new_address_events(), updated in place
+
+    Returns:
+        int: Number of bounced recipients
     """
     bounce = message['bounce']
     bounce_type = bounce['bounceType']
     bounce_timestamp = bounce['timestamp']
 
     for recipient in bounce['bouncedRecipients']:
-        email_address = recipient['emailAddress']
-
-        # Find Airtable record
-        record = find_airtable_record_by_email(email_address)
-
-        if not record:
-            print(f"No Airtable record found for {email_address}")
-            continue
-
-        # Get current bounce_count (default to 0 if field doesn't exist)
-        current_fields = record.get('fields', {})
-        current_count = current_fields.get('bounce_count', 0)
-
-        # Prepare updates
-        updates = {
-            'bounce_count': current_count + 1,
-            'last_bounce_date': bounce_timestamp[:10],  # YYYY-MM-DD
-            'last_bounce_type': bounce_type
-        }
-
-        # Permanent bounces disable the alias immediately
+        entry = events.setdefault(recipient['emailAddress'], new_address_events())
+        entry['bounces'] += 1
+        if entry['last_bounce'] is None or bounce_timestamp >= entry['last_bounce'][0]:
+            entry['last_bounce'] = (bounce_timestamp, bounce_type)
         if bounce_type == "Permanent":
-            updates['Status'] = "bouncing"
-            print(f"Permanent bounce for {email_address} - disabling alias")
-        else:
-            print(f"Transient bounce for {email_address} - incrementing counter")
+            entry['permanent'] = True
 
-        # Update Airtable
-        update_airtable_record(record['id'], updates)
+    return len(bounce['bouncedRecipients'])
 
 
-def handle_complaint(message):
+def collect_complaint(message, events):
     """
-    Process SES complaint notification.
+    Add the recipients of an SES complaint notification to events.
 
     SNS message structure:
     {
@@ -236,40 +446,476 @@ def handle_complaint(message):
       },
       "mail": {...}
     }
+
+    Args:
+        message: Parsed SES notification
+        events: Dict of address -> new_address_events(), updated in place
+
+    Returns:
+        int: Number of complained recipients
     """
     complaint = message['complaint']
     complaint_timestamp = complaint['timestamp']
 
     for recipient in complaint['complainedRecipients']:
-        email_address = recipient['emailAddress']
+        entry = events.setdefault(recipient['emailAddress'], new_address_events())
+        entry['complaints'] += 1
+        if entry['last_complaint'] is None or complaint_timestamp > entry['last_complaint']:
+            entry['last_complaint'] = complaint_timestamp
+
+    return len(complaint['complainedRecipients'])
+
+
+def fold_entry(events, item):
+    """
+    Add a counter log entry (or another events dict's entry, with 'email'
+    added) to events, as collect_bounce/collect_complaint would have for the
+    original notifications.
+
+    Args:
+        events: Dict of address -> new_address_events(), updated in place
+        item: Counter log entry (see counter_log)
+    """
+    entry = events.setdefault(item['email'], new_address_events())
+    entry['bounces'] += item.get('bounces', 0)
+    last_bounce = item.get('last_bounce')
+    if last_bounce and (entry['last_bounce'] is None or last_bounce[0] >= entry['last_bounce'][0]):
+        entry['last_bounce'] = tuple(last_bounce)
+    if item.get('permanent'):
+        entry['permanent'] = True
+    entry['complaints'] += item.get('complaints', 0)
+    last_complaint = item.get('last_complaint')
+    if last_complaint and (entry['last_complaint'] is None or last_complaint > entry['last_complaint']):
+        entry['last_complaint'] = last_complaint
+
+
+def counter_updates(email_address, current_fields, entry):
+    """
+    Build the counter and date updates for one record: counts are added to
+    the current values, and the dates (and bounce type) are only moved forward.
+
+    Args:
+        email_address: The bounced/complained address (for logs)
+        current_fields: The record's current fields
+        entry: The address's new_address_events()
+
+    Returns:
+        dict: Field names to new values
+    """
+    updates = {}
+
+    if entry['bounces']:
+        # Get current bounce_count (default to 0 if field doesn't exist)
+        last_bounce_timestamp, last_bounce_type = entry['last_bounce']
+        updates['bounce_count'] = current_fields.get('bounce_count', 0) + entry['bounces']
+        if last_bounce_timestamp[:10] >= (current_fields.get('last_bounce_date') or ''):
+            updates['last_bounce_date'] = last_bounce_timestamp[:10]  # YYYY-MM-DD
+            updates['last_bounce_type'] = last_bounce_type
+        if not entry['permanent']:
+            log.debug('Transient bounce, incrementing counter', email=log.redact_address(email_address),
+                      bounces=entry['bounces'])
+
+    if entry['complaints']:
+        updates['complaint_count'] = current_fields.get('complaint_count', 0) + entry['complaints']
+        if entry['last_complaint'][:10] >= (current_fields.get('last_complaint_date') or ''):
+            updates['last_complaint_date'] = entry['last_complaint'][:10]
+
+    return updates
+
+
+def status_updates(email_address, current_fields, entry):
+    """
+    Build the status update for one record: permanent bounces and complaints
+    disable the alias immediately.
+
+    Args:
+        email_address: The bounced/complained address (for logs)
+        current_fields: The record's current fields
+        entry: The address's new_address_events()
+
+    Returns:
+        dict: Field names to new values (empty if the alias stays active)
+    """
+    if entry['complaints']:
+        log.info('Complaint received, disabling alias', email=log.redact_address(email_address))
+        return {'Status': "bouncing"}  # Disable on first complaint (reputation!)
+    if entry['permanent']:
+        log.info('Permanent bounce, disabling alias', email=log.redact_address(email_address))
+        return {'Status': "bouncing"}
+    return {}
+
+
+def merge_updates(email_address, current_fields, entry):
+    """
+    Build all field updates for one record from all of its address's events.
+
+    Args:
+        email_address: The bounced/complained address (for logs)
+        current_fields: The record's current fields
+        entry: The address's new_address_events()
+
+    Returns:
+        dict: Field names to new values
+    """
+    return {
+        **counter_updates(email_address, current_fields, entry),
+        **status_updates(email_address, current_fields, entry)
+    }
+
+
+def resolve_records(emails, timer, use_cache):
+    """
+    Find the records for a set of addresses. With use_cache, addresses in the
+    record id cache are resolved without a lookup (as records with no fields);
+    the rest are looked up in one batch.
+
+    Args:
+        emails: Email addresses to resolve
+        timer: PhaseTimer for the AirtableFind phase
+        use_cache: Whether the caller can build its updates without the current fields
+
+    Returns:
+        tuple: (dict of normalized address -> records, set of addresses resolved from the cache)
+    """
+    found = {}
+    cached = set()
+    missing = list(emails)
+
+    if use_cache:
+        record_ids = get_record_ids()
+        missing = []
+        for email in emails:
+            ids = record_ids.get(normalize_email(email))
+            if ids:
+                found[normalize_email(email)] = [{'id': record_id, 'fields': {}} for record_id in ids]
+                cached.add(email)
+            else:
+                missing.append(email)
+
+    if missing:
+        with timer.phase('AirtableFind'):
+            found.update(find_airtable_records_by_emails(missing))
+
+    return found, cached
 
-        # Find Airtable record
-        record = find_airtable_record_by_email(email_address)
 
-        if not record:
-            print(f"No Airtable record found for {email_address}")
+def build_record_updates(events, found, build_updates):
+    """
+    Build the updates for every record matching an address in events. A
+    shared alias's record can match several addresses; their events are
+    merged so the record gets one update.
+
+    Returns:
+        list: [{'id': record ID, 'fields': field updates}]
+    """
+    records = {}  # record id -> (first matching address, record)
+    merged = {}  # record id -> new_address_events() of every matching address
+    for email_address, entry in events.items():
+        matches = found.get(normalize_email(email_address))
+        if not matches:
+            log.debug('No Airtable record found', email=log.redact_address(email_address))
             continue
+        for record in matches:
+            records.setdefault(record['id'], (email_address, record))
+            fold_entry(merged, {**entry, 'email': record['id']})
 
-        # Get current count
-        current_fields = record.get('fields', {})
-        current_count = current_fields.get('complaint_count', 0)
+    updates = []
+    for record_id, (email_address, record) in records.items():
+        fields = build_updates(email_address, record.get('fields', {}), merged[record_id])
+        if fields:
+            updates.append({'id': record_id, 'fields': fields})
+    return updates
 
-        # Prepare updates - complaints disable immediately
-        updates = {
-            'complaint_count': current_count + 1,
-            'last_complaint_date': complaint_timestamp[:10],
-            'Status': "bouncing"  # Disable on first complaint (reputation!)
-        }
 
-        print(f"Complaint received for {email_address} - disabling alias")
+def write_events(events, timer, build_updates, use_cache=False, written=None, skip=frozenset()):
+    """
+    Resolve every address in events with one batched Airtable lookup and
+    write the updates built for each matching record with multi-record PATCHes.
+
+    With use_cache (for updates that don't depend on the current fields),
+    cached record ids skip the lookup. A 404 on the PATCH means a cached id
+    is stale: the cached addresses are dropped from the cache, looked up
+    again and the write is retried once.
 
-        # Update Airtable
-        update_airtable_record(record['id'], updates)
+    Args:
+        events: Dict of address -> new_address_events()
+        timer: PhaseTimer for the AirtableFind and AirtablePatch phases
+        build_updates: Function (address, current fields, entry) -> field updates
+        use_cache: Resolve addresses from the record id cache where possible
+        written: Optional set the ids of updated records are added to, even
+            when a later PATCH fails and the error is raised
+        skip: Ids of records that must not be written
+
+    Returns:
+        int: Number of Airtable records updated
+    """
+    if not events:
+        return 0
+
+    found, cached = resolve_records(list(events), timer, use_cache)
+    updates = [update for update in build_record_updates(events, found, build_updates) if update['id'] not in skip]
+    if not updates:
+        return 0
+
+    patched = set()
+
+    def patch(updates):
+        progress = []
+        try:
+            with timer.phase('AirtablePatch'):
+                update_airtable_records(updates, progress)
+        finally:
+            patched.update(progress)
+        patched.update(update['id'] for update in updates)
+
+    try:
+        patch(updates)
+    except airtable_client.AirtableError as e:
+        if e.status != 404 or not cached:
+            raise
+        log.warning('Stale cached record ids, re-resolving', addresses=len(cached))
+        for email in cached:
+            _record_ids.pop(normalize_email(email), None)
+        found, _ = resolve_records(list(events), timer, use_cache)
+        done = skip | patched
+        updates = [update for update in build_record_updates(events, found, build_updates) if update['id'] not in done]
+        if updates:
+            patch(updates)
+    finally:
+        if written is not None:
+            written.update(patched)
+
+    return len(patched)
+
+
+def suppress_addresses(addresses, timer):
+    """
+    Add addresses to the suppression set the forwarder checks before sending.
+    Failures are logged, not raised: the alias Status in Airtable still
+    applies, and with the counter log the next flush_counters adds the
+    addresses again.
+
+    Args:
+        addresses: Addresses that bounced permanently or complained
+        timer: PhaseTimer for the SuppressionPublish phase
+    """
+    if not addresses or not suppression_enabled() or not suppression_writable():
+        return
+
+    config = get_config()
+    hashes = {suppression.address_hash(address) for address in addresses}
+    try:
+        with timer.phase('SuppressionPublish'):
+            published = suppression.publish(get_s3_client(), config['suppression_bucket'],
+                                            config['suppression_key'], lambda current: current | hashes)
+        log.info('Published suppression set', version=published.version, addresses=len(published))
+    except Exception as e:
+        log.error('Error publishing suppression set', addresses=len(addresses), error=str(e))
+        sentry_sdk.capture_exception(e)
+
+
+def rebuild_suppression_set(timer, urgent=()):
+    """
+    Reconcile the suppression set with Airtable. The set holds the addresses
+    that bounced permanently or complained, not every address of a bouncing
+    record: one member of a shared alias bouncing must not suppress the
+    others. So a rebuild keeps the set and only removes the addresses of
+    records that are active again, looking at the records modified since
+    the previous rebuild. Urgent addresses from the flushed counter log
+    batches are added again, in case their own publish failed.
+
+    An unchanged set is only rewritten once it is SUPPRESSION_REPUBLISH_SECONDS
+    old, which keeps it ahead of the bucket's lifecycle rule. Failures are
+    logged, not raised.
+
+    Args:
+        timer: PhaseTimer for the SuppressionRebuild phase
+        urgent: Addresses with permanent bounces or complaints in the flushed batches
+    """
+    config = get_config()
+    bucket, key = config['suppression_bucket'], config['suppression_key']
+    started_at = time.time()
+    try:
+        with timer.phase('SuppressionRebuild'):
+            current, _ = suppression.load(get_s3_client(), bucket, key)
+            formula = "{Status} = 'active'"
+            if current.rebuilt_at:
+                since = time.strftime('%Y-%m-%dT%H:%M:%S.000Z',
+                                      time.gmtime(current.rebuilt_at - SUPPRESSION_REBUILD_OVERLAP_SECONDS))
+                formula = f"AND({formula}, IS_AFTER(LAST_MODIFIED_TIME(), '{since}'))"
+            reactivated = {
+                suppression.address_hash(address)
+                for record in get_airtable_client().list_records(formula, ['Email'])
+                for address in record_addresses(record.get('fields', {}).get('Email'))
+            }
+            added = {suppression.address_hash(address) for address in urgent}
+            published = suppression.publish(get_s3_client(), bucket, key, lambda hashes: (hashes | added) - reactivated,
+                                            config['suppression_republish_seconds'], rebuilt_at=started_at)
+        log.info('Rebuilt suppression set', version=published.version, addresses=len(published),
+                 reactivated=len(reactivated))
+    except Exception as e:
+        log.error('Error rebuilding suppression set', error=str(e))
+        sentry_sdk.capture_exception(e)
+
+
+def apply_events(events, timer=None, batch_id=None, written=None, skip=frozenset()):
+    """
+    Write an invocation's events, so it costs a few Airtable requests however
+    many notifications it holds.
+
+    Without a counter log every matching record gets its merged counter and
+    status update right away. With one, only permanent bounces and complaints
+    take that fast path (status only, so record ids can come from the
+    record id cache without a lookup), and all counter increments are
+    appended to the log for flush_counters. The append comes last, so an
+    invocation that fails before it is retried without counting twice.
+    Either way, addresses that were disabled are added to the suppression set.
+
+    Args:
+        events: Dict of address -> new_address_events()
+        timer: Optional PhaseTimer for the AirtableFind, AirtablePatch, SuppressionPublish and CounterLog phases
+        batch_id: Counter log batch id; the Lambda request id, so a retried invocation replaces its batch
+        written: Optional set the ids of updated records are added to, even if the call fails partway
+        skip: Ids of records that must not be written, e.g. the ones a failed call already updated
+
+    Returns:
+        int: Number of Airtable records updated
+    """
+    timer = timer or telemetry.PhaseTimer('bounce')
+    urgent = {address: entry for address, entry in events.items() if entry['permanent'] or entry['complaints']}
+    log_store = get_counter_log()
+    if log_store is None:
+        updated = write_events(events, timer, merge_updates, written=written, skip=skip)
+        suppress_addresses(list(urgent), timer)
+        return updated
+
+    updated = write_events(urgent, timer, status_updates, use_cache=True, written=written, skip=skip)
+    suppress_addresses(list(urgent), timer)
+
+    if events:
+        entries = [
+            {
+                'email': address,
+                'bounces': entry['bounces'],
+                'last_bounce': entry['last_bounce'],
+                'permanent': entry['permanent'],
+                'complaints': entry['complaints'],
+                'last_complaint': entry['last_complaint']
+            }
+            for address, entry in events.items()
+        ]
+        if batch_id is None:
+            import uuid
+            batch_id = uuid.uuid4().hex
+        with timer.phase('CounterLog'):
+            log_store.append(batch_id, entries)
+
+    return updated
+
+
+def handle_bounce(message, timer=None):
+    """
+    Process a single SES bounce notification (see collect_bounce).
+
+    Airtable calls are timed into the optional PhaseTimer. Returns the number
+    of Airtable records updated.
+    """
+    events = {}
+    collect_bounce(message, events)
+    return apply_events(events, timer)
+
+
+def handle_complaint(message, timer=None):
+    """
+    Process a single SES complaint notification (see collect_complaint).
+
+    Airtable calls are timed into the optional PhaseTimer. Returns the number
+    of Airtable records updated.
+    """
+    events = {}
+    collect_complaint(message, events)
+    return apply_events(events, timer)
+
+
+def parse_notification(record):
+    """
+    Extract the SES notification from an SNS record or an SQS record. SQS
+    bodies are the notification itself (raw message delivery) or the SNS
+    envelope around it.
+
+    Raises:
+        ValueError: If the body is not JSON (json.JSONDecodeError)
+        KeyError: If the record has neither an SNS message nor a body
+    """
+    if 'Sns' in record:
+        return json.loads(record['Sns']['Message'])
+
+    body = json.loads(record['body'])
+    if body.get('Type') == 'Notification' and 'Message' in body:
+        return json.loads(body['Message'])
+    return body
+
+
+def collect_notification(message, events):
+    """
+    Add a notification's recipients to events.
+
+    Args:
+        message: Parsed SES notification
+        events: Dict of address -> new_address_events(), updated in place
+
+    Returns:
+        tuple: (notification type, recipients), or None for notification types we ignore
+
+    Raises:
+        KeyError: If a bounce or complaint is missing required fields
+    """
+    # SES Configuration Set Event Destinations use 'eventType'
+    # Direct SES notifications use 'notificationType'
+    notification_type = message.get('eventType') or message.get('notificationType')
+
+    if notification_type == 'Bounce':
+        recipients = collect_bounce(message, events)
+        detail = {'bounceType': message['bounce']['bounceType']}
+    elif notification_type == 'Complaint':
+        recipients = collect_complaint(message, events)
+        detail = {'feedbackType': message['complaint'].get('complaintFeedbackType')}
+    else:
+        log.warning('Unknown notification type', notificationType=notification_type)
+        return None
+
+    log.debug('Collected notification', notificationType=notification_type,
+              messageId=message.get('mail', {}).get('messageId'), **detail)
+    return notification_type, recipients
+
+
+def emit_notifications_summary(timer, counts, recipients, events, updated, airtable_stats, extra_metrics=None):
+    """
+    One line per invocation: summary fields plus EMF metrics, including the
+    Airtable client's counts since airtable_stats (a get_stats() snapshot).
+    """
+    buffered = len(events) if get_counter_log() is not None else 0
+    telemetry.emit_summary(
+        'Processed notifications',
+        {
+            **timer.metrics(),
+            'Bounces': (counts['Bounce'], 'Count'),
+            'Complaints': (counts['Complaint'], 'Count'),
+            'Recipients': (recipients, 'Count'),
+            'Addresses': (len(events), 'Count'),
+            'Updated': (updated, 'Count'),
+            'Buffered': (buffered, 'Count'),
+            **airtable_client.stats_metrics(airtable_stats),
+            **(extra_metrics or {})
+        },
+        {'Service': 'ses_bounce_handler'}
+    )
 
 
 def lambda_handler(event, context):
     """
-    Main Lambda handler for SNS notifications from SES.
+    Main Lambda handler for SES notifications, delivered by SNS or, batched,
+    by SQS (see handle_sqs_batch).
 
     Event structure (SNS wrapper around SES notification):
     {
@@ -285,31 +931,185 @@ def lambda_handler(event, context):
       ]
     }
     """
-    # Initialize Sentry on first invocation
+    # No-op once bootstrap() (or an earlier invocation) has initialized Sentry
     init_sentry()
+    log.log_event(event)
 
-    try:
-        for record in event['Records']:
-            # Parse SNS message
-            sns_message = record['Sns']['Message']
-            message = json.loads(sns_message)
+    records = event['Records']
+    if records and records[0].get('eventSource') == 'aws:sqs':
+        return handle_sqs_batch(records, context)
 
-            # SES Configuration Set Event Destinations use 'eventType'
-            # Direct SES notifications use 'notificationType'
-            notification_type = message.get('eventType') or message.get('notificationType')
+    try:
+        # Collect every notification first so each address is looked up and
+        # written once per invocation, however many notifications mention it
+        events = {}
+        counts = {'Bounce': 0, 'Complaint': 0}
+        recipients = 0
+        for record in records:
+            collected = collect_notification(parse_notification(record), events)
+            if collected:
+                counts[collected[0]] += 1
+                recipients += collected[1]
 
-            print(f"Processing {notification_type} notification")
-
-            if notification_type == 'Bounce':
-                handle_bounce(message)
-            elif notification_type == 'Complaint':
-                handle_complaint(message)
-            else:
-                print(f"Unknown notification type: {notification_type}")
+        timer = telemetry.PhaseTimer('bounce')
+        airtable_stats = airtable_client.get_stats()
+        updated = apply_events(events, timer, getattr(context, 'aws_request_id', None))
+        emit_notifications_summary(timer, counts, recipients, events, updated, airtable_stats)
 
         return {'statusCode': 200, 'body': 'Success'}
 
     except Exception as e:
-        print(f"Error processing notification: {str(e)}")
+        log.error('Error processing notification', error=str(e))
         sentry_sdk.capture_exception(e)
         raise  # Re-raise to trigger Lambda retry
+
+
+def handle_sqs_batch(records, context):
+    """
+    Process a batch of notifications from the SQS notification queue.
+
+    The whole batch is written with one aggregated lookup and PATCH, as for
+    SNS. If that write fails, each notification is written on its own (with
+    its SQS message id as counter log batch id, so a redelivery replaces its
+    batch), and only the ones that fail again, or could not be parsed, are
+    reported for SQS to deliver again. Records the aggregated write updated
+    before it failed already hold every notification's events, so the
+    per-notification writes skip them instead of counting them twice.
+
+    SQS record structure:
+    {
+      "messageId": "...",
+      "eventSource": "aws:sqs",
+      "body": "{...SES notification JSON, or the SNS envelope around it...}"
+    }
+
+    Returns:
+        dict: batchItemFailures listing the records SQS should deliver again
+    """
+    failures = []
+    events = {}
+    notifications = []  # (SQS message id, the notification's own events)
+    counts = {'Bounce': 0, 'Complaint': 0}
+    recipients = 0
+
+    for record in records:
+        message_id = record.get('messageId')
+        own_events = {}
+        try:
+            collected = collect_notification(parse_notification(record), own_events)
+        except Exception as e:
+            log.error('Malformed notification', messageId=message_id, error=str(e))
+            sentry_sdk.capture_exception(e)
+            failures.append(message_id)
+            continue
+        if not collected:
+            continue
+
+        for address, entry in own_events.items():
+            fold_entry(events, {'email': address, **entry})
+        notifications.append((message_id, own_events))
+        counts[collected[0]] += 1
+        recipients += collected[1]
+
+    timer = telemetry.PhaseTimer('bounce')
+    airtable_stats = airtable_client.get_stats()
+    written = set()
+    try:
+        updated = apply_events(events, timer, getattr(context, 'aws_request_id', None), written)
+    except Exception as e:
+        log.warning('Batched write failed, writing notifications one at a time', written=len(written), error=str(e))
+        updated = len(written)
+        for message_id, own_events in notifications:
+            try:
+                updated += apply_events(own_events, timer, message_id, skip=written)
+            except Exception as e:
+                log.error('Error processing notification', messageId=message_id, error=str(e))
+                sentry_sdk.capture_exception(e)
+                failures.append(message_id)
+
+    emit_notifications_summary(timer, counts, recipients, events, updated, airtable_stats,
+                               {'BatchItemFailures': (len(failures), 'Count')})
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failures]}
+
+
+def flush_counters(event, context):
+    """
+    Scheduled entry point folding the pending counter log batches into
+    Airtable: one batched lookup for every address in them, one counter
+    update per record, then the flushed batches are removed. Runs with a
+    reserved concurrency of 1, so no two flushes read and write the same
+    counters at once. Afterwards the suppression set is rebuilt from Airtable.
+
+    If a flush fails after some records were written, it saves the ids of
+    its batches and of those records before raising. The next flush then
+    retries only those batches and skips those records, so no record is
+    incremented twice; other pending batches wait for the flush after it.
+
+    Returns:
+        dict: {'batches': batches flushed, 'updated': records updated}
+    """
+    init_sentry()
+
+    timer = telemetry.PhaseTimer('flush')
+    airtable_stats = airtable_client.get_stats()
+    batches, events, updated = [], {}, 0
+    written = set()
+    log_store = get_counter_log()
+    if log_store is None:
+        log.warning('Counter log is disabled, nothing to flush')
+    else:
+        try:
+            with timer.phase('CounterLog'):
+                progress = log_store.progress()
+                if progress:
+                    batches = log_store.read(progress['batches'])
+                    written.update(progress['written'])
+                    log.info('Resuming counter flush', batches=len(batches), written=len(written))
+                else:
+                    batches = log_store.pending(get_config()['counter_flush_max_batches'])
+
+            for _, entries in batches:
+                for item in entries:
+                    fold_entry(events, item)
+
+            updated = write_events(events, timer, counter_updates, written=written, skip=frozenset(written))
+
+            # A failure before this point leaves the batches for the next flush
+            with timer.phase('CounterLog'):
+                if batches:
+                    log_store.remove([batch_id for batch_id, _ in batches])
+                if progress:
+                    log_store.clear_progress()
+
+        except Exception as e:
+            log.error('Error flushing counters', error=str(e), written=len(written))
+            sentry_sdk.capture_exception(e)
+            if written:
+                try:
+                    log_store.save_progress([batch_id for batch_id, _ in batches], written)
+                except Exception as save_error:
+                    log.error('Error saving counter flush progress', error=str(save_error))
+                    sentry_sdk.capture_exception(save_error)
+            raise
+
+    if suppression_enabled() and suppression_writable():
+        rebuild_suppression_set(timer, [address for address, entry in events.items()
+                                        if entry['permanent'] or entry['complaints']])
+
+    telemetry.emit_summary(
+        'Flushed counters',
+        {
+            **timer.metrics(),
+            'Batches': (len(batches), 'Count'),
+            'Addresses': (len(events), 'Count'),
+            'Updated': (updated, 'Count'),
+            **airtable_client.stats_metrics(airtable_stats)
+        },
+        {'Service': 'ses_bounce_handler'}
+    )
+    return {'batches': len(batches), 'updated': updated}
+
+
+# Run the bootstrap during the Lambda init phase only, not when imported by tests
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    bootstrap()
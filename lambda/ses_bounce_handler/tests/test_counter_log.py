@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import counter_log
+
+ENTRY = {'email': 'test@example.com', 'bounces': 1, 'last_bounce': ['2026-01-28T12:00:00.000Z', 'Transient'],
+         'complaints': 0, 'last_complaint': None}
+
+
+class TestLocalCounterLog(unittest.TestCase):
+
+    def test_append_pending_remove(self):
+        """Test that batches are kept by id until removed"""
+        store = counter_log.LocalCounterLog()
+        store.append('req-1', [ENTRY])
+        store.append('req-2', [ENTRY])
+        store.append('req-1', [ENTRY])
+
+        self.assertEqual([batch_id for batch_id, _ in store.pending(10)], ['req-1', 'req-2'])
+        self.assertEqual(len(store.pending(1)), 1)
+
+        store.remove(['req-1'])
+        self.assertEqual(store.pending(10), [('req-2', [ENTRY])])
+
+    def test_progress_round_trip(self):
+        """Test that a failed flush's progress is kept until cleared and its batches can be re-read"""
+        store = counter_log.LocalCounterLog()
+        store.append('req-1', [ENTRY])
+        store.save_progress(['req-1', 'req-gone'], {'rec2', 'rec1'})
+
+        self.assertEqual(store.progress(), {'batches': ['req-1', 'req-gone'], 'written': ['rec1', 'rec2']})
+        self.assertEqual(store.read(['req-1', 'req-gone']), [('req-1', [ENTRY])])
+
+        store.clear_progress()
+        self.assertIsNone(store.progress())
+
+
+class TestS3CounterLog(unittest.TestCase):
+
+    def setUp(self):
+        self.s3_client = MagicMock()
+        self.store = counter_log.S3CounterLog(self.s3_client, 'test-bucket', 'bounce-counters/')
+
+    def test_append_writes_batch_object(self):
+        """Test that a batch is one JSON object named after the batch id"""
+        self.store.append('req-1', [ENTRY])
+
+        kwargs = self.s3_client.put_object.call_args[1]
+        self.assertEqual(kwargs['Bucket'], 'test-bucket')
+        self.assertEqual(kwargs['Key'], 'bounce-counters/req-1.json')
+        self.assertEqual(json.loads(kwargs['Body']), [ENTRY])
+
+    def test_pending_paginates_and_limits(self):
+        """Test that listing follows continuation tokens and stops at max_batches"""
+        self.s3_client.list_objects_v2.side_effect = [
+            {'Contents': [{'Key': 'bounce-counters/req-1.json'}], 'IsTruncated': True, 'NextContinuationToken': 't'},
+            {'Contents': [{'Key': 'bounce-counters/req-2.json'}, {'Key': 'bounce-counters/req-3.json'}]},
+        ]
+        self.s3_client.get_object.side_effect = lambda **kwargs: {
+            'Body': MagicMock(read=MagicMock(return_value=json.dumps([ENTRY]).encode()))
+        }
+
+        batches = self.store.pending(2)
+
+        self.assertEqual(batches, [('req-1', [ENTRY]), ('req-2', [ENTRY])])
+        self.assertEqual(self.s3_client.list_objects_v2.call_args_list[1][1]['ContinuationToken'], 't')
+
+    def test_pending_skips_progress(self):
+        """Test that the saved flush progress is never read as a batch"""
+        self.s3_client.list_objects_v2.return_value = {'Contents': [
+            {'Key': 'bounce-counters/_progress.json'}, {'Key': 'bounce-counters/req-1.json'}
+        ]}
+        self.s3_client.get_object.return_value = {
+            'Body': MagicMock(read=MagicMock(return_value=json.dumps([ENTRY]).encode()))
+        }
+
+        self.assertEqual(self.store.pending(10), [('req-1', [ENTRY])])
+
+    def test_read_skips_missing_batches(self):
+        """Test that batches deleted since the progress was saved are skipped"""
+        missing = Exception('NoSuchKey')
+        missing.response = {'Error': {'Code': 'NoSuchKey'}}
+        self.s3_client.get_object.side_effect = [
+            missing, {'Body': MagicMock(read=MagicMock(return_value=json.dumps([ENTRY]).encode()))}
+        ]
+
+        self.assertEqual(self.store.read(['req-gone', 'req-1']), [('req-1', [ENTRY])])
+
+    def test_remove_raises_on_errors(self):
+        """Test that objects S3 failed to delete are raised"""
+        self.s3_client.delete_objects.return_value = {'Errors': [{'Key': 'bounce-counters/req-1.json',
+                                                                  'Code': 'AccessDenied'}]}
+
+        with self.assertRaises(RuntimeError):
+            self.store.remove(['req-1'])
+
+        objects = self.s3_client.delete_objects.call_args[1]['Delete']['Objects']
+        self.assertEqual(objects, [{'Key': 'bounce-counters/req-1.json'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
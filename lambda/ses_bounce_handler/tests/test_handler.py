@@ -1,13 +1,17 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import ANY, patch, MagicMock
 import json
 import sys
 import os
 
-# Add parent directory to path
+# Add parent directory and the shared layer to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared', 'python')))
 
+import airtable_client
 import handler
+import suppression
+import telemetry
 
 
 class TestBounceHandler(unittest.TestCase):
@@ -17,6 +21,12 @@ class TestBounceHandler(unittest.TestCase):
         handler._config_cache = None
         handler._secrets_cache = None
         handler._secrets_client = None
+        handler._secrets_loaded_at = 0.0
+        handler._sentry_initialized = False
+        handler._counter_log = None
+        handler._suppression_writable = None
+        handler._record_ids = {}
+        handler._record_ids_seeded_at = 0.0
 
     @patch.dict(os.environ, {
         'AIRTABLE_SECRET_NAME': 'test-secret',
@@ -28,107 +38,143 @@ class TestBounceHandler(unittest.TestCase):
         self.assertEqual(config['airtable_secret_name'], 'test-secret')
         self.assertEqual(config['environment'], 'test')
 
-    @patch('handler.urllib.request.urlopen')
+    @patch('handler.sentry_sdk')
     @patch('handler.get_airtable_credentials')
-    def test_find_record_by_email_found(self, mock_creds, mock_urlopen):
-        """Test finding Airtable record by email address"""
-        # Mock credentials
-        mock_creds.return_value = {
-            'airtable_api_key': 'test_key',
-            'airtable_base_id': 'appTEST123',
-            'airtable_table_name': 'Email Aliases'
-        }
+    def test_init_sentry_runs_once(self, mock_credentials, mock_sentry_sdk):
+        """Test that Sentry is initialized once per container, not per invocation"""
+        mock_credentials.return_value = {'sentry_dsn': 'https://test@test.ingest.sentry.io/test'}
 
-        # Mock Airtable API response
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps({
-            'records': [
-                {
-                    'id': 'recABC123',
-                    'fields': {
-                        'Alias': 'testuser',
-                        'Email': 'test@example.com',
-                        'Status': 'active',
-                        'bounce_count': 0
-                    }
-                }
-            ]
-        }).encode('utf-8')
-        mock_urlopen.return_value.__enter__.return_value = mock_response
+        handler.init_sentry()
+        handler.init_sentry()
 
-        # Test
-        record = handler.find_airtable_record_by_email('test@example.com')
+        mock_sentry_sdk.init.assert_called_once()
 
-        # Assert
-        self.assertIsNotNone(record)
-        self.assertEqual(record['id'], 'recABC123')
-        self.assertEqual(record['fields']['Email'], 'test@example.com')
-
-    @patch('handler.urllib.request.urlopen')
-    @patch('handler.get_airtable_credentials')
-    def test_find_record_by_email_not_found(self, mock_creds, mock_urlopen):
-        """Test finding Airtable record when email doesn't exist"""
-        mock_creds.return_value = {
-            'airtable_api_key': 'test_key',
-            'airtable_base_id': 'appTEST123',
-            'airtable_table_name': 'Email Aliases'
-        }
-
-        # Mock empty response
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps({
-            'records': []
-        }).encode('utf-8')
-        mock_urlopen.return_value.__enter__.return_value = mock_response
-
-        # Test
-        record = handler.find_airtable_record_by_email('nonexistent@example.com')
-
-        # Assert
-        self.assertIsNone(record)
-
-    @patch('handler.urllib.request.urlopen')
+    @patch('handler.seed_record_ids')
+    @patch('handler.init_sentry')
+    @patch('handler.get_s3_client')
     @patch('handler.get_airtable_credentials')
-    def test_update_airtable_record(self, mock_creds, mock_urlopen):
-        """Test updating Airtable record"""
-        mock_creds.return_value = {
-            'airtable_api_key': 'test_key',
-            'airtable_base_id': 'appTEST123',
-            'airtable_table_name': 'Email Aliases'
-        }
+    @patch.dict(os.environ, {'RECORD_CACHE_SEED_SECONDS': '3600'})
+    def test_bootstrap_prefetches_and_tolerates_failures(self, mock_credentials, mock_s3, mock_sentry, mock_seed):
+        """Test that bootstrap warms the secret and the S3 client, never raises and leaves the seed for later"""
+        mock_credentials.side_effect = Exception("Secrets Manager unavailable")
+
+        handler.bootstrap()
+
+        mock_credentials.assert_called_once()
+        mock_s3.assert_called_once()
+        mock_sentry.assert_called_once()
+        mock_seed.assert_not_called()
+
+    @patch('handler.time.monotonic')
+    @patch.dict(os.environ, {'AIRTABLE_SECRET_NAME': 'test-secret', 'SECRET_TTL_SECONDS': '100'})
+    def test_get_airtable_credentials_refreshes_after_ttl(self, mock_monotonic):
+        """Test that the secret is re-fetched once its TTL has passed"""
+        mock_client = MagicMock()
+        mock_client.get_secret_value.side_effect = [
+            {'SecretString': json.dumps({'airtable_api_key': 'old_key'})},
+            {'SecretString': json.dumps({'airtable_api_key': 'new_key'})},
+        ]
 
-        # Mock successful update response
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps({
-            'id': 'recABC123',
-            'fields': {
-                'bounce_count': 1,
-                'Status': 'bouncing'
-            }
-        }).encode('utf-8')
-        mock_urlopen.return_value.__enter__.return_value = mock_response
+        with patch('handler.get_secrets_client', return_value=mock_client):
+            mock_monotonic.return_value = 1000.0
+            self.assertEqual(handler.get_airtable_credentials()['airtable_api_key'], 'old_key')
+            mock_monotonic.return_value = 1099.0
+            self.assertEqual(handler.get_airtable_credentials()['airtable_api_key'], 'old_key')
+            mock_monotonic.return_value = 1100.0
+            self.assertEqual(handler.get_airtable_credentials()['airtable_api_key'], 'new_key')
+
+        self.assertEqual(mock_client.get_secret_value.call_count, 2)
+
+    @patch('handler.get_airtable_client')
+    def test_find_records_by_emails(self, mock_get_client):
+        """Test that several addresses are resolved with one OR query"""
+        mock_get_client.return_value.list_records.return_value = iter([
+            {'id': 'recABC123', 'fields': {'Email': 'test1@example.com', 'bounce_count': 0}},
+            {'id': 'recDEF456', 'fields': {'Email': 'Test2@example.com ', 'bounce_count': 1}},
+        ])
+
+        found = handler.find_airtable_records_by_emails(
+            ['test1@example.com', 'test2@example.com', 'nonexistent@example.com']
+        )
+
+        self.assertEqual(set(found), {'test1@example.com', 'test2@example.com'})
+        self.assertEqual(found['test2@example.com'][0]['id'], 'recDEF456')
+        mock_get_client.return_value.list_records.assert_called_once()
+        formula, fields = mock_get_client.return_value.list_records.call_args[0]
+        self.assertEqual(formula, "OR(FIND('test1@example.com', LOWER({Email} & '')), "
+                                  "FIND('test2@example.com', LOWER({Email} & '')), "
+                                  "FIND('nonexistent@example.com', LOWER({Email} & '')))")
+        self.assertEqual(fields, handler.RECORD_FIELDS)
+
+    @patch('handler.get_airtable_client')
+    def test_find_records_by_emails_matches_shared_alias_members(self, mock_get_client):
+        """Test that a member address of a multi-address record resolves to it, and longer addresses don't"""
+        shared = {'id': 'recTEAM', 'fields': {'Email': 'Alice@example.com; bob@example.com\ncarol@example.com'}}
+        lookalike = {'id': 'recJIM', 'fields': {'Email': ['jimbob@example.com']}}
+        mock_get_client.return_value.list_records.return_value = iter([shared, lookalike])
+
+        found = handler.find_airtable_records_by_emails(['bob@example.com', 'alice@example.com'])
+
+        self.assertEqual(found, {'bob@example.com': [shared], 'alice@example.com': [shared]})
+        self.assertEqual(handler._record_ids, {'bob@example.com': ['recTEAM'], 'alice@example.com': ['recTEAM']})
+
+    @patch('handler.update_airtable_records')
+    @patch('handler.get_airtable_client')
+    def test_shared_alias_members_bounce_into_one_update(self, mock_get_client, mock_update):
+        """Test that bounces of two members of a shared alias become one update of its record"""
+        mock_get_client.return_value.list_records.return_value = iter([
+            {'id': 'recTEAM', 'fields': {'Email': 'alice@example.com, bob@example.com', 'bounce_count': 2}},
+        ])
+        events = {}
+        for address, timestamp in (('alice@example.com', '2026-01-28T12:00:00.000Z'),
+                                   ('bob@example.com', '2026-01-29T12:00:00.000Z')):
+            handler.collect_bounce({'bounce': {
+                'bounceType': 'Transient',
+                'bouncedRecipients': [{'emailAddress': address}],
+                'timestamp': timestamp
+            }}, events)
+
+        self.assertEqual(handler.apply_events(events), 1)
+
+        mock_update.assert_called_once_with([{'id': 'recTEAM', 'fields': {
+            'bounce_count': 4,
+            'last_bounce_date': '2026-01-29',
+            'last_bounce_type': 'Transient'
+        }}], ANY)
+
+    @patch('handler.get_airtable_client')
+    def test_find_records_by_emails_http_error(self, mock_get_client):
+        """Test that Airtable errors are raised so the notification is retried"""
+        mock_get_client.return_value.list_records.side_effect = airtable_client.AirtableError(
+            500, 'server error', 'GET', '/v0/appTEST123/Email%20Aliases'
+        )
+
+        with self.assertRaises(airtable_client.AirtableError):
+            handler.find_airtable_records_by_emails(['test@example.com'])
+
+    @patch('handler.get_airtable_client')
+    def test_update_airtable_records(self, mock_get_client):
+        """Test updating Airtable records with one batched call"""
+        mock_get_client.return_value.update_records.return_value = [
+            {'id': 'recABC123', 'fields': {'bounce_count': 1, 'Status': 'bouncing'}}
+        ]
 
-        # Test
-        updates = {'bounce_count': 1, 'Status': 'bouncing'}
-        result = handler.update_airtable_record('recABC123', updates)
+        updates = [{'id': 'recABC123', 'fields': {'bounce_count': 1, 'Status': 'bouncing'}}]
+        result = handler.update_airtable_records(updates)
 
-        # Assert
-        self.assertIsNotNone(result)
-        self.assertEqual(result['id'], 'recABC123')
+        self.assertEqual(result[0]['id'], 'recABC123')
+        mock_get_client.return_value.update_records.assert_called_once_with(updates, None)
 
-    @patch('handler.find_airtable_record_by_email')
-    @patch('handler.update_airtable_record')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.update_airtable_records')
     def test_handle_permanent_bounce(self, mock_update, mock_find):
         """Test permanent bounce disables alias"""
         # Mock Airtable record
         mock_find.return_value = {
-            'id': 'recABC123',
-            'fields': {
-                'Alias': 'testuser',
-                'Email': 'test@example.com',
-                'Status': 'active',
-                'bounce_count': 0
-            }
+            'test@example.com': [{
+                'id': 'recABC123',
+                'fields': {'Email': 'test@example.com', 'bounce_count': 0}
+            }]
         }
 
         # Bounce message
@@ -144,30 +190,27 @@ class TestBounceHandler(unittest.TestCase):
         }
 
         # Test
-        handler.handle_bounce(message)
+        self.assertEqual(handler.handle_bounce(message), 1)
 
         # Assert
         mock_update.assert_called_once()
-        call_args = mock_update.call_args[0]
-        self.assertEqual(call_args[0], 'recABC123')
-        updates = call_args[1]
+        [update] = mock_update.call_args[0][0]
+        self.assertEqual(update['id'], 'recABC123')
+        updates = update['fields']
         self.assertEqual(updates['Status'], 'bouncing')
         self.assertEqual(updates['bounce_count'], 1)
         self.assertEqual(updates['last_bounce_type'], 'Permanent')
         self.assertEqual(updates['last_bounce_date'], '2026-01-28')
 
-    @patch('handler.find_airtable_record_by_email')
-    @patch('handler.update_airtable_record')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.update_airtable_records')
     def test_handle_transient_bounce(self, mock_update, mock_find):
         """Test transient bounce increments counter but keeps active"""
         mock_find.return_value = {
-            'id': 'recABC123',
-            'fields': {
-                'Alias': 'testuser',
-                'Email': 'test@example.com',
-                'Status': 'active',
-                'bounce_count': 2
-            }
+            'test@example.com': [{
+                'id': 'recABC123',
+                'fields': {'Email': 'test@example.com', 'bounce_count': 2}
+            }]
         }
 
         message = {
@@ -183,18 +226,17 @@ class TestBounceHandler(unittest.TestCase):
 
         handler.handle_bounce(message)
 
-        call_args = mock_update.call_args[0]
-        updates = call_args[1]
+        updates = mock_update.call_args[0][0][0]['fields']
         # Transient bounce should NOT change status
         self.assertNotIn('Status', updates)
         self.assertEqual(updates['bounce_count'], 3)
         self.assertEqual(updates['last_bounce_type'], 'Transient')
 
-    @patch('handler.find_airtable_record_by_email')
-    @patch('handler.update_airtable_record')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.update_airtable_records')
     def test_handle_bounce_no_record(self, mock_update, mock_find):
         """Test bounce handling when no Airtable record exists"""
-        mock_find.return_value = None
+        mock_find.return_value = {}
 
         message = {
             'notificationType': 'Bounce',
@@ -208,23 +250,20 @@ class TestBounceHandler(unittest.TestCase):
         }
 
         # Test - should not raise exception
-        handler.handle_bounce(message)
+        self.assertEqual(handler.handle_bounce(message), 0)
 
         # Assert - update should not be called
         mock_update.assert_not_called()
 
-    @patch('handler.find_airtable_record_by_email')
-    @patch('handler.update_airtable_record')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.update_airtable_records')
     def test_handle_complaint(self, mock_update, mock_find):
         """Test complaint disables alias immediately"""
         mock_find.return_value = {
-            'id': 'recABC123',
-            'fields': {
-                'Alias': 'testuser',
-                'Email': 'test@example.com',
-                'Status': 'active',
-                'complaint_count': 0
-            }
+            'test@example.com': [{
+                'id': 'recABC123',
+                'fields': {'Email': 'test@example.com', 'complaint_count': 0}
+            }]
         }
 
         message = {
@@ -239,26 +278,19 @@ class TestBounceHandler(unittest.TestCase):
 
         handler.handle_complaint(message)
 
-        call_args = mock_update.call_args[0]
-        updates = call_args[1]
+        updates = mock_update.call_args[0][0][0]['fields']
         self.assertEqual(updates['Status'], 'bouncing')
         self.assertEqual(updates['complaint_count'], 1)
         self.assertEqual(updates['last_complaint_date'], '2026-01-28')
 
-    @patch('handler.find_airtable_record_by_email')
-    @patch('handler.update_airtable_record')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.update_airtable_records')
     def test_handle_multiple_recipients(self, mock_update, mock_find):
-        """Test handling bounce with multiple recipients"""
-        mock_find.side_effect = [
-            {
-                'id': 'recABC123',
-                'fields': {'Email': 'test1@example.com', 'bounce_count': 0}
-            },
-            {
-                'id': 'recDEF456',
-                'fields': {'Email': 'test2@example.com', 'bounce_count': 1}
-            }
-        ]
+        """Test that a bounce with multiple recipients is one lookup and one batched update"""
+        mock_find.return_value = {
+            'test1@example.com': [{'id': 'recABC123', 'fields': {'Email': 'test1@example.com', 'bounce_count': 0}}],
+            'test2@example.com': [{'id': 'recDEF456', 'fields': {'Email': 'test2@example.com', 'bounce_count': 1}}]
+        }
 
         message = {
             'notificationType': 'Bounce',
@@ -272,15 +304,48 @@ class TestBounceHandler(unittest.TestCase):
             }
         }
 
-        handler.handle_bounce(message)
+        self.assertEqual(handler.handle_bounce(message), 2)
 
-        # Assert both records were updated
-        self.assertEqual(mock_update.call_count, 2)
+        # Assert both records were updated in one call
+        mock_find.assert_called_once_with(['test1@example.com', 'test2@example.com'])
+        mock_update.assert_called_once()
+        self.assertEqual([u['id'] for u in mock_update.call_args[0][0]], ['recABC123', 'recDEF456'])
+
+    def test_merge_updates_combines_events(self):
+        """Test that several events for one address become one update"""
+        events = {}
+        for bounce_type, timestamp in [('Transient', '2026-01-29T08:00:00.000Z'),
+                                       ('Permanent', '2026-01-28T12:00:00.000Z'),
+                                       ('Transient', '2026-01-27T12:00:00.000Z')]:
+            handler.collect_bounce({'bounce': {
+                'bounceType': bounce_type,
+                'bouncedRecipients': [{'emailAddress': 'test@example.com'}],
+                'timestamp': timestamp
+            }}, events)
+        handler.collect_complaint({'complaint': {
+            'complainedRecipients': [{'emailAddress': 'test@example.com'}],
+            'timestamp': '2026-01-30T12:00:00.000Z'
+        }}, events)
+
+        updates = handler.merge_updates(
+            'test@example.com', {'bounce_count': 4, 'complaint_count': 1}, events['test@example.com']
+        )
+
+        self.assertEqual(updates, {
+            'bounce_count': 7,
+            'last_bounce_date': '2026-01-29',
+            'last_bounce_type': 'Transient',
+            'complaint_count': 2,
+            'last_complaint_date': '2026-01-30',
+            'Status': 'bouncing'
+        })
 
     @patch('handler.init_sentry')
-    @patch('handler.handle_bounce')
-    def test_lambda_handler_bounce(self, mock_handle_bounce, mock_init_sentry):
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_lambda_handler_bounce(self, mock_find, mock_update, mock_init_sentry):
         """Test Lambda handler with bounce notification"""
+        mock_find.return_value = {'test@example.com': [{'id': 'recABC123', 'fields': {}}]}
         event = {
             'Records': [
                 {
@@ -304,13 +369,72 @@ class TestBounceHandler(unittest.TestCase):
         result = handler.lambda_handler(event, None)
 
         self.assertEqual(result['statusCode'], 200)
-        mock_handle_bounce.assert_called_once()
+        mock_update.assert_called_once()
         mock_init_sentry.assert_called_once()
 
     @patch('handler.init_sentry')
-    @patch('handler.handle_complaint')
-    def test_lambda_handler_complaint(self, mock_handle_complaint, mock_init_sentry):
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.telemetry.emit_metrics')
+    def test_lambda_handler_aggregates_notifications(self, mock_emit, mock_find, mock_update, mock_init_sentry):
+        """Test that an invocation's notifications share one lookup, one patch and one summary"""
+        mock_find.return_value = {
+            'test@example.com': [{'id': 'recABC123', 'fields': {'bounce_count': 0, 'complaint_count': 0}}]
+        }
+
+        def sns(message):
+            return {'EventSource': 'aws:sns', 'Sns': {'Message': json.dumps(message)}}
+
+        event = {'Records': [
+            sns({'notificationType': 'Bounce', 'bounce': {
+                'bounceType': 'Transient',
+                'bouncedRecipients': [{'emailAddress': 'test@example.com'}],
+                'timestamp': '2026-01-28T12:00:00.000Z'
+            }}),
+            sns({'notificationType': 'Bounce', 'bounce': {
+                'bounceType': 'Transient',
+                'bouncedRecipients': [{'emailAddress': 'test@example.com'}, {'emailAddress': 'other@example.com'}],
+                'timestamp': '2026-01-28T13:00:00.000Z'
+            }}),
+            sns({'notificationType': 'Complaint', 'complaint': {
+                'complainedRecipients': [{'emailAddress': 'test@example.com'}],
+                'timestamp': '2026-01-28T14:00:00.000Z'
+            }})
+        ]}
+
+        handler.lambda_handler(event, None)
+
+        mock_find.assert_called_once_with(['test@example.com', 'other@example.com'])
+        mock_update.assert_called_once_with([{'id': 'recABC123', 'fields': {
+            'bounce_count': 2,
+            'last_bounce_date': '2026-01-28',
+            'last_bounce_type': 'Transient',
+            'complaint_count': 1,
+            'last_complaint_date': '2026-01-28',
+            'Status': 'bouncing'
+        }}], ANY)
+
+        mock_emit.assert_called_once()
+        metrics, dimensions, properties = mock_emit.call_args[0]
+        self.assertEqual(set(metrics), {
+            'AirtableFindMs', 'AirtablePatchMs', 'Bounces', 'Complaints', 'Recipients', 'Addresses', 'Updated',
+            'Buffered', *airtable_client.stats_metrics({})
+        })
+        self.assertEqual(metrics['Bounces'], (2, 'Count'))
+        self.assertEqual(metrics['Complaints'], (1, 'Count'))
+        self.assertEqual(metrics['Recipients'], (4, 'Count'))
+        self.assertEqual(metrics['Addresses'], (2, 'Count'))
+        self.assertEqual(metrics['Updated'], (1, 'Count'))
+        self.assertEqual(metrics['Buffered'], (0, 'Count'))
+        self.assertEqual(dimensions, {'Service': 'ses_bounce_handler'})
+        self.assertEqual(properties['message'], 'Processed notifications')
+
+    @patch('handler.init_sentry')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_lambda_handler_complaint(self, mock_find, mock_update, mock_init_sentry):
         """Test Lambda handler with complaint notification"""
+        mock_find.return_value = {'test@example.com': [{'id': 'recABC123', 'fields': {}}]}
         event = {
             'Records': [
                 {
@@ -333,7 +457,479 @@ class TestBounceHandler(unittest.TestCase):
         result = handler.lambda_handler(event, None)
 
         self.assertEqual(result['statusCode'], 200)
-        mock_handle_complaint.assert_called_once()
+        self.assertEqual(mock_update.call_args[0][0][0]['fields']['Status'], 'bouncing')
+
+    def test_counter_updates_keeps_newer_dates(self):
+        """Test that counters are added but older dates don't overwrite newer ones"""
+        events = {}
+        handler.collect_bounce({'bounce': {
+            'bounceType': 'Transient',
+            'bouncedRecipients': [{'emailAddress': 'test@example.com'}],
+            'timestamp': '2026-01-27T12:00:00.000Z'
+        }}, events)
+
+        updates = handler.counter_updates(
+            'test@example.com', {'bounce_count': 2, 'last_bounce_date': '2026-01-28'}, events['test@example.com']
+        )
+
+        self.assertEqual(updates, {'bounce_count': 3})
+
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local'})
+    @patch('handler.init_sentry')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_lambda_handler_buffers_transient_bounces(self, mock_find, mock_update, mock_init_sentry):
+        """Test that with a counter log transient bounces make no Airtable calls"""
+        event = {'Records': [{'EventSource': 'aws:sns', 'Sns': {'Message': json.dumps({
+            'notificationType': 'Bounce',
+            'bounce': {
+                'bounceType': 'Transient',
+                'bouncedRecipients': [{'emailAddress': 'test@example.com'}],
+                'timestamp': '2026-01-28T12:00:00.000Z'
+            }
+        })}}]}
+        context = MagicMock(aws_request_id='req-1')
+
+        handler.lambda_handler(event, context)
+        # A retried invocation replaces its batch instead of counting twice
+        handler.lambda_handler(event, context)
+
+        mock_find.assert_not_called()
+        mock_update.assert_not_called()
+        self.assertEqual(handler.get_counter_log().pending(10), [('req-1', [{
+            'email': 'test@example.com',
+            'bounces': 1,
+            'last_bounce': ['2026-01-28T12:00:00.000Z', 'Transient'],
+            'permanent': False,
+            'complaints': 0,
+            'last_complaint': None
+        }])])
+
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local'})
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_permanent_bounce_fast_path_with_counter_log(self, mock_find, mock_update):
+        """Test that a permanent bounce disables the alias right away and buffers its counter"""
+        mock_find.return_value = {'test@example.com': [{'id': 'recABC123', 'fields': {'bounce_count': 0}}]}
+        events = {}
+        for address, bounce_type in [('test@example.com', 'Permanent'), ('other@example.com', 'Transient')]:
+            handler.collect_bounce({'bounce': {
+                'bounceType': bounce_type,
+                'bouncedRecipients': [{'emailAddress': address}],
+                'timestamp': '2026-01-28T12:00:00.000Z'
+            }}, events)
+
+        self.assertEqual(handler.apply_events(events, batch_id='req-2'), 1)
+
+        mock_find.assert_called_once_with(['test@example.com'])
+        mock_update.assert_called_once_with([{'id': 'recABC123', 'fields': {'Status': 'bouncing'}}], ANY)
+        [(_, entries)] = handler.get_counter_log().pending(10)
+        self.assertEqual([e['email'] for e in entries], ['test@example.com', 'other@example.com'])
+
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local'})
+    @patch('handler.init_sentry')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_flush_counters(self, mock_find, mock_update, mock_init_sentry):
+        """Test that pending batches are folded into one counter update per record and removed"""
+        mock_find.return_value = {
+            'test@example.com': [{'id': 'recABC123', 'fields': {'bounce_count': 5, 'Status': 'active'}}]
+        }
+        counters = handler.get_counter_log()
+        counters.append('req-1', [{'email': 'test@example.com', 'bounces': 1,
+                                   'last_bounce': ['2026-01-28T12:00:00.000Z', 'Transient'],
+                                   'complaints': 0, 'last_complaint': None}])
+        counters.append('req-2', [{'email': 'test@example.com', 'bounces': 2,
+                                   'last_bounce': ['2026-01-29T12:00:00.000Z', 'Undetermined'],
+                                   'complaints': 0, 'last_complaint': None}])
+
+        result = handler.flush_counters({}, None)
+
+        self.assertEqual(result, {'batches': 2, 'updated': 1})
+        mock_find.assert_called_once_with(['test@example.com'])
+        mock_update.assert_called_once_with([{'id': 'recABC123', 'fields': {
+            'bounce_count': 8,
+            'last_bounce_date': '2026-01-29',
+            'last_bounce_type': 'Undetermined'
+        }}], ANY)
+        self.assertEqual(counters.pending(10), [])
+
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local'})
+    @patch('handler.init_sentry')
+    @patch('handler.sentry_sdk')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_flush_counters_keeps_batches_on_error(self, mock_find, mock_update, mock_sentry_sdk, mock_init_sentry):
+        """Test that a failed flush leaves the batches for the next one"""
+        mock_find.return_value = {'test@example.com': [{'id': 'recABC123', 'fields': {}}]}
+        mock_update.side_effect = airtable_client.AirtableError(503, 'unavailable', 'PATCH', '/v0/appTEST123/x')
+        handler.get_counter_log().append('req-1', [{'email': 'test@example.com', 'bounces': 1,
+                                                    'last_bounce': ['2026-01-28T12:00:00.000Z', 'Transient'],
+                                                    'complaints': 0, 'last_complaint': None}])
+
+        with self.assertRaises(airtable_client.AirtableError):
+            handler.flush_counters({}, None)
+
+        self.assertEqual(len(handler.get_counter_log().pending(10)), 1)
+        mock_sentry_sdk.capture_exception.assert_called_once()
+
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local'})
+    @patch('handler.init_sentry')
+    @patch('handler.sentry_sdk')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.get_airtable_client')
+    def test_flush_resumes_without_counting_written_records_twice(self, mock_get_client, mock_find, mock_sentry_sdk,
+                                                                  mock_init_sentry):
+        """Test that after a later PATCH chunk fails, the next flush only writes the records still missing"""
+        counts = {f"rec{i}": 1 for i in range(12)}
+        mock_find.side_effect = lambda emails: {
+            email: [{'id': f"rec{email.split('@')[0][4:]}",
+                     'fields': {'bounce_count': counts[f"rec{email.split('@')[0][4:]}"]}}]
+            for email in emails
+        }
+        requests = []
+
+        def request(method, body=None, **kwargs):
+            requests.append(body['records'])
+            if len(requests) == 2:
+                raise airtable_client.AirtableError(503, 'unavailable', 'PATCH', '/v0/appTEST123/Email%20Aliases')
+            for record in body['records']:
+                counts[record['id']] = record['fields']['bounce_count']
+            return {'records': body['records']}
+
+        client = airtable_client.AirtableClient('test_key', 'appTEST123', 'Email Aliases', pool=MagicMock(),
+                                                rate_limiter=MagicMock())
+        client.request = request
+        mock_get_client.return_value = client
+        counters = handler.get_counter_log()
+        counters.append('req-1', [{'email': f"user{i}@example.com", 'bounces': 1,
+                                   'last_bounce': ['2026-01-28T12:00:00.000Z', 'Transient'],
+                                   'complaints': 0, 'last_complaint': None} for i in range(12)])
+
+        with self.assertRaises(airtable_client.AirtableError):
+            handler.flush_counters({}, None)
+        self.assertEqual(counters.progress(), {'batches': ['req-1'], 'written': sorted(f"rec{i}" for i in range(10))})
+
+        counters.append('req-2', [{'email': 'user0@example.com', 'bounces': 1,
+                                   'last_bounce': ['2026-01-29T12:00:00.000Z', 'Transient'],
+                                   'complaints': 0, 'last_complaint': None}])
+        self.assertEqual(handler.flush_counters({}, None), {'batches': 1, 'updated': 2})
+
+        self.assertEqual(counts, {f"rec{i}": 2 for i in range(12)})
+        self.assertIsNone(counters.progress())
+        self.assertEqual([batch_id for batch_id, _ in counters.pending(10)], ['req-2'])
+
+        self.assertEqual(handler.flush_counters({}, None), {'batches': 1, 'updated': 1})
+        self.assertEqual(counts['rec0'], 3)
+
+    @patch('handler.get_airtable_client')
+    def test_find_records_refreshes_record_id_cache(self, mock_get_client):
+        """Test that lookups cache found record ids and drop addresses no longer found"""
+        handler._record_ids = {'gone@example.com': ['recOLD']}
+        mock_get_client.return_value.list_records.return_value = iter([
+            {'id': 'recABC123', 'fields': {'Email': 'Test@Example.com'}},
+        ])
+
+        handler.find_airtable_records_by_emails(['test@example.com', 'gone@example.com'])
+
+        self.assertEqual(handler._record_ids, {'test@example.com': ['recABC123']})
+
+    @patch('handler.time.monotonic')
+    @patch('handler.get_airtable_client')
+    @patch.dict(os.environ, {'RECORD_CACHE_SEED_SECONDS': '3600'})
+    def test_record_id_cache_seeded_from_table(self, mock_get_client, mock_monotonic):
+        """Test that the cache is bulk-loaded with only the Email field, and reloaded per interval"""
+        mock_get_client.return_value.list_records.side_effect = lambda **kwargs: iter([
+            {'id': 'recABC123', 'fields': {'Email': ' Test@example.com'}},
+            {'id': 'recDEF456', 'fields': {'Email': 'test@example.com; other@example.com'}},
+            {'id': 'recGHI789', 'fields': {}},
+        ])
+
+        mock_monotonic.return_value = 1000.0
+        self.assertEqual(handler.get_record_ids(), {
+            'test@example.com': ['recABC123', 'recDEF456'],
+            'other@example.com': ['recDEF456']
+        })
+        mock_monotonic.return_value = 4599.0
+        handler.get_record_ids()
+        mock_monotonic.return_value = 4600.0
+        handler.get_record_ids()
+
+        self.assertEqual(mock_get_client.return_value.list_records.call_count, 2)
+        mock_get_client.return_value.list_records.assert_called_with(fields=['Email'], page_size=100)
+
+    @patch('handler.get_airtable_client')
+    @patch.dict(os.environ, {'RECORD_CACHE_SEED_SECONDS': '3600', 'RECORD_CACHE_SEED_MAX_PAGES': '2'})
+    def test_record_id_cache_seed_is_bounded(self, mock_get_client):
+        """Test that the seed stops reading after RECORD_CACHE_SEED_MAX_PAGES pages"""
+        read = []
+
+        def list_records(**kwargs):
+            for i in range(500):
+                read.append(i)
+                yield {'id': f"rec{i}", 'fields': {'Email': f"user{i}@example.com"}}
+
+        mock_get_client.return_value.list_records.side_effect = list_records
+
+        self.assertEqual(len(handler.get_record_ids()), 200)
+        self.assertEqual(len(read), 200)
+
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local'})
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_fast_path_uses_record_id_cache(self, mock_find, mock_update):
+        """Test that a cached address is disabled with a PATCH and no lookup"""
+        handler._record_ids = {'test@example.com': ['recABC123']}
+
+        self.assertEqual(handler.handle_complaint({'complaint': {
+            'complainedRecipients': [{'emailAddress': 'Test@example.com'}],
+            'timestamp': '2026-01-28T12:00:00.000Z'
+        }}), 1)
+
+        mock_find.assert_not_called()
+        mock_update.assert_called_once_with([{'id': 'recABC123', 'fields': {'Status': 'bouncing'}}], ANY)
+
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local'})
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_stale_cached_record_id_is_re_resolved(self, mock_find, mock_update):
+        """Test that a 404 drops the cached id, looks the address up again and retries"""
+        handler._record_ids = {'test@example.com': ['recOLD']}
+        mock_update.side_effect = [
+            airtable_client.AirtableError(404, 'NOT_FOUND', 'PATCH', '/v0/appTEST123/Email%20Aliases'),
+            [{'id': 'recNEW'}]
+        ]
+        mock_find.return_value = {'test@example.com': [{'id': 'recNEW', 'fields': {}}]}
+
+        self.assertEqual(handler.handle_complaint({'complaint': {
+            'complainedRecipients': [{'emailAddress': 'test@example.com'}],
+            'timestamp': '2026-01-28T12:00:00.000Z'
+        }}), 1)
+
+        mock_find.assert_called_once_with(['test@example.com'])
+        self.assertEqual(mock_update.call_args_list[1][0][0], [{'id': 'recNEW', 'fields': {'Status': 'bouncing'}}])
+        self.assertNotIn('test@example.com', handler._record_ids)
+
+    @staticmethod
+    def sqs_bounce(message_id, address, bounce_type='Transient', envelope=False):
+        """SQS record carrying a bounce, raw or inside the SNS envelope"""
+        body = json.dumps({'notificationType': 'Bounce', 'bounce': {
+            'bounceType': bounce_type,
+            'bouncedRecipients': [{'emailAddress': address}],
+            'timestamp': '2026-01-28T12:00:00.000Z'
+        }})
+        if envelope:
+            body = json.dumps({'Type': 'Notification', 'Message': body})
+        return {'messageId': message_id, 'eventSource': 'aws:sqs', 'body': body}
+
+    @patch('handler.init_sentry')
+    @patch('handler.sentry_sdk')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_lambda_handler_sqs_batch(self, mock_find, mock_update, mock_sentry_sdk, mock_init_sentry):
+        """Test that an SQS batch is written once and only malformed records are reported"""
+        mock_find.return_value = {
+            'test@example.com': [{'id': 'recABC123', 'fields': {'bounce_count': 1}}],
+            'other@example.com': [{'id': 'recDEF456', 'fields': {'bounce_count': 0}}]
+        }
+        event = {'Records': [
+            self.sqs_bounce('m1', 'test@example.com'),
+            self.sqs_bounce('m2', 'test@example.com', envelope=True),
+            {'messageId': 'm3', 'eventSource': 'aws:sqs', 'body': 'not json'},
+            self.sqs_bounce('m4', 'other@example.com', bounce_type='Permanent')
+        ]}
+
+        result = handler.lambda_handler(event, MagicMock(aws_request_id='req-1'))
+
+        self.assertEqual(result, {'batchItemFailures': [{'itemIdentifier': 'm3'}]})
+        mock_find.assert_called_once_with(['test@example.com', 'other@example.com'])
+        mock_update.assert_called_once()
+        updates = {u['id']: u['fields'] for u in mock_update.call_args[0][0]}
+        self.assertEqual(updates['recABC123']['bounce_count'], 3)
+        self.assertEqual(updates['recDEF456']['Status'], 'bouncing')
+
+    @patch('handler.init_sentry')
+    @patch('handler.sentry_sdk')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_lambda_handler_sqs_batch_falls_back_per_notification(self, mock_find, mock_update, mock_sentry_sdk,
+                                                                  mock_init_sentry):
+        """Test that when the batched write fails only the notifications failing on their own are retried"""
+        mock_find.side_effect = lambda emails: {
+            email: [{'id': f"rec-{email}", 'fields': {}}] for email in emails
+        }
+        error = airtable_client.AirtableError(422, 'INVALID_VALUE', 'PATCH', '/v0/appTEST123/Email%20Aliases')
+        mock_update.side_effect = [error, [{}], error]
+        event = {'Records': [
+            self.sqs_bounce('m1', 'test@example.com'),
+            self.sqs_bounce('m2', 'bad@example.com')
+        ]}
+
+        result = handler.lambda_handler(event, None)
+
+        self.assertEqual(result, {'batchItemFailures': [{'itemIdentifier': 'm2'}]})
+        self.assertEqual(mock_update.call_count, 3)
+        self.assertEqual(mock_update.call_args_list[1][0][0][0]['id'], 'rec-test@example.com')
+
+    @patch('handler.init_sentry')
+    @patch('handler.sentry_sdk')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.get_airtable_client')
+    def test_sqs_fallback_skips_records_the_failed_batch_wrote(self, mock_get_client, mock_find, mock_sentry_sdk,
+                                                               mock_init_sentry):
+        """Test that when a later PATCH chunk fails, records in the chunks that succeeded are not counted twice"""
+        counts = {f"rec{i}": 0 for i in range(12)}
+        mock_find.side_effect = lambda emails: {
+            email: [{'id': f"rec{email.split('@')[0][4:]}",
+                     'fields': {'bounce_count': counts[f"rec{email.split('@')[0][4:]}"]}}]
+            for email in emails
+        }
+        requests = []
+
+        def request(method, body=None, **kwargs):
+            requests.append(body['records'])
+            if len(requests) == 2:
+                raise airtable_client.AirtableError(503, 'unavailable', 'PATCH', '/v0/appTEST123/Email%20Aliases')
+            for record in body['records']:
+                counts[record['id']] = record['fields']['bounce_count']
+            return {'records': body['records']}
+
+        client = airtable_client.AirtableClient('test_key', 'appTEST123', 'Email Aliases', pool=MagicMock(),
+                                                rate_limiter=MagicMock())
+        client.request = request
+        mock_get_client.return_value = client
+        event = {'Records': [self.sqs_bounce(f"m{i}", f"user{i}@example.com") for i in range(12)]}
+
+        result = handler.lambda_handler(event, None)
+
+        self.assertEqual(result, {'batchItemFailures': []})
+        self.assertEqual(counts, {f"rec{i}": 1 for i in range(12)})
+        self.assertEqual([len(records) for records in requests], [10, 2, 1, 1])
+
+    @patch('handler.suppression_writable', return_value=True)
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local', 'SUPPRESSION_SET': 's3', 'SUPPRESSION_BUCKET': 'test-bucket'})
+    @patch('handler.get_s3_client')
+    @patch('handler.suppression.publish')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_disabled_addresses_are_suppressed(self, mock_find, mock_update, mock_publish, mock_s3, mock_writable):
+        """Test that permanent bounces and complaints are added to the published suppression set"""
+        mock_find.return_value = {}
+        events = {}
+        for address, bounce_type in [('bad@example.com', 'Permanent'), ('busy@example.com', 'Transient')]:
+            handler.collect_bounce({'bounce': {
+                'bounceType': bounce_type,
+                'bouncedRecipients': [{'emailAddress': address}],
+                'timestamp': '2026-01-28T12:00:00.000Z'
+            }}, events)
+
+        handler.apply_events(events, batch_id='req-1')
+
+        bucket, key, update = mock_publish.call_args[0][1:4]
+        self.assertEqual((bucket, key), ('test-bucket', 'suppression/addresses.json.gz'))
+        self.assertIn('bad@example.com', suppression.SuppressionSet(update(set())))
+        self.assertNotIn('busy@example.com', suppression.SuppressionSet(update(set())))
+
+    @patch('handler.suppression_writable', return_value=True)
+    @patch.dict(os.environ, {'SUPPRESSION_SET': 's3'})
+    @patch('handler.sentry_sdk')
+    @patch('handler.get_s3_client')
+    @patch('handler.suppression.publish')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    def test_suppression_publish_failure_does_not_fail_notification(self, mock_find, mock_update, mock_publish,
+                                                                      mock_s3, mock_sentry_sdk, mock_writable):
+        """Test that Airtable's Status stays authoritative when the set cannot be published"""
+        mock_find.return_value = {'bad@example.com': [{'id': 'recABC123', 'fields': {}}]}
+        mock_publish.side_effect = RuntimeError('lost races')
+
+        self.assertEqual(handler.handle_complaint({'complaint': {
+            'complainedRecipients': [{'emailAddress': 'bad@example.com'}],
+            'timestamp': '2026-01-28T12:00:00.000Z'
+        }}), 1)
+
+        mock_sentry_sdk.capture_exception.assert_called_once()
+
+    @patch.dict(os.environ, {'SUPPRESSION_SET': 's3'})
+    @patch('handler.sentry_sdk')
+    @patch('handler.get_s3_client')
+    @patch('handler.suppression.publish')
+    def test_old_runtime_disables_suppression_set(self, mock_publish, mock_s3, mock_sentry_sdk):
+        """Test that a boto3 without If-Match is reported once and the set is not published"""
+        mock_s3.return_value.meta.service_model.operation_model.return_value.input_shape.members = {
+            'Bucket': MagicMock(), 'Key': MagicMock(), 'Body': MagicMock()
+        }
+
+        handler.suppress_addresses(['bad@example.com'], telemetry.PhaseTimer())
+        handler.suppress_addresses(['worse@example.com'], telemetry.PhaseTimer())
+
+        mock_publish.assert_not_called()
+        mock_sentry_sdk.capture_exception.assert_called_once()
+        self.assertFalse(handler._suppression_writable)
+
+    @patch('handler.suppression_writable', return_value=True)
+    @patch.dict(os.environ, {'SUPPRESSION_SET': 's3', 'SUPPRESSION_REPUBLISH_SECONDS': '600'})
+    @patch('handler.init_sentry')
+    @patch('handler.get_s3_client')
+    @patch('handler.suppression.load')
+    @patch('handler.suppression.publish')
+    @patch('handler.get_airtable_client')
+    def test_flush_rebuild_only_removes_reactivated_addresses(self, mock_get_client, mock_publish, mock_load, mock_s3,
+                                                               mock_init_sentry, mock_writable):
+        """Test that the rebuild keeps suppressed addresses and drops those of records active again"""
+        mock_load.return_value = (suppression.SuppressionSet(rebuilt_at=1769601600.0), '"e1"')
+        mock_get_client.return_value.list_records.return_value = iter([
+            {'id': 'recABC123', 'fields': {'Email': 'team1@example.com; team2@example.com'}},
+            {'id': 'recGHI789', 'fields': {}},
+        ])
+
+        with patch('handler.time.time', return_value=1769602500.0):
+            self.assertEqual(handler.flush_counters({}, None), {'batches': 0, 'updated': 0})
+
+        mock_get_client.return_value.list_records.assert_called_once_with(
+            "AND({Status} = 'active', IS_AFTER(LAST_MODIFIED_TIME(), '2026-01-28T11:55:00.000Z'))", ['Email']
+        )
+        update, max_age = mock_publish.call_args[0][3:5]
+        self.assertEqual(max_age, 600)
+        self.assertEqual(mock_publish.call_args[1]['rebuilt_at'], 1769602500.0)
+        rebuilt = suppression.SuppressionSet(update({
+            suppression.address_hash(address)
+            for address in ('team2@example.com', 'member@example.com', 'no-record@example.com')
+        }))
+        self.assertEqual(len(rebuilt), 2)
+        self.assertNotIn('team2@example.com', rebuilt)
+        self.assertIn('no-record@example.com', rebuilt)
+
+    @patch('handler.suppression_writable', return_value=True)
+    @patch.dict(os.environ, {'COUNTER_LOG': 'local', 'SUPPRESSION_SET': 's3'})
+    @patch('handler.init_sentry')
+    @patch('handler.get_s3_client')
+    @patch('handler.suppression.load')
+    @patch('handler.suppression.publish')
+    @patch('handler.update_airtable_records')
+    @patch('handler.find_airtable_records_by_emails')
+    @patch('handler.get_airtable_client')
+    def test_flush_rebuild_adds_urgent_addresses_from_counter_log(self, mock_get_client, mock_find, mock_update,
+                                                                  mock_publish, mock_load, mock_s3, mock_init_sentry,
+                                                                  mock_writable):
+        """Test that only the address that bounced is suppressed, and the first rebuild reads every active record"""
+        mock_load.return_value = (suppression.SuppressionSet(), None)
+        mock_find.return_value = {}
+        mock_get_client.return_value.list_records.return_value = iter([])
+        handler.get_counter_log().append('req-1', [
+            {'email': 'member@example.com', 'bounces': 1, 'last_bounce': ['2026-01-28T12:00:00.000Z', 'Permanent'],
+             'permanent': True, 'complaints': 0, 'last_complaint': None},
+            {'email': 'busy@example.com', 'bounces': 1, 'last_bounce': ['2026-01-28T12:00:00.000Z', 'Transient'],
+             'permanent': False, 'complaints': 0, 'last_complaint': None},
+        ])
+
+        handler.flush_counters({}, None)
+
+        mock_get_client.return_value.list_records.assert_called_once_with("{Status} = 'active'", ['Email'])
+        update = mock_publish.call_args[0][3]
+        rebuilt = suppression.SuppressionSet(update(set()))
+        self.assertEqual(len(rebuilt), 1)
+        self.assertIn('member@example.com', rebuilt)
 
     @patch('handler.init_sentry')
     def test_lambda_handler_unknown_notification(self, mock_init_sentry):
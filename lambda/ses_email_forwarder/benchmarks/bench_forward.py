@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark forward_email across message shapes, sizes and forward modes.
+
+For each shape in the synthetic corpus (see corpus.py) and each FORWARD_MODE,
+forward_email is run repeatedly against a stub SES client and the script
+reports throughput, per-message latency percentiles and peak traced memory.
+Results are written as JSON so runs from different commits can be compared.
+
+Usage:
+    python benchmarks/bench_forward.py --output results.json
+    python benchmarks/bench_forward.py --shapes plain non_utf8 --modes passthrough
+    python benchmarks/bench_forward.py --compare baseline.json --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.abspath(os.path.join(BENCH_DIR, '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(BENCH_DIR, '..', '..', 'shared', 'python')))
+
+# The handler must not run its Lambda bootstrap (Secrets Manager, Sentry) here
+os.environ.pop('AWS_LAMBDA_FUNCTION_NAME', None)
+os.environ.setdefault('FORWARD_FROM_EMAIL', 'noreply@coders.operationcode.org')
+
+import corpus
+import handler
+
+RESULTS_VERSION = 1
+FORWARD_TO = 'member@example.com'
+
+
+class StubSESClient:
+    """
+    Stand-in for the SES client. Only touches the payload size so the
+    benchmark neither retains messages (as a Mock's call history would) nor
+    measures network time.
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.bytes_sent = 0
+
+    def send_raw_email(self, **kwargs):
+        self.sent += 1
+        self.bytes_sent += len(kwargs['RawMessage']['Data'])
+        return {'MessageId': f"bench-{self.sent}"}
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def set_forward_mode(mode: str):
+    """Switch FORWARD_MODE and drop the handler's cached config."""
+    os.environ['FORWARD_MODE'] = mode
+    handler._config_cache = None
+
+
+def run_case(shape: str, raw: bytes, mode: str, iterations: int, time_budget: float, min_iterations: int) -> dict:
+    """
+    Benchmark one shape in one mode.
+    Latency is measured without tracemalloc (it slows allocation-heavy code
+    considerably); peak memory comes from one extra traced run.
+    """
+    set_forward_mode(mode)
+    ses = StubSESClient()
+    with patch.object(handler, 'get_ses_client', return_value=ses):
+        handler.forward_email(raw, FORWARD_TO, corpus.ALIAS)  # warm-up
+
+        latencies = []
+        started = time.perf_counter()
+        while len(latencies) < iterations:
+            t0 = time.perf_counter()
+            handler.forward_email(raw, FORWARD_TO, corpus.ALIAS)
+            latencies.append(time.perf_counter() - t0)
+            if len(latencies) >= min_iterations and time.perf_counter() - started > time_budget:
+                break
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        handler.forward_email(raw, FORWARD_TO, corpus.ALIAS)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies.sort()
+    count = len(latencies)
+    peak_bytes = peak - baseline
+    return {
+        'shape': shape,
+        'mode': mode,
+        'size_bytes': len(raw),
+        'forwarded_bytes': ses.bytes_sent // ses.sent,
+        'iterations': count,
+        'throughput_msgs_per_s': round(count / elapsed, 3),
+        'throughput_mb_per_s': round(count * len(raw) / elapsed / (1024 * 1024), 3),
+        'latency_ms': {
+            'mean': round(sum(latencies) / count * 1000, 3),
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3),
+        },
+        'peak_memory_bytes': peak_bytes,
+        'peak_memory_ratio': round(peak_bytes / len(raw), 2),
+    }
+
+
+def git_commit() -> str | None:
+    """Current commit hash, if the benchmark runs inside a git checkout."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict):
+    """Print p50 latency and peak memory changes against a previous run."""
+    previous = {(r['shape'], r['mode']): r for r in baseline.get('results', [])}
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for result in results['results']:
+        before = previous.get((result['shape'], result['mode']))
+        if not before:
+            continue
+        p50 = (result['latency_ms']['p50'] / before['latency_ms']['p50'] - 1) * 100 if before['latency_ms']['p50'] else 0
+        mem = (result['peak_memory_bytes'] / before['peak_memory_bytes'] - 1) * 100 if before['peak_memory_bytes'] else 0
+        print(f"  {result['shape']:<18} {result['mode']:<12} p50 {p50:+7.1f}%   peak memory {mem:+7.1f}%")
+
+
+def print_table(results: dict):
+    print(f"{'shape':<18} {'mode':<12} {'size':>10} {'n':>5} {'msg/s':>9} {'MB/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak MB':>9}")
+    for r in results['results']:
+        print(f"{r['shape']:<18} {r['mode']:<12} {r['size_bytes']:>10} {r['iterations']:>5} "
+              f"{r['throughput_msgs_per_s']:>9.1f} {r['throughput_mb_per_s']:>8.1f} "
+              f"{r['latency_ms']['p50']:>9.2f} {r['latency_ms']['p95']:>9.2f} {r['latency_ms']['p99']:>9.2f} "
+              f"{r['peak_memory_bytes'] / (1024 * 1024):>9.2f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--shapes', nargs='+', choices=sorted(corpus.SHAPES), default=list(corpus.SHAPES))
+    parser.add_argument('--modes', nargs='+', choices=['rebuild', 'passthrough'], default=['rebuild', 'passthrough'])
+    parser.add_argument('--iterations', type=int, default=50, help='Maximum timed runs per case')
+    parser.add_argument('--min-iterations', type=int, default=3, help='Minimum timed runs per case')
+    parser.add_argument('--time-budget', type=float, default=10.0,
+                        help='Stop a case after this many seconds once --min-iterations have run')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for body and attachment sizes')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args(argv)
+
+    messages = corpus.build_corpus(args.shapes, args.scale)
+    results = {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'scale': args.scale,
+        },
+        'results': [
+            run_case(shape, raw, mode, args.iterations, args.time_budget, args.min_iterations)
+            for shape, raw in messages.items()
+            for mode in args.modes
+        ]
+    }
+
+    print_table(results)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
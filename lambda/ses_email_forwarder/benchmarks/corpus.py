@@ -0,0 +1,133 @@
+"""
+Synthetic email corpus for the forwarding benchmarks.
+
+Every shape is generated deterministically so results from different commits
+are comparable. Sizes can be scaled down for smoke tests.
+"""
+import random
+from email import policy
+from email.message import EmailMessage
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+SENDER = 'Sender Name <sender@example.com>'
+ALIAS = 'testuser@coders.operationcode.org'
+
+LOREM = (
+    'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor '
+    'incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud '
+    'exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat.\n'
+)
+
+
+def _text(size: int) -> str:
+    """Repeat the filler paragraph up to roughly size characters."""
+    return (LOREM * (size // len(LOREM) + 1))[:size]
+
+
+def _attachment_bytes(size: int, seed: int) -> bytes:
+    """Incompressible attachment payload so base64 work is realistic."""
+    return random.Random(seed).randbytes(size)
+
+
+def _headers(msg, subject: str):
+    msg['From'] = SENDER
+    msg['To'] = ALIAS
+    msg['Subject'] = subject
+    msg['Message-ID'] = f"<{subject.replace(' ', '-').lower()}@example.com>"
+    msg['Date'] = 'Thu, 01 Jan 2026 12:00:00 +0000'
+    return msg
+
+
+def plain(scale: float = 1.0) -> bytes:
+    """Single text/plain part of about 4 KB."""
+    msg = _headers(MIMEText(_text(int(4096 * scale) or 64), 'plain', 'utf-8'), 'Plain text')
+    return msg.as_bytes()
+
+
+def html_alternative(scale: float = 1.0) -> bytes:
+    """multipart/alternative with text and HTML versions of the same body."""
+    body = _text(int(8192 * scale) or 64)
+    msg = _headers(MIMEMultipart('alternative'), 'HTML alternative')
+    msg.attach(MIMEText(body, 'plain', 'utf-8'))
+    paragraphs = ''.join(f"<p>{line}</p>" for line in body.splitlines())
+    msg.attach(MIMEText(f"<html><body>{paragraphs}</body></html>", 'html', 'utf-8'))
+    return msg.as_bytes()
+
+
+def many_attachments(scale: float = 1.0, count: int = 40) -> bytes:
+    """multipart/mixed with a short body and many small binary attachments."""
+    msg = _headers(MIMEMultipart('mixed'), 'Many attachments')
+    msg.attach(MIMEText(_text(1024), 'plain', 'utf-8'))
+    for i in range(count):
+        part = MIMEApplication(_attachment_bytes(int(16 * 1024 * scale) or 64, seed=i), 'octet-stream')
+        part.add_header('Content-Disposition', 'attachment', filename=f"file-{i:02d}.bin")
+        msg.attach(part)
+    return msg.as_bytes()
+
+
+def large_attachment(scale: float = 1.0) -> bytes:
+    """multipart/mixed with one 20 MB attachment (about 27 MB encoded)."""
+    msg = _headers(MIMEMultipart('mixed'), 'Large attachment')
+    msg.attach(MIMEText(_text(1024), 'plain', 'utf-8'))
+    part = MIMEApplication(_attachment_bytes(int(20 * 1024 * 1024 * scale) or 64, seed=20), 'pdf')
+    part.add_header('Content-Disposition', 'attachment', filename='report.pdf')
+    msg.attach(part)
+    return msg.as_bytes()
+
+
+def nested_multipart(scale: float = 1.0, depth: int = 8) -> bytes:
+    """Deeply nested multipart/mixed, each level adding a text part and an attachment."""
+    inner = MIMEMultipart('alternative')
+    inner.attach(MIMEText(_text(int(2048 * scale) or 64), 'plain', 'utf-8'))
+    inner.attach(MIMEText(f"<p>{_text(int(2048 * scale) or 64)}</p>", 'html', 'utf-8'))
+    for level in range(depth):
+        outer = MIMEMultipart('mixed')
+        outer.attach(MIMEText(f"Level {level}\n" + _text(256), 'plain', 'utf-8'))
+        outer.attach(inner)
+        part = MIMEApplication(_attachment_bytes(int(4096 * scale) or 64, seed=100 + level), 'octet-stream')
+        part.add_header('Content-Disposition', 'attachment', filename=f"level-{level}.bin")
+        outer.attach(part)
+        inner = outer
+    return _headers(inner, 'Nested multipart').as_bytes()
+
+
+def non_utf8(scale: float = 1.0) -> bytes:
+    """multipart/mixed with Latin-1, Shift_JIS and KOI8-R parts and an encoded-word subject."""
+    msg = EmailMessage(policy=policy.SMTP)
+    msg['From'] = 'José García <jose@example.com>'
+    msg['To'] = ALIAS
+    msg['Subject'] = 'Résumé — 履歴書 — резюме'
+    msg['Date'] = 'Thu, 01 Jan 2026 12:00:00 +0000'
+    repeat = max(1, int(64 * scale))
+    msg.set_content('Olá, café crème brûlée.\n' * repeat, charset='iso-8859-1')
+    msg.add_attachment('こんにちは世界\n' * repeat, subtype='plain',
+                       charset='shift_jis', disposition='inline')
+    msg.add_attachment('Привет мир\n' * repeat, subtype='plain',
+                       charset='koi8-r', disposition='inline')
+    return msg.as_bytes()
+
+
+SHAPES = {
+    'plain': plain,
+    'html_alternative': html_alternative,
+    'many_attachments': many_attachments,
+    'large_attachment': large_attachment,
+    'nested_multipart': nested_multipart,
+    'non_utf8': non_utf8,
+}
+
+
+def build_corpus(shapes: list[str] | None = None, scale: float = 1.0) -> dict:
+    """
+    Generate the raw messages for the requested shapes.
+
+    Args:
+        shapes: Shape names from SHAPES (default: all)
+        scale: Multiplier for body and attachment sizes
+
+    Returns:
+        dict: shape name -> raw message bytes
+    """
+    return {name: SHAPES[name](scale) for name in (shapes or SHAPES)}
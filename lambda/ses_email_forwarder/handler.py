@@ -1,27 +1,119 @@
-import boto3
-import email
+import contextvars
 import os
 import json
-import urllib.request
-import urllib.error
-import urllib.parse
-from email import policy
-from email.parser import BytesParser
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-import sentry_sdk
-from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import airtable_client
+import ledger
+import log
+import retry_queue
+import s3_conditional
+import suppression
+import telemetry
+from lazy_module import LazyModule
+
+# boto3, sentry_sdk, gzip, mmap and the email parser/MIME modules are imported
+# by the functions that use them, so paths that never reach them (unknown
+# aliases, passthrough forwards, no snapshot) don't pay for them at cold start.
+# lambda/tools/import_budget.py keeps this in check.
+sentry_sdk = LazyModule('sentry_sdk')
 
 # Cache for secrets and config
 _secrets_cache = None
 _config_cache = None
 
-# AWS clients (initialized lazily)
+# Alias lookup cache: alias -> (expires_at, fields or None), kept in LRU order.
+# Lives for the lifetime of the container so warm invocations skip Airtable.
+_alias_cache = OrderedDict()
+_alias_cache_lock = threading.Lock()
+
+# Full alias table index (ALIAS_LOOKUP_MODE=index): alias -> fields for active aliases
+_alias_index = None
+_alias_index_record_aliases = {}  # Airtable record id -> alias, to follow renames
+_alias_index_loaded_at = 0.0
+_alias_index_refreshed_at = 0.0
+_alias_index_synced_through = None  # ISO timestamp the incremental refresh starts from
+_alias_index_lock = threading.Lock()
+
+# Fields fetched when listing the alias table
+ALIAS_INDEX_FIELDS = ['Alias', 'Email', 'Name', 'Status']
+
+# Overlap applied to the incremental refresh window to absorb clock skew
+ALIAS_INDEX_SYNC_OVERLAP_SECONDS = 30
+
+# Format version of the persisted alias index snapshot; bump on layout changes
+ALIAS_SNAPSHOT_VERSION = 1
+
+# Receipt verdicts the policy stage can act on (SES receipt field -> policy name)
+VERDICT_FIELDS = {
+    'spamVerdict': 'spam',
+    'virusVerdict': 'virus',
+    'spfVerdict': 'spf',
+    'dkimVerdict': 'dkim',
+    'dmarcVerdict': 'dmarc'
+}
+
+# Policy actions, in order of precedence when several verdicts fail
+VERDICT_ACTIONS = ('allow', 'tag', 'drop')
+
+DEFAULT_VERDICT_POLICY = 'virus=drop,spam=drop,spf=allow,dkim=allow,dmarc=allow'
+
+# Valid alias: an RFC 5322 dot-atom local part without '+' (the plus-address
+# separator), at most 64 characters, checked after lowercasing
+ALIAS_PATTERN = re.compile(r"^(?=.{1,64}$)[a-z0-9!#$%&'*/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*/=?^_`{|}~-]+)*$")
+
+# SES accepts at most 50 recipients per send_raw_email call
+SES_MAX_DESTINATIONS = 50
+
+# Chunk size used when streaming raw emails from S3
+S3_READ_CHUNK_SIZE = 256 * 1024
+
+# Top-level headers dropped in passthrough mode; they are replaced by our own
+# or would be invalid once From changes (e.g. the sender's DKIM signature)
+PASSTHROUGH_DROPPED_HEADERS = frozenset({
+    b'from', b'reply-to', b'sender', b'return-path', b'dkim-signature',
+    b'x-original-from', b'x-original-to', b'x-forwarded-for'
+})
+
+# AWS clients (initialized lazily, or prefetched during Lambda init by bootstrap())
 _s3_client = None
 _ses_client = None
 _secrets_client = None
+_sqs_client = None
+
+# Guards lazy initialization of clients and secrets when recipients are
+# processed concurrently. Each resource has its own lock so bootstrap() can
+# build them in parallel; boto3.client() on the shared default session is not
+# thread-safe, so every client gets its own Session.
+_s3_client_lock = threading.Lock()
+_ses_client_lock = threading.Lock()
+_secrets_client_lock = threading.Lock()
+_sqs_client_lock = threading.Lock()
+_secrets_lock = threading.Lock()
+
+_secrets_loaded_at = 0.0  # monotonic time the secret was last fetched
+_sentry_initialized = False
+
+# Idempotency ledger of completed sends (FORWARD_LEDGER), built on first use;
+# False once the ledger was found unusable on this runtime
+_ledger = None
+_ledger_lock = threading.Lock()
+
+# Queue for sends that failed (RETRY_QUEUE), built on first use
+_retry_queue = None
+_retry_queue_lock = threading.Lock()
+
+# Suppression set published by the bounce handler (SUPPRESSION_SET), see get_suppression_set
+_suppression = None
+_suppression_etag = None
+_suppression_checked_at = 0.0  # monotonic time S3 was last asked for a new version
+_suppression_lock = threading.Lock()
 
 
 def get_config():
@@ -33,16 +125,73 @@ def get_config():
             'airtable_secret_name': os.environ.get('AIRTABLE_SECRET_NAME', ''),
             'forward_from_email': os.environ.get('FORWARD_FROM_EMAIL', ''),
             'aws_ses_region': os.environ.get('AWS_SES_REGION', 'us-east-1'),
-            'environment': os.environ.get('ENVIRONMENT', 'production')
+            'environment': os.environ.get('ENVIRONMENT', 'production'),
+            'alias_domains': frozenset(
+                domain.strip().lower()
+                for domain in os.environ.get('ALIAS_DOMAINS', 'coders.operationcode.org').split(',')
+                if domain.strip()
+            ),
+            'alias_cache_ttl_seconds': int(os.environ.get('ALIAS_CACHE_TTL_SECONDS', '300')),
+            'alias_cache_negative_ttl_seconds': int(os.environ.get('ALIAS_CACHE_NEGATIVE_TTL_SECONDS', '60')),
+            'alias_cache_max_size': int(os.environ.get('ALIAS_CACHE_MAX_SIZE', '1024')),
+            'alias_lookup_mode': os.environ.get('ALIAS_LOOKUP_MODE', 'query'),
+            'alias_index_refresh_seconds': int(os.environ.get('ALIAS_INDEX_REFRESH_SECONDS', '60')),
+            'alias_index_full_reload_seconds': int(os.environ.get('ALIAS_INDEX_FULL_RELOAD_SECONDS', '3600')),
+            'alias_snapshot_key': os.environ.get('ALIAS_SNAPSHOT_KEY', 'alias-index/snapshot.json.gz'),
+            'alias_snapshot_path': os.environ.get('ALIAS_SNAPSHOT_PATH', '/tmp/alias-index-snapshot.json.gz'),
+            'alias_snapshot_max_age_seconds': int(os.environ.get('ALIAS_SNAPSHOT_MAX_AGE_SECONDS', '86400')),
+            'forward_mode': os.environ.get('FORWARD_MODE', 'rebuild'),
+            'email_spool_threshold_bytes': int(os.environ.get('EMAIL_SPOOL_THRESHOLD_BYTES', str(4 * 1024 * 1024))),
+            'email_spool_dir': os.environ.get('EMAIL_SPOOL_DIR', '/tmp'),
+            'forward_max_workers': int(os.environ.get('FORWARD_MAX_WORKERS', '1')),
+            'forward_ledger': os.environ.get('FORWARD_LEDGER', 'off'),
+            'forward_ledger_prefix': os.environ.get('FORWARD_LEDGER_PREFIX', 'forward-ledger/'),
+            'retry_queue': os.environ.get('RETRY_QUEUE', 'off'),
+            'retry_queue_url': os.environ.get('RETRY_QUEUE_URL', ''),
+            'retry_max_attempts': int(os.environ.get('RETRY_MAX_ATTEMPTS', '5')),
+            'retry_base_delay_seconds': int(os.environ.get('RETRY_BASE_DELAY_SECONDS', '60')),
+            'retry_max_delay_seconds': int(os.environ.get('RETRY_MAX_DELAY_SECONDS', '3600')),
+            'suppression_set': os.environ.get('SUPPRESSION_SET', 'off'),
+            'suppression_key': os.environ.get('SUPPRESSION_KEY', 'suppression/addresses.json.gz'),
+            'suppression_refresh_seconds': int(os.environ.get('SUPPRESSION_REFRESH_SECONDS', '300')),
+            'verdict_policy': parse_verdict_policy(os.environ.get('VERDICT_POLICY', DEFAULT_VERDICT_POLICY)),
+            'secret_ttl_seconds': int(os.environ.get('SECRET_TTL_SECONDS', '3600'))
         }
     return _config_cache
 
 
+def parse_verdict_policy(spec: str) -> dict:
+    """
+    Parse a VERDICT_POLICY setting such as "virus=drop,spam=tag".
+    Verdicts that are not listed are allowed.
+
+    Args:
+        spec: Comma-separated verdict=action pairs (verdicts: spam, virus,
+            spf, dkim, dmarc; actions: allow, tag, drop)
+
+    Returns:
+        dict: verdict name -> action
+
+    Raises:
+        ValueError: If a verdict or action is unknown
+    """
+    policy = {name: 'allow' for name in VERDICT_FIELDS.values()}
+    for pair in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, action = (value.strip().lower() for value in pair.partition('='))
+        if name not in policy or action not in VERDICT_ACTIONS:
+            raise ValueError(f"Invalid VERDICT_POLICY entry: {pair}")
+        policy[name] = action
+    return policy
+
+
 def get_s3_client():
     """Get S3 client with lazy initialization."""
     global _s3_client
     if _s3_client is None:
-        _s3_client = boto3.client('s3')
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                _s3_client = boto3.session.Session().client('s3')
     return _s3_client
 
 
@@ -50,8 +199,11 @@ def get_ses_client():
     """Get SES client with lazy initialization."""
     global _ses_client
     if _ses_client is None:
-        config = get_config()
-        _ses_client = boto3.client('ses', region_name=config['aws_ses_region'])
+        with _ses_client_lock:
+            if _ses_client is None:
+                import boto3
+                config = get_config()
+                _ses_client = boto3.session.Session().client('ses', region_name=config['aws_ses_region'])
     return _ses_client
 
 
@@ -59,159 +211,1005 @@ def get_secrets_client():
     """Get Secrets Manager client with lazy initialization."""
     global _secrets_client
     if _secrets_client is None:
-        _secrets_client = boto3.client('secretsmanager', region_name='us-east-2')
+        with _secrets_client_lock:
+            if _secrets_client is None:
+                import boto3
+                _secrets_client = boto3.session.Session().client('secretsmanager', region_name='us-east-2')
     return _secrets_client
 
 
+def get_sqs_client():
+    """Get SQS client with lazy initialization."""
+    global _sqs_client
+    if _sqs_client is None:
+        with _sqs_client_lock:
+            if _sqs_client is None:
+                import boto3
+                _sqs_client = boto3.session.Session().client('sqs')
+    return _sqs_client
+
+
+def secrets_expired() -> bool:
+    """Check whether the cached secret is missing or older than SECRET_TTL_SECONDS."""
+    if _secrets_cache is None:
+        return True
+    return time.monotonic() - _secrets_loaded_at >= get_config()['secret_ttl_seconds']
 
 
 def get_airtable_credentials():
     """
     Fetch Airtable credentials from Secrets Manager with caching.
+    The secret is re-fetched once it is older than SECRET_TTL_SECONDS so rotated
+    keys are picked up by warm containers. If a refresh fails the previous value
+    keeps being used.
 
     Returns:
         dict: Contains airtable_api_key, airtable_base_id, airtable_table_name, sentry_dsn
     """
-    global _secrets_cache
-    if _secrets_cache is None:
-        config = get_config()
-        secret_name = config['airtable_secret_name']
-        try:
-            secrets_client = get_secrets_client()
-            response = secrets_client.get_secret_value(SecretId=secret_name)
-            _secrets_cache = json.loads(response['SecretString'])
-            print(f"Successfully retrieved secrets from {secret_name}")
-        except Exception as e:
-            print(f"Error retrieving secrets from {secret_name}: {str(e)}")
-            raise
+    global _secrets_cache, _secrets_loaded_at
+    if secrets_expired():
+        with _secrets_lock:
+            if secrets_expired():
+                config = get_config()
+                secret_name = config['airtable_secret_name']
+                try:
+                    secrets_client = get_secrets_client()
+                    response = secrets_client.get_secret_value(SecretId=secret_name)
+                    _secrets_cache = json.loads(response['SecretString'])
+                    _secrets_loaded_at = time.monotonic()
+                    log.info('Retrieved secrets', secret=secret_name)
+                except Exception as e:
+                    log.error('Error retrieving secrets', secret=secret_name, error=str(e))
+                    if _secrets_cache is None:
+                        raise
+                    sentry_sdk.capture_exception(e)
+                    # Retry on the next TTL window rather than on every call
+                    _secrets_loaded_at = time.monotonic()
     return _secrets_cache
 
 
-# Initialize Sentry (deferred until first invocation to get DSN from Secrets Manager)
+def get_airtable_client() -> airtable_client.AirtableClient:
+    """
+    Get a client for the alias table. Connections are pooled per container
+    by the shared airtable_client layer, so this is cheap to call.
+    """
+    credentials = get_airtable_credentials()
+    return airtable_client.AirtableClient(
+        credentials['airtable_api_key'],
+        credentials['airtable_base_id'],
+        credentials['airtable_table_name']
+    )
+
+
 def init_sentry():
-    """Initialize Sentry with DSN from Secrets Manager."""
+    """Initialize Sentry with DSN from Secrets Manager, once per container."""
+    global _sentry_initialized
+    if _sentry_initialized:
+        return
+
     try:
         config = get_config()
         credentials = get_airtable_credentials()
         sentry_dsn = credentials.get('sentry_dsn')
         if sentry_dsn:
+            from sentry_sdk.integrations.aws_lambda import AwsLambdaIntegration
             sentry_sdk.init(
                 dsn=sentry_dsn,
                 integrations=[AwsLambdaIntegration()],
                 traces_sample_rate=0.1,  # 10% transaction sampling
                 environment=config['environment']
             )
-            print("Sentry initialized successfully")
+            log.info('Sentry initialized')
         else:
-            print("Warning: No sentry_dsn found in secrets")
+            log.warning('No sentry_dsn found in secrets')
+        _sentry_initialized = True
     except Exception as e:
-        print(f"Warning: Failed to initialize Sentry: {str(e)}")
+        log.warning('Failed to initialize Sentry', error=str(e))
 
 
-def lookup_alias_in_airtable(alias: str) -> dict | None:
+def bootstrap():
+    """
+    Warm the container during the Lambda init phase: fetch the secret, build
+    the boto3 clients and import sentry_sdk in parallel, then initialize Sentry.
+    Failures are logged and left for the first invocation to retry lazily.
     """
-    Query Airtable to find the mapping for a given alias.
-    Returns the record if found and active, None otherwise.
+    started = time.monotonic()
+    # The Sentry import is CPU bound; run it while the other tasks wait on the network
+    tasks = [get_airtable_credentials, get_s3_client, get_ses_client, get_ledger, get_suppression_set, sentry_sdk.load]
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = [executor.submit(task) for task in tasks]
+    for future in futures:
+        if future.exception():
+            log.warning('Bootstrap step failed', error=str(future.exception()))
+
+    init_sentry()
+    log.info('Bootstrap completed', seconds=round(time.monotonic() - started, 3))
+
+
+def get_ledger():
+    """
+    Get the idempotency ledger selected by FORWARD_LEDGER: 's3' (markers in
+    EMAIL_BUCKET), 'local' (in-memory stand-in) or 'off'. If the runtime's
+    boto3 cannot send the ledger's conditional puts, the error is reported
+    once and mail is forwarded without the ledger.
+
+    Returns:
+        ledger.S3Ledger, ledger.LocalLedger or None when disabled
+    """
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                config = get_config()
+                mode = config['forward_ledger']
+                if mode == 's3':
+                    try:
+                        s3_conditional.require_put_parameters(get_s3_client(), 'IfNoneMatch')
+                        _ledger = ledger.S3Ledger(get_s3_client(), config['email_bucket'],
+                                                  config['forward_ledger_prefix'])
+                    except RuntimeError as e:
+                        log.error('Forward ledger disabled', error=str(e))
+                        sentry_sdk.capture_exception(e)
+                        _ledger = False
+                elif mode == 'local':
+                    _ledger = ledger.LocalLedger()
+                elif mode != 'off':
+                    raise ValueError(f"Unknown FORWARD_LEDGER: {mode}")
+    return _ledger or None
+
+
+def skip_completed_sends(messages: list):
+    """
+    Drop the pending sends that the ledger records as already delivered,
+    reading each message's entries once. If the ledger cannot be read the
+    message is sent in full: a duplicate is better than lost mail.
+
+    Args:
+        messages: Message dicts from lambda_handler with 'pending' sends
+    """
+    store = get_ledger()
+    if store is None or not messages:
+        return
+
+    results = run_concurrently(lambda message: store.completed(message['message_id']), messages)
+    for message, (completed, error) in zip(messages, results):
+        if error:
+            log.error('Error reading forward ledger', messageId=message['message_id'], error=str(error))
+            sentry_sdk.capture_exception(error)
+            continue
+
+        pending = []
+        for send in message['pending']:
+            if send[2] in completed:
+                message['skipped'] += len(send[1])
+            else:
+                pending.append(send)
+        if len(pending) < len(message['pending']):
+            log.info('Skipping sends already in the forward ledger', messageId=message['message_id'],
+                     skipped=len(message['pending']) - len(pending), remaining=len(pending))
+        message['pending'] = pending
+
+
+def record_completed_send(message_id: str, entry: str) -> bool:
+    """
+    Record a delivered send in the ledger. Failures are logged, not raised:
+    the mail went out.
+
+    Returns:
+        bool: False if the ledger could not be written (counted as LedgerErrors)
+    """
+    store = get_ledger()
+    if store is None:
+        return True
+    try:
+        if not store.mark(message_id, entry):
+            log.warning('Send was already in the forward ledger', messageId=message_id, entry=entry)
+        return True
+    except Exception as e:
+        log.error('Error writing forward ledger', messageId=message_id, error=str(e))
+        sentry_sdk.capture_exception(e)
+        return False
+
+
+def get_retry_queue():
+    """
+    Get the retry queue selected by RETRY_QUEUE: 'sqs' (RETRY_QUEUE_URL),
+    'local' (in-memory stand-in) or 'off'.
+
+    Returns:
+        retry_queue.SQSRetryQueue, retry_queue.LocalRetryQueue or None when disabled
+    """
+    global _retry_queue
+    if _retry_queue is None:
+        with _retry_queue_lock:
+            if _retry_queue is None:
+                config = get_config()
+                mode = config['retry_queue']
+                if mode == 'sqs':
+                    _retry_queue = retry_queue.SQSRetryQueue(get_sqs_client(), config['retry_queue_url'])
+                elif mode == 'local':
+                    _retry_queue = retry_queue.LocalRetryQueue()
+                elif mode != 'off':
+                    raise ValueError(f"Unknown RETRY_QUEUE: {mode}")
+    return _retry_queue
+
+
+def retry_item(message_id: str, recipient: str, destinations: list[str] | None, attempt: int, error: Exception,
+               verdict: str | None = None) -> dict:
+    """
+    Build a retry queue item for a send that failed.
+
+    Args:
+        message_id: SES message ID (S3 key of the raw email)
+        recipient: The original recipient address (alias@coders.operationcode.org)
+        destinations: Destination addresses of the send, or None if the alias
+            could not be resolved yet
+        attempt: Number of attempts made so far, including the failed one
+        error: The error of the failed attempt
+        verdict: X-Forward-Verdict value if the verdict policy tagged the message
+
+    Returns:
+        dict: Queue item, see retry_queue
+    """
+    config = get_config()
+    delay = retry_queue.retry_delay(attempt, config['retry_base_delay_seconds'], config['retry_max_delay_seconds'])
+    return {
+        'message_id': message_id,
+        'recipient': recipient,
+        'destinations': destinations,
+        'attempt': attempt,
+        'next_attempt_at': time.time() + delay,
+        'error': str(error)[:500],
+        'verdict': verdict
+    }
+
+
+def enqueue_retries(items: list) -> bool:
+    """
+    Put items on the retry queue.
+
+    Returns:
+        bool: True if every item was queued; False if the queue is disabled or
+        unavailable, in which case the caller must fail so Lambda retries instead
+    """
+    queue = get_retry_queue()
+    if queue is None:
+        return False
+    try:
+        queue.enqueue(items)
+        return True
+    except Exception as e:
+        log.error('Error queueing retries', items=len(items), error=str(e))
+        sentry_sdk.capture_exception(e)
+        return False
+
+
+def queue_unresolved(messages: list, error: Exception) -> bool:
+    """
+    Put every alias recipient of messages on the retry queue unresolved, for
+    when the alias lookup itself was rate limited. The drain resolves the
+    aliases again once the retry delay (longer than Airtable's lockout) has
+    passed, so a burst of mail is delayed rather than failing the invocation
+    until Lambda's two retries of the SES event run out.
+
+    Returns:
+        bool: True if every recipient was queued; False if the queue is
+        disabled or unavailable
+    """
+    items = [
+        retry_item(message['message_id'], recipient, None, 1, error, message['verdict'])
+        for message in messages
+        for _, recipient in message['aliases']
+    ]
+    if not enqueue_retries(items):
+        return False
+    for message in messages:
+        message['queued'] += len(message['aliases'])
+        message['aliases'] = []
+    return True
+
+
+def get_suppression_set():
+    """
+    Get the suppression set the bounce handler publishes to EMAIL_BUCKET
+    (SUPPRESSION_SET=s3). It is loaded on first use, and at most every
+    SUPPRESSION_REFRESH_SECONDS a conditional GET checks for a new version,
+    so checking destinations costs no network call per message. If it
+    cannot be loaded, mail is forwarded without it: the alias Status in
+    Airtable still applies.
+
+    Returns:
+        suppression.SuppressionSet or None when disabled or not loaded yet
+    """
+    global _suppression, _suppression_etag, _suppression_checked_at
+    config = get_config()
+    mode = config['suppression_set']
+    if mode == 'off':
+        return None
+    if mode != 's3':
+        raise ValueError(f"Unknown SUPPRESSION_SET: {mode}")
+
+    with _suppression_lock:
+        now = time.monotonic()
+        if _suppression_checked_at and now - _suppression_checked_at < config['suppression_refresh_seconds']:
+            return _suppression
+        try:
+            loaded, etag = suppression.load(get_s3_client(), config['email_bucket'], config['suppression_key'],
+                                            _suppression_etag)
+            if loaded is not None:
+                _suppression, _suppression_etag = loaded, etag
+                log.info('Loaded suppression set', version=loaded.version, addresses=len(loaded))
+        except Exception as e:
+            log.warning('Error loading suppression set', error=str(e))
+        # Retry on the next interval rather than on every message
+        _suppression_checked_at = now
+        return _suppression
+
+
+def drop_suppressed(message: dict, destinations: list[str], suppressed) -> list[str]:
+    """
+    Remove the destinations in the suppression set, counting them on the message.
+
+    Args:
+        message: Message dict (see new_message)
+        destinations: Destination addresses
+        suppressed: suppression.SuppressionSet, or None to keep every destination
+
+    Returns:
+        list: The destinations to send to
+    """
+    if not suppressed:
+        return destinations
+    kept = [destination for destination in destinations if destination not in suppressed]
+    if len(kept) < len(destinations):
+        log.debug('Dropped suppressed destinations', messageId=message['message_id'],
+                  suppressed=len(destinations) - len(kept))
+        message['suppressed'] += len(destinations) - len(kept)
+    return kept
+
+
+def route_destinations(message: dict, recipient: str, mapping: dict | None, suppressed) -> list[str]:
+    """
+    The destinations a recipient's alias mapping forwards to, without the
+    suppressed ones. Unknown or inactive aliases (or mappings without an
+    Email) are silently dropped and counted on the message.
+
+    Args:
+        message: Message dict (see new_message)
+        recipient: The original recipient address
+        mapping: The alias's Airtable fields, or None
+        suppressed: suppression.SuppressionSet, or None
+
+    Returns:
+        list: The destinations to send to
+    """
+    destinations = parse_destinations(mapping.get('Email')) if mapping else []
+    if not destinations:
+        log.debug('No active mapping with an Email for alias', messageId=message['message_id'],
+                  alias=log.redact_address(recipient))
+        message['unknown'] += 1
+        return []
+    return drop_suppressed(message, destinations, suppressed)
+
+
+def parse_alias(recipient: str) -> tuple[str, str | None]:
+    """
+    Extract the alias from a recipient address without any network call.
+    Plus-addressing is normalized ("john+news@..." -> "john") so every tag
+    shares one cache entry and one Airtable lookup.
+
+    Args:
+        recipient: A recipient address from the SES receipt
+
+    Returns:
+        tuple: (status, alias) - status is 'ok', 'invalid' (malformed address
+        or alias) or 'external' (not one of ALIAS_DOMAINS); alias is None
+        unless status is 'ok'
+    """
+    local, at, domain = recipient.strip().rpartition('@')
+    if not at or not local:
+        return 'invalid', None
+    if domain.lower() not in get_config()['alias_domains']:
+        return 'external', None
+
+    alias = local.split('+', 1)[0].lower()
+    if not ALIAS_PATTERN.match(alias):
+        return 'invalid', None
+    return 'ok', alias
+
+
+def evaluate_verdicts(receipt: dict) -> tuple[str, list[str]]:
+    """
+    Apply VERDICT_POLICY to the verdicts SES attached to the receipt. Only a
+    FAIL status counts; GRAY, PROCESSING_FAILED and missing verdicts pass.
+    Runs before any S3, Airtable or SES call so junk mail costs nothing.
+
+    Args:
+        receipt: The 'receipt' object of an SES event record
+
+    Returns:
+        tuple: (action, failed verdict names) - action is the strongest action
+        ('allow', 'tag' or 'drop') configured for any failed verdict
+    """
+    policy = get_config()['verdict_policy']
+    failed = [
+        name for field, name in VERDICT_FIELDS.items()
+        if (receipt.get(field) or {}).get('status') == 'FAIL'
+    ]
+    action = max((policy[name] for name in failed), key=VERDICT_ACTIONS.index, default='allow')
+    return action, failed
+
+
+def get_cached_alias(alias: str) -> tuple[bool, dict | None]:
+    """
+    Look up an alias in the container-level cache.
 
     Args:
         alias: The email alias (local part before @)
 
     Returns:
-        dict or None: The Airtable record fields if found and active
+        tuple: (hit, fields) - fields is None for a cached "not found / inactive" result
     """
-    credentials = get_airtable_credentials()
-    airtable_api_key = credentials['airtable_api_key']
-    airtable_base_id = credentials['airtable_base_id']
-    airtable_table_name = credentials['airtable_table_name']
+    with _alias_cache_lock:
+        entry = _alias_cache.get(alias)
+        if entry is None:
+            return False, None
+
+        expires_at, fields = entry
+        if expires_at <= time.monotonic():
+            del _alias_cache[alias]
+            return False, None
+
+        _alias_cache.move_to_end(alias)
+        return True, fields
+
+
+def cache_alias(alias: str, fields: dict | None):
+    """
+    Store an alias lookup result, evicting the least recently used entries
+    once the cache is full. Misses use the shorter negative TTL so newly
+    activated aliases start forwarding quickly.
+
+    Args:
+        alias: The email alias (local part before @)
+        fields: The Airtable record fields, or None if not found / inactive
+    """
+    config = get_config()
+    if fields is None:
+        ttl = config['alias_cache_negative_ttl_seconds']
+    else:
+        ttl = config['alias_cache_ttl_seconds']
 
-    url = f"https://api.airtable.com/v0/{airtable_base_id}/{urllib.parse.quote(airtable_table_name)}"
+    max_size = config['alias_cache_max_size']
+    if ttl <= 0 or max_size <= 0:
+        return
+
+    with _alias_cache_lock:
+        _alias_cache[alias] = (time.monotonic() + ttl, fields)
+        _alias_cache.move_to_end(alias)
+        while len(_alias_cache) > max_size:
+            _alias_cache.popitem(last=False)
+
+
+def lookup_aliases_in_airtable(aliases: list[str]) -> dict:
+    """
+    Resolve several aliases with as few Airtable requests as possible.
+    Cached aliases are answered from the container cache; the rest are
+    matched with OR() formulas sized to stay within Airtable's URL limit.
+    Results (including misses) are cached; API errors are not.
+
+    Args:
+        aliases: Email aliases (local part before @)
+
+    Returns:
+        dict: alias -> Airtable record fields if found and active, else None
+
+    Raises:
+        airtable_client.AirtableError: If Airtable still fails after the client's
+            retries, so SES retries the event instead of mail being dropped
+    """
+    results = {}
+    missing = []
+    for alias in dict.fromkeys(aliases):
+        hit, fields = get_cached_alias(alias)
+        if hit:
+            results[alias] = fields
+        else:
+            missing.append(alias)
+
+    if not missing:
+        return results
 
     # Filter for exact alias match and active status
     # Note: Airtable field names are case-sensitive
-    params = urllib.parse.urlencode({
-        'filterByFormula': f"AND({{Alias}} = '{alias}', {{Status}} = 'active')",
-        'maxRecords': 1
-    })
-
-    full_url = f"{url}?{params}"
-
-    req = urllib.request.Request(
-        full_url,
-        headers={
-            'Authorization': f'Bearer {airtable_api_key}',
-            'Content-Type': 'application/json'
-        }
-    )
+    client = get_airtable_client()
+    for formula, chunk in airtable_client.match_any_formulas('Alias', missing, "{Status} = 'active'"):
+        try:
+            records = list(client.list_records(formula, ALIAS_INDEX_FIELDS))
+        except airtable_client.AirtableError as e:
+            log.error('Airtable API error', status=e.status, body=e.body)
+            raise
+
+        found = {}
+        for record in records:
+            fields = record.get('fields', {})
+            found[(fields.get('Alias') or '').strip().lower()] = fields
+
+        for alias in chunk:
+            fields = found.get(alias)
+            if fields:
+                log.debug('Found active alias mapping', alias=alias)
+            else:
+                log.debug('No active alias mapping found', alias=alias)
+            cache_alias(alias, fields)
+            results[alias] = fields
+
+    return results
+
+
+def list_airtable_records(filter_formula: str, fields: list[str]):
+    """
+    List all Airtable records matching a formula, following pagination.
+
+    Args:
+        filter_formula: Airtable filterByFormula expression
+        fields: Field names to return (everything else is omitted by Airtable)
+
+    Yields:
+        dict: Airtable records with 'id' and 'fields'
+    """
+    yield from get_airtable_client().list_records(filter_formula, fields)
+
+
+def _index_sync_watermark(started_at: float) -> str:
+    """Return the ISO timestamp the next incremental refresh should start from."""
+    watermark = datetime.fromtimestamp(started_at - ALIAS_INDEX_SYNC_OVERLAP_SECONDS, tz=timezone.utc)
+    return watermark.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def _apply_index_record(index: dict, record_aliases: dict, record: dict):
+    """Insert, update or remove one Airtable record in an alias index."""
+    fields = record.get('fields', {})
+    record_id = record.get('id')
+    alias = (fields.get('Alias') or '').strip().lower()
+
+    previous_alias = record_aliases.pop(record_id, None)
+    if previous_alias:
+        index.pop(previous_alias, None)
+
+    if alias and fields.get('Email') and fields.get('Status') == 'active':
+        index[alias] = fields
+        record_aliases[record_id] = alias
+
+
+def load_alias_index():
+    """
+    Load every active alias from Airtable into the in-memory index.
+    Replaces any previously loaded index.
+    """
+    global _alias_index, _alias_index_record_aliases
+    global _alias_index_loaded_at, _alias_index_refreshed_at, _alias_index_synced_through
+
+    started_at = time.time()
+    index = {}
+    record_aliases = {}
+    for record in list_airtable_records("{Status} = 'active'", ALIAS_INDEX_FIELDS):
+        _apply_index_record(index, record_aliases, record)
+
+    _alias_index = index
+    _alias_index_record_aliases = record_aliases
+    _alias_index_loaded_at = started_at
+    _alias_index_refreshed_at = started_at
+    _alias_index_synced_through = _index_sync_watermark(started_at)
+    log.info('Loaded alias index', aliases=len(_alias_index))
+    save_alias_snapshot()
+
+
+def refresh_alias_index():
+    """
+    Apply records modified since the last sync to the alias index.
+    Records that are no longer active are removed. Deleted records are only
+    dropped by the periodic full reload.
+    """
+    global _alias_index_refreshed_at, _alias_index_synced_through
+
+    started_at = time.time()
+    formula = f"IS_AFTER(LAST_MODIFIED_TIME(), '{_alias_index_synced_through}')"
+    changed = 0
+    for record in list_airtable_records(formula, ALIAS_INDEX_FIELDS):
+        _apply_index_record(_alias_index, _alias_index_record_aliases, record)
+        changed += 1
+
+    _alias_index_refreshed_at = started_at
+    _alias_index_synced_through = _index_sync_watermark(started_at)
+    log.info('Refreshed alias index', changed=changed, aliases=len(_alias_index))
+    if changed:
+        save_alias_snapshot()
+
+
+def serialize_alias_snapshot() -> bytes:
+    """
+    Serialize the alias index as a compact, versioned, gzipped snapshot.
+    Only the fields needed for routing are kept, one row per active record.
+
+    Returns:
+        bytes: The gzipped JSON snapshot
+    """
+    rows = []
+    for record_id, alias in _alias_index_record_aliases.items():
+        fields = _alias_index[alias]
+        rows.append([record_id, alias, fields.get('Email'), fields.get('Name')])
+
+    snapshot = {
+        'version': ALIAS_SNAPSHOT_VERSION,
+        'loaded_at': _alias_index_loaded_at,
+        'refreshed_at': _alias_index_refreshed_at,
+        'synced_through': _alias_index_synced_through,
+        'records': rows
+    }
+    import gzip
+    return gzip.compress(json.dumps(snapshot, separators=(',', ':')).encode(), compresslevel=6)
+
+
+def apply_alias_snapshot(data: bytes) -> bool:
+    """
+    Install a serialized snapshot as the alias index if it is current.
+    Snapshots with an unknown version or older than ALIAS_SNAPSHOT_MAX_AGE_SECONDS
+    are ignored. The first incremental refresh is deferred by one refresh
+    interval so a cold start can route mail without calling Airtable.
+
+    Args:
+        data: Bytes produced by serialize_alias_snapshot
+
+    Returns:
+        bool: True if the snapshot was installed
+    """
+    global _alias_index, _alias_index_record_aliases
+    global _alias_index_loaded_at, _alias_index_refreshed_at, _alias_index_synced_through
+
+    import gzip
+    snapshot = json.loads(gzip.decompress(data))
+    if snapshot.get('version') != ALIAS_SNAPSHOT_VERSION:
+        log.warning('Ignoring alias snapshot with unknown version', version=snapshot.get('version'))
+        return False
+
+    now = time.time()
+    age = now - snapshot['refreshed_at']
+    if age > get_config()['alias_snapshot_max_age_seconds']:
+        log.info('Ignoring stale alias snapshot', age_seconds=int(age))
+        return False
+
+    index = {}
+    record_aliases = {}
+    for record_id, alias, email_address, name in snapshot['records']:
+        fields = {'Alias': alias, 'Email': email_address, 'Status': 'active'}
+        if name is not None:
+            fields['Name'] = name
+        index[alias] = fields
+        record_aliases[record_id] = alias
+
+    _alias_index = index
+    _alias_index_record_aliases = record_aliases
+    _alias_index_loaded_at = snapshot['loaded_at']
+    _alias_index_refreshed_at = now
+    _alias_index_synced_through = snapshot['synced_through']
+    log.info('Loaded alias snapshot', aliases=len(index), age_seconds=int(age))
+    return True
+
+
+def load_alias_snapshot() -> bool:
+    """
+    Load the persisted alias snapshot, trying the local /tmp copy before S3.
+
+    Returns:
+        bool: True if a current snapshot was installed
+    """
+    config = get_config()
 
     try:
-        with urllib.request.urlopen(req) as response:
-            data = json.loads(response.read().decode())
-            records = data.get('records', [])
-            if records:
-                print(f"Found active alias mapping for: {alias}")
-                return records[0]['fields']
-            print(f"No active alias mapping found for: {alias}")
-            return None
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode()
-        print(f"Airtable API error: {e.code} - {error_body}")
-        sentry_sdk.capture_exception(e)
-        return None
+        with open(config['alias_snapshot_path'], 'rb') as f:
+            if apply_alias_snapshot(f.read()):
+                return True
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.warning('Error loading local alias snapshot', error=str(e))
+
+    try:
+        response = get_s3_client().get_object(
+            Bucket=config['email_bucket'],
+            Key=config['alias_snapshot_key']
+        )
+        return apply_alias_snapshot(response['Body'].read())
     except Exception as e:
-        print(f"Error querying Airtable: {str(e)}")
+        log.info('Could not load alias snapshot from S3', error=str(e))
+        return False
+
+
+def save_alias_snapshot():
+    """Persist the alias index to /tmp and S3. Failures are logged, not raised."""
+    config = get_config()
+    try:
+        data = serialize_alias_snapshot()
+        with open(config['alias_snapshot_path'], 'wb') as f:
+            f.write(data)
+        get_s3_client().put_object(
+            Bucket=config['email_bucket'],
+            Key=config['alias_snapshot_key'],
+            Body=data,
+            ContentType='application/json',
+            ContentEncoding='gzip'
+        )
+        log.info('Saved alias snapshot', bytes=len(data))
+    except Exception as e:
+        log.error('Error saving alias snapshot', error=str(e))
         sentry_sdk.capture_exception(e)
-        return None
 
 
-def get_email_from_s3(message_id: str) -> bytes:
+def get_alias_index() -> dict | None:
+    """
+    Get the alias index, loading or refreshing it when due.
+    A failed refresh keeps serving the previous index.
+
+    Returns:
+        dict or None: alias -> fields, or None if the index could not be loaded
+    """
+    config = get_config()
+    with _alias_index_lock:
+        if _alias_index is None and load_alias_snapshot():
+            return _alias_index
+
+        now = time.time()
+        try:
+            if _alias_index is None or now - _alias_index_loaded_at >= config['alias_index_full_reload_seconds']:
+                load_alias_index()
+            elif now - _alias_index_refreshed_at >= config['alias_index_refresh_seconds']:
+                refresh_alias_index()
+        except Exception as e:
+            log.error('Error refreshing alias index', error=str(e))
+            sentry_sdk.capture_exception(e)
+
+        return _alias_index
+
+
+def resolve_aliases(aliases: list[str]) -> dict:
+    """
+    Resolve aliases to their active Airtable mappings.
+    Uses the in-memory alias index when ALIAS_LOOKUP_MODE=index, falling back
+    to batched Airtable queries if the index is unavailable.
+
+    Args:
+        aliases: Email aliases (local part before @)
+
+    Returns:
+        dict: alias -> Airtable record fields if found and active, else None
+    """
+    if get_config()['alias_lookup_mode'] == 'index':
+        index = get_alias_index()
+        if index is not None:
+            return {alias: index.get(alias) for alias in aliases}
+
+    return lookup_aliases_in_airtable(aliases)
+
+
+def open_email_from_s3(message_id: str) -> tuple[tempfile.SpooledTemporaryFile, int]:
     """
-    Retrieve the raw email from S3.
+    Stream the raw email from S3 into a spool without holding it as one
+    bytes object. Messages larger than EMAIL_SPOOL_THRESHOLD_BYTES spill to
+    a temporary file in EMAIL_SPOOL_DIR (/tmp).
 
     Args:
         message_id: The SES message ID (used as S3 key)
 
     Returns:
-        bytes: The raw email content
+        tuple: (spool positioned at the start, message size in bytes)
     """
+    config = get_config()
+    spool = tempfile.SpooledTemporaryFile(
+        max_size=config['email_spool_threshold_bytes'],
+        dir=config['email_spool_dir']
+    )
     try:
-        config = get_config()
         s3_client = get_s3_client()
         response = s3_client.get_object(
             Bucket=config['email_bucket'],
             Key=message_id
         )
-        return response['Body'].read()
+        for chunk in response['Body'].iter_chunks(S3_READ_CHUNK_SIZE):
+            spool.write(chunk)
     except Exception as e:
-        print(f"Error retrieving email from S3: {str(e)}")
+        spool.close()
+        log.error('Error retrieving email from S3', messageId=message_id, error=str(e))
         sentry_sdk.capture_exception(e)
         raise
 
+    size = spool.tell()
+    spool.seek(0)
+    return spool, size
+
 
-def forward_email(raw_email: bytes, forward_to: str, original_recipient: str) -> dict:
+def prepare_spooled_forward(spool, size: int) -> dict:
     """
-    Parse the original email and forward it to the destination address.
-    Rewrites headers to comply with SES requirements while preserving
-    the original sender information.
+    Prepare a forward from a spooled raw email.
+    Messages that spilled to disk are memory-mapped and always forwarded in
+    passthrough mode, so their parts are never decoded into memory. Smaller
+    messages are fed to an incremental parser in chunks when rebuilding.
+
+    Args:
+        spool: Spool returned by open_email_from_s3
+        size: Message size in bytes
+
+    Returns:
+        dict: Prepared message for render_forward
+    """
+    config = get_config()
+    if size > config['email_spool_threshold_bytes']:
+        # Rolled over to a file; the mapping stays valid after the spool is closed
+        import mmap
+        mapped = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+        return prepare_passthrough_forward(mapped)
+
+    if config['forward_mode'] == 'passthrough':
+        return prepare_passthrough_forward(spool.read())
+
+    from email import policy
+    from email.parser import BytesFeedParser
+    parser = BytesFeedParser(policy=policy.default)
+    for chunk in iter(lambda: spool.read(S3_READ_CHUNK_SIZE), b''):
+        parser.feed(chunk)
+    return build_rebuilt_forward(parser.close())
+
+
+def fetch_and_prepare_forward(message_id: str) -> dict:
+    """
+    Download a message from S3 and prepare it for forwarding.
+
+    Args:
+        message_id: The SES message ID (used as S3 key)
+
+    Returns:
+        dict: Prepared message for render_forward, plus 'size' (bytes) and
+        'timer' (S3Fetch and ParseBuild phase timings)
+    """
+    timer = telemetry.PhaseTimer('forward')
+    with timer.phase('S3Fetch', message_id):
+        spool, size = open_email_from_s3(message_id)
+    with spool, timer.phase('ParseBuild', get_config()['forward_mode']):
+        prepared = prepare_spooled_forward(spool, size)
+    prepared['size'] = size
+    prepared['timer'] = timer
+    return prepared
+
+
+def prepare_forward(raw_email: bytes) -> dict:
+    """
+    Prepare the original email once for forwarding to any number of aliases.
+    Headers that depend on the destination are added later by render_forward.
+    FORWARD_MODE selects between rebuilding the message (default) and
+    rewriting only the top-level headers (passthrough).
 
     Args:
         raw_email: The raw email bytes from S3
-        forward_to: The destination email address
-        original_recipient: The original recipient address (alias@coders.operationcode.org)
 
     Returns:
-        dict: SES send_raw_email response
+        dict: Prepared message, see prepare_rebuilt_forward / prepare_passthrough_forward
+    """
+    if get_config()['forward_mode'] == 'passthrough':
+        return prepare_passthrough_forward(raw_email)
+    return prepare_rebuilt_forward(raw_email)
+
+
+def _split_header_block(raw_email) -> tuple[int, bytes]:
+    """
+    Find the end of the top-level header block.
+
+    Args:
+        raw_email: The raw email as bytes or an mmap
+
+    Returns:
+        tuple: (offset of the blank line separating headers and body, line separator)
+    """
+    crlf = raw_email.find(b'\r\n\r\n')
+    lf = raw_email.find(b'\n\n')
+    if crlf != -1 and (lf == -1 or crlf < lf):
+        return crlf + 2, b'\r\n'
+    if lf != -1:
+        return lf + 1, b'\n'
+    return len(raw_email), b'\r\n' if raw_email.find(b'\r\n') != -1 else b'\n'
+
+
+def prepare_passthrough_forward(raw_email: bytes) -> dict:
+    """
+    Prepare a forward by rewriting only the top-level headers.
+    The MIME body is never decoded or re-encoded: it is passed through as a
+    memoryview slice of the original bytes, so attachments, inline images and
+    nested multiparts arrive exactly as sent.
+
+    Args:
+        raw_email: The raw email from S3, as bytes or an mmap
+
+    Returns:
+        dict: 'headers' (rewritten header block), 'body' (original body bytes,
+        starting with the blank separator line), 'linesep' and 'set_to'
     """
     config = get_config()
+    header_end, linesep = _split_header_block(raw_email)
+    view = memoryview(raw_email)
+
+    # Group physical lines into header fields (continuation lines start with WSP)
+    fields = []
+    for line in bytes(view[:header_end]).splitlines(keepends=True):
+        if line[:1] in (b' ', b'\t') and fields:
+            fields[-1] += line
+        elif line.strip():
+            fields.append(line)
+
+    original_from = None
+    kept = []
+    for field in fields:
+        name = field.split(b':', 1)[0].strip().lower()
+        if name == b'from':
+            original_from = b' '.join(field.split(b':', 1)[1].split())
+        if name not in PASSTHROUGH_DROPPED_HEADERS:
+            if not field.endswith(b'\n'):
+                field += linesep
+            kept.append(field)
+
+    from email import policy
+    fold = policy.compat32.clone(linesep=linesep.decode()).fold_binary
+    rewritten = fold('From', config['forward_from_email'])
+    if original_from:
+        # Raw header values are copied as-is (they may contain encoded words)
+        rewritten += b'Reply-To: ' + original_from + linesep
+        rewritten += b'X-Original-From: ' + original_from + linesep
+
+    return {
+        'headers': rewritten + b''.join(kept),
+        'body': view[header_end:],
+        'linesep': linesep,
+        'set_to': False,
+        'attachments': None  # Not counted: the body is never parsed
+    }
+
+
+def prepare_rebuilt_forward(raw_email: bytes) -> dict:
+    """
+    Parse the original email and build a new message from its parts.
+
+    Args:
+        raw_email: The raw email bytes from S3
 
-    # Parse the original email
-    original_msg = BytesParser(policy=policy.default).parsebytes(raw_email)
+    Returns:
+        dict: Prepared message, see build_rebuilt_forward
+    """
+    from email import policy
+    from email.parser import BytesParser
+    return build_rebuilt_forward(BytesParser(policy=policy.default).parsebytes(raw_email))
+
+
+def build_rebuilt_forward(original_msg) -> dict:
+    """
+    Build a new message from the parts of a parsed email.
+    Rewrites headers to comply with SES requirements while preserving
+    the original sender information.
+
+    Args:
+        original_msg: The parsed original email
+
+    Returns:
+        dict: 'headers' (empty), 'body' (serialized message without
+        per-alias headers), 'linesep', 'set_to' and 'attachments'
+    """
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    config = get_config()
 
     # Extract original headers
     original_from = original_msg['From']
     original_subject = original_msg['Subject'] or '(no subject)'
-    original_to = original_msg['To']
-    original_date = original_msg['Date']
-    original_message_id = original_msg['Message-ID']
 
     # Create new message
     new_msg = MIMEMultipart('mixed')
@@ -219,14 +1217,13 @@ def forward_email(raw_email: bytes, forward_to: str, original_recipient: str) ->
     # Set headers for forwarded message
     # SES requires From to be a verified identity
     new_msg['From'] = config['forward_from_email']
-    new_msg['To'] = forward_to
     new_msg['Subject'] = original_subject
     new_msg['Reply-To'] = original_from  # Replies go to original sender
 
     # Add custom headers to preserve original info
     new_msg['X-Original-From'] = original_from
-    new_msg['X-Original-To'] = original_recipient
-    new_msg['X-Forwarded-For'] = original_recipient
+
+    attachments = 0
 
     # Handle multipart messages (with attachments) vs simple messages
     if original_msg.is_multipart():
@@ -249,6 +1246,7 @@ def forward_email(raw_email: bytes, forward_to: str, original_recipient: str) ->
                     filename=part.get_filename() or 'attachment'
                 )
                 new_msg.attach(new_part)
+                attachments += 1
             else:
                 # Handle body parts
                 payload = part.get_payload(decode=True)
@@ -267,22 +1265,302 @@ def forward_email(raw_email: bytes, forward_to: str, original_recipient: str) ->
             else:
                 new_msg.attach(MIMEText(payload.decode('utf-8', errors='replace'), 'plain'))
 
-    # Send via SES
+    return {
+        'headers': b'',
+        'body': new_msg.as_bytes(),
+        'linesep': b'\n',
+        'set_to': True,
+        'attachments': attachments
+    }
+
+
+def parse_destinations(value) -> list[str]:
+    """
+    Normalize an alias's Email field to a list of destination addresses.
+    Shared aliases (team inboxes) store several addresses, either as a list
+    field or as one string separated by commas, semicolons or newlines.
+
+    Args:
+        value: The Email field value (string, list of strings or None)
+
+    Returns:
+        list: Destination addresses in their original order, without blanks
+        or duplicates (compared case-insensitively)
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(';', ',').replace('\n', ',').split(',')
+
+    destinations = {}
+    for address in value:
+        address = (address or '').strip()
+        if address:
+            destinations.setdefault(address.lower(), address)
+    return list(destinations.values())
+
+
+def chunk_destinations(destinations: list[str]) -> list[list[str]]:
+    """Split destinations into chunks of at most SES_MAX_DESTINATIONS addresses."""
+    return [
+        destinations[start:start + SES_MAX_DESTINATIONS]
+        for start in range(0, len(destinations), SES_MAX_DESTINATIONS)
+    ]
+
+
+def render_forward(prepared: dict, original_recipient: str) -> bytes:
+    """
+    Add the per-alias headers to a prepared message. A rebuilt
+    message is addressed To the alias, never to its destinations, so the
+    members of a shared alias don't see each other's addresses; SES gets
+    the destinations from Destinations.
+
+    Args:
+        prepared: Result of prepare_forward
+        original_recipient: The original recipient address (alias@coders.operationcode.org)
+
+    Returns:
+        bytes: The complete message to hand to SES
+    """
+    from email import policy
+    fold = policy.compat32.clone(linesep=prepared['linesep'].decode()).fold_binary
+    headers = b''
+    if prepared['set_to']:
+        headers += fold('To', original_recipient)
+    headers += fold('X-Original-To', original_recipient)
+    headers += fold('X-Forwarded-For', original_recipient)
+    if prepared.get('verdict'):
+        # Mail tagged by the verdict policy, so recipients can filter it
+        headers += fold('X-Forward-Verdict', prepared['verdict'])
+    return b''.join((headers, prepared['headers'], prepared['body']))
+
+
+def send_forward(prepared: dict, forward_to: str | list[str], original_recipient: str) -> dict:
+    """
+    Send a prepared message via SES with a single send_raw_email call.
+
+    Args:
+        prepared: Result of prepare_forward
+        forward_to: The destination email address, or up to SES_MAX_DESTINATIONS
+            addresses (see chunk_destinations)
+        original_recipient: The original recipient address (alias@coders.operationcode.org)
+
+    Returns:
+        dict: SES send_raw_email response
+    """
+    config = get_config()
+    destinations = [forward_to] if isinstance(forward_to, str) else list(forward_to)
+    if len(destinations) > SES_MAX_DESTINATIONS:
+        raise ValueError(f"At most {SES_MAX_DESTINATIONS} destinations per send, got {len(destinations)}")
+
     try:
         ses_client = get_ses_client()
         response = ses_client.send_raw_email(
             Source=config['forward_from_email'],
-            Destinations=[forward_to],
-            RawMessage={'Data': new_msg.as_bytes()},
+            Destinations=destinations,
+            RawMessage={'Data': render_forward(prepared, original_recipient)},
             ConfigurationSetName='coders-email-forwarding-config'
         )
         return response
     except Exception as e:
-        print(f"Error sending email via SES: {str(e)}")
+        log.error('Error sending email via SES', destinations=len(destinations), error=str(e))
         sentry_sdk.capture_exception(e)
         raise
 
 
+def forward_email(raw_email: bytes, forward_to: str | list[str], original_recipient: str) -> dict:
+    """
+    Parse the original email and forward it with a single SES send.
+
+    Args:
+        raw_email: The raw email bytes from S3
+        forward_to: The destination email address, or up to SES_MAX_DESTINATIONS addresses
+        original_recipient: The original recipient address (alias@coders.operationcode.org)
+
+    Returns:
+        dict: SES send_raw_email response
+    """
+    return send_forward(prepare_forward(raw_email), forward_to, original_recipient)
+
+
+def run_concurrently(func, items: list) -> list[tuple]:
+    """
+    Call func for each item, using a bounded thread pool when
+    FORWARD_MAX_WORKERS is greater than 1. Exceptions are captured per item
+    so one failing item never prevents the others from running.
+
+    Args:
+        func: Callable taking a single item
+        items: Items to process
+
+    Returns:
+        list: (result, exception) tuples in the same order as items
+    """
+    def call(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            return None, e
+
+    workers = min(get_config()['forward_max_workers'], len(items))
+    if workers <= 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Run each item in a copy of the caller's context so Sentry spans
+        # recorded in worker threads attach to the invocation's transaction
+        futures = [executor.submit(contextvars.copy_context().run, call, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def new_message(message_id: str, source: str | None) -> dict:
+    """State of one inbound message while it is routed and forwarded."""
+    return {
+        'message_id': message_id,
+        'source': source,
+        'aliases': [],
+        'routes': [],
+        'pending': [],
+        'invalid': 0,
+        'external': 0,
+        'unknown': 0,
+        'forwarded': 0,
+        'sends': 0,
+        'skipped': 0,
+        'queued': 0,
+        'suppressed': 0,
+        'ledger_errors': 0,
+        'failed': 0,
+        'verdict_action': 'allow',
+        'failed_verdicts': [],
+        'verdict': None  # X-Forward-Verdict header value for tagged mail
+    }
+
+
+def deliver_pending(messages: list, timer: telemetry.PhaseTimer) -> list[tuple]:
+    """
+    Deliver the pending sends of each message: drop the ones the ledger
+    records as delivered, download and parse each remaining message once,
+    then send every chunk and record it in the ledger.
+
+    Args:
+        messages: Message dicts (see new_message) whose 'pending' lists
+            (recipient, destinations, ledger entry) sends
+        timer: Invocation timer for the LedgerCheck phase
+
+    Returns:
+        list: (message, recipient, destinations, error) for every send that failed
+    """
+    failures = []
+    pending = [message for message in messages if message['pending']]
+    if pending and get_ledger() is not None:
+        with timer.phase('LedgerCheck', get_config()['forward_ledger']):
+            skip_completed_sends(pending)
+        pending = [message for message in pending if message['pending']]
+
+    # Download and parse each message once for all of its sends
+    prepared_results = run_concurrently(fetch_and_prepare_forward, [m['message_id'] for m in pending])
+
+    sends = []
+    for message, (prepared, error) in zip(pending, prepared_results):
+        if error:
+            log.error('Error preparing message', messageId=message['message_id'], error=str(error))
+            sentry_sdk.capture_exception(error)
+            for recipient, chunk, _ in message['pending']:
+                message['failed'] += len(chunk)
+                failures.append((message, recipient, chunk, error))
+            continue
+        if message['verdict']:
+            prepared['verdict'] = message['verdict']
+        message['prepared'] = prepared
+        message['timer'] = prepared.get('timer') or telemetry.PhaseTimer('forward')
+        sends.extend((message, recipient, chunk, entry) for recipient, chunk, entry in message['pending'])
+
+    def send(item):
+        message, recipient, chunk, entry = item
+        with message['timer'].phase('SesSend', recipient):
+            response = send_forward(message['prepared'], chunk, recipient)
+        return response, record_completed_send(message['message_id'], entry)
+
+    for (message, recipient, chunk, _), (result, error) in zip(sends, run_concurrently(send, sends)):
+        if error:
+            log.error('Error forwarding email', messageId=message['message_id'],
+                      alias=log.redact_address(recipient), destinations=len(chunk), error=str(error))
+            sentry_sdk.capture_exception(error)
+            message['failed'] += len(chunk)
+            failures.append((message, recipient, chunk, error))
+        else:
+            response, recorded = result
+            if not recorded:
+                message['ledger_errors'] += 1
+            log.debug('Forwarded email', messageId=message['message_id'], alias=log.redact_address(recipient),
+                      destinations=len(chunk), sesMessageId=response.get('MessageId'))
+            message['forwarded'] += len(chunk)
+            message['sends'] += 1
+
+    return failures
+
+
+def log_forward_summary(timer: telemetry.PhaseTimer, messages: list, errors: int, airtable_stats: dict):
+    """
+    Log one summary line for the invocation (alias lookup time, counts) and
+    one per message (outcome counts, S3 fetch, parse/build and SES send
+    times, size and attachment count). Forwarded counts destination
+    addresses, Sends counts SES calls, Skipped counts destinations an
+    earlier attempt already delivered, Queued counts destinations put on
+    the retry queue (alias recipients when the alias lookup was rate
+    limited) and Suppressed counts destinations in the suppression set.
+    ShortCircuited counts messages the verdict policy dropped before any
+    I/O. LedgerErrors counts delivered sends the ledger failed to record.
+    The invocation's line also has the Airtable client's request,
+    connection reuse and throttling counts since airtable_stats (a
+    get_stats() snapshot). The lines double as CloudWatch EMF records.
+    """
+    dimensions = {'Service': 'ses_email_forwarder'}
+    telemetry.emit_summary('Processed event', {
+        **timer.metrics(),
+        'Messages': (len(messages), 'Count'),
+        'ShortCircuited': (sum(message['verdict_action'] == 'drop' for message in messages), 'Count'),
+        'Tagged': (sum(message['verdict_action'] == 'tag' for message in messages), 'Count'),
+        'Forwards': (sum(message['forwarded'] for message in messages), 'Count'),
+        'Sends': (sum(message['sends'] for message in messages), 'Count'),
+        'Skipped': (sum(message['skipped'] for message in messages), 'Count'),
+        'Queued': (sum(message['queued'] for message in messages), 'Count'),
+        'Suppressed': (sum(message['suppressed'] for message in messages), 'Count'),
+        'LedgerErrors': (sum(message['ledger_errors'] for message in messages), 'Count'),
+        'Errors': (errors, 'Count'),
+        **airtable_client.stats_metrics(airtable_stats),
+    }, dimensions)
+
+    forward_mode = get_config()['forward_mode']
+    for message in messages:
+        prepared = message.get('prepared', {})
+        metrics = {
+            'Recipients': (len(message['aliases']) + message['invalid'] + message['external'], 'Count'),
+            'Forwarded': (message['forwarded'], 'Count'),
+            'Sends': (message['sends'], 'Count'),
+            'Skipped': (message['skipped'], 'Count'),
+            'Queued': (message['queued'], 'Count'),
+            'Suppressed': (message['suppressed'], 'Count'),
+            'LedgerErrors': (message['ledger_errors'], 'Count'),
+            'MessageSize': (prepared.get('size'), 'Bytes'),
+            'Attachments': (prepared.get('attachments'), 'Count'),
+        }
+        if 'timer' in message:
+            metrics.update(message['timer'].metrics())
+        telemetry.emit_summary('Processed message', metrics, dimensions, {
+            'messageId': message['message_id'],
+            'source': log.redact_address(message['source']),
+            'unknownAliases': message['unknown'],
+            'invalidRecipients': message['invalid'],
+            'externalRecipients': message['external'],
+            'failed': message['failed'],
+            'verdictAction': message['verdict_action'],
+            'failedVerdicts': message['failed_verdicts'],
+            'forwardMode': forward_mode if prepared else None,
+        })
+
+
 def lambda_handler(event, context):
     """
     Lambda handler for SES incoming email events.
@@ -313,64 +1591,250 @@ def lambda_handler(event, context):
     Returns:
         dict: Response with statusCode and body
     """
-    # Initialize Sentry on first invocation
-    if _secrets_cache is None:
-        init_sentry()
+    # No-op once bootstrap() (or an earlier invocation) has initialized Sentry
+    init_sentry()
+    airtable_stats = airtable_client.get_stats()
 
-    print(f"Received event: {json.dumps(event)}")
+    log.log_event(event)
 
+    # Collect the alias recipients of every record
+    messages = []
     for record in event.get('Records', []):
         ses_data = record.get('ses', {})
         mail_data = ses_data.get('mail', {})
 
-        message_id = mail_data.get('messageId')
-        recipients = mail_data.get('destination', [])
-        source = mail_data.get('source', 'unknown')
+        message = new_message(mail_data.get('messageId'), mail_data.get('source', 'unknown'))
+        messages.append(message)
 
-        print(f"Processing message {message_id} from {source} to {recipients}")
+        # Policy stage: drop or tag mail that failed SES's checks before any I/O
+        action, failed_verdicts = evaluate_verdicts(ses_data.get('receipt', {}))
+        message['verdict_action'] = action
+        message['failed_verdicts'] = failed_verdicts
+        if action == 'drop':
+            log.debug('Dropping message on receipt verdicts', messageId=message['message_id'],
+                      verdicts=failed_verdicts)
+            continue
+        if action == 'tag':
+            message['verdict'] = ', '.join(f"{name}=FAIL" for name in failed_verdicts)
 
+        # receipt.recipients holds the envelope recipients SES accepted for
+        # our domains; mail.destination also lists every external To/Cc
+        recipients = ses_data.get('receipt', {}).get('recipients') or mail_data.get('destination', [])
+        seen = set()
         for recipient in recipients:
-            # Extract alias from recipient address
-            # e.g., "john482@coders.operationcode.org" -> "john482"
-            if '@' not in recipient:
-                print(f"Invalid recipient format: {recipient}")
+            # e.g., "John482+news@coders.operationcode.org" -> "john482"
+            status, alias = parse_alias(recipient)
+            if status == 'external':
+                message['external'] += 1
                 continue
-
-            alias = recipient.split('@')[0].lower()
-            print(f"Looking up alias: {alias}")
-
-            # Query Airtable for the mapping
-            mapping = lookup_alias_in_airtable(alias)
-
-            if not mapping:
-                print(f"No active mapping found for alias: {alias}")
-                # Silently drop emails to unknown aliases
+            if status == 'invalid':
+                log.debug('Invalid recipient format', messageId=message['message_id'],
+                          recipient=log.redact_address(recipient))
+                message['invalid'] += 1
                 continue
+            if alias in seen:
+                continue  # Another tag of an alias this message already goes to
+            seen.add(alias)
+            message['aliases'].append((alias, recipient))
 
-            forward_to = mapping.get('Email')
-            donor_name = mapping.get('Name', 'Member')
+    # Resolve every distinct alias in the event together (index or batched Airtable query)
+    unique_aliases = list(dict.fromkeys(alias for message in messages for alias, _ in message['aliases']))
+    timer = telemetry.PhaseTimer('forward')
+    try:
+        with timer.phase('AliasLookup', get_config()['alias_lookup_mode']):
+            mappings = resolve_aliases(unique_aliases) if unique_aliases else {}
+    except Exception as e:
+        if getattr(e, 'status', None) == 429 and queue_unresolved(messages, e):
+            # Airtable is locking us out; the retry queue resolves the aliases after the lockout
+            log.warning('Alias lookup rate limited, queued recipients for retry', aliases=len(unique_aliases))
+            mappings = {}
+        else:
+            # Fail the invocation so SES retries rather than dropping the mail
+            log.error('Error resolving aliases', aliases=len(unique_aliases), error=str(e))
+            sentry_sdk.capture_exception(e)
+            raise
 
-            if not forward_to:
-                print(f"No Email field in mapping for alias: {alias}")
-                continue
+    # Destinations the bounce handler disabled are dropped before any SES send
+    suppressed = get_suppression_set() if mappings else None
+    for message in messages:
+        for alias, recipient in message['aliases']:
+            destinations = route_destinations(message, recipient, mappings.get(alias), suppressed)
+            if destinations:
+                message['routes'].append((alias, recipient, destinations))
 
-            print(f"Forwarding to: {forward_to} ({donor_name})")
+    # One SES call per alias and chunk of up to SES_MAX_DESTINATIONS addresses
+    for message in messages:
+        message['pending'] = [
+            (recipient, chunk, ledger.entry_key(recipient, chunk))
+            for _, recipient, destinations in message['routes']
+            for chunk in chunk_destinations(destinations)
+        ]
+    failures = deliver_pending(messages, timer)
 
-            try:
-                # Get the raw email from S3
-                raw_email = get_email_from_s3(message_id)
+    # Failed sends go to the retry queue so the other recipients are not held up;
+    # without a queue, fail the invocation so Lambda retries the event
+    queued = False
+    if failures:
+        queued = enqueue_retries([
+            retry_item(message['message_id'], recipient, chunk, 1, error, message['verdict'])
+            for message, recipient, chunk, error in failures
+        ])
+        if queued:
+            for message, _, chunk, _ in failures:
+                message['queued'] += len(chunk)
 
-                # Forward it
-                response = forward_email(raw_email, forward_to, recipient)
-                print(f"Successfully forwarded. SES MessageId: {response.get('MessageId')}")
+    log_forward_summary(timer, messages, len(failures), airtable_stats)
 
-            except Exception as e:
-                error_msg = f"Error forwarding email for alias {alias}: {str(e)}"
-                print(error_msg)
-                sentry_sdk.capture_exception(e)
-                raise
+    if failures and not queued:
+        # Every recipient has been attempted; the ledger makes the retry skip delivered sends
+        raise failures[0][3]
 
     return {
         'statusCode': 200,
         'body': 'Processed'
     }
+
+
+def add_retry_send(message: dict, owners: dict, record_id: str, item: dict, destinations: list[str]):
+    """
+    Add a send of a retry item to its message's pending sends, unless the
+    same send was already added (SQS can deliver an item more than once).
+
+    Args:
+        message: Message dict (see new_message)
+        owners: (message id, ledger entry) -> (SQS record id, item) of the sends added so far
+        record_id: SQS record id of the item
+        item: Retry queue item
+        destinations: Destination addresses of the send
+    """
+    entry = ledger.entry_key(item['recipient'], destinations)
+    if (item['message_id'], entry) in owners:
+        return  # Duplicate delivery of the same send
+    owners[(item['message_id'], entry)] = (record_id, item)
+    message['pending'].append((item['recipient'], destinations, entry))
+
+
+def drain_retry_queue(event, context):
+    """
+    Lambda handler for the retry queue (SQS event source mapping with
+    ReportBatchItemFailures, or LocalRetryQueue.receive_event).
+
+    Items that are not due yet are put back with the remaining delay. Due
+    items are grouped by message so each raw email is downloaded once, sends
+    already in the ledger are skipped, and each failed send is queued again
+    with exponential backoff until RETRY_MAX_ATTEMPTS is reached, after which
+    it is reported to Sentry and dropped. Items queued before their alias was
+    resolved (the lookup was rate limited) are resolved together first; if
+    that fails again they are queued again the same way.
+
+    Args:
+        event: SQS event whose record bodies are retry items (see retry_queue)
+        context: Lambda context object
+
+    Returns:
+        dict: batchItemFailures listing the records SQS should deliver again
+    """
+    init_sentry()
+    config = get_config()
+    timer = telemetry.PhaseTimer('retry')
+    airtable_stats = airtable_client.get_stats()
+    now = time.time()
+
+    batch_failures = []
+    later = []
+    unresolved = []
+    messages = {}
+    owners = {}  # (message id, ledger entry) -> (SQS record id, item)
+    records = event.get('Records', [])
+    suppressed = get_suppression_set() if records else None
+    for record in records:
+        try:
+            item = json.loads(record['body'])
+            recipient, destinations = item['recipient'], item['destinations']
+            due = item['next_attempt_at'] <= now
+        except (KeyError, TypeError, ValueError) as e:
+            log.error('Malformed retry item', recordId=record.get('messageId'), error=str(e))
+            batch_failures.append(record.get('messageId'))
+            continue
+
+        if not due:
+            later.append((record['messageId'], item))
+            continue
+
+        message = messages.get(item['message_id'])
+        if message is None:
+            message = messages[item['message_id']] = new_message(item['message_id'], None)
+            message['verdict'] = item.get('verdict')
+
+        if destinations is None:
+            unresolved.append((record['messageId'], item, message))
+            continue
+
+        # A destination may have started bouncing since the first attempt
+        destinations = drop_suppressed(message, destinations, suppressed)
+        if destinations:
+            add_retry_send(message, owners, record['messageId'], item, destinations)
+
+    if later and not enqueue_retries([item for _, item in later]):
+        batch_failures.extend(record_id for record_id, _ in later)
+
+    # (SQS record id, item, error) of the sends that failed, or whose alias still cannot be resolved
+    failed = []
+    if unresolved:
+        aliases = list(dict.fromkeys(parse_alias(item['recipient'])[1] for _, item, _ in unresolved))
+        try:
+            with timer.phase('AliasLookup', config['alias_lookup_mode']):
+                mappings = resolve_aliases(aliases)
+        except Exception as e:
+            log.warning('Error resolving queued aliases', aliases=len(aliases), error=str(e))
+            failed.extend((record_id, item, e) for record_id, item, _ in unresolved)
+        else:
+            for record_id, item, message in unresolved:
+                destinations = route_destinations(message, item['recipient'],
+                                                  mappings.get(parse_alias(item['recipient'])[1]), suppressed)
+                for chunk in chunk_destinations(destinations):
+                    add_retry_send(message, owners, record_id, item, chunk)
+
+    for message, recipient, destinations, error in deliver_pending(list(messages.values()), timer):
+        record_id, item = owners[(message['message_id'], ledger.entry_key(recipient, destinations))]
+        failed.append((record_id, {**item, 'destinations': destinations}, error))
+
+    retries = []
+    gave_up = 0
+    for record_id, item, error in failed:
+        recipient, destinations = item['recipient'], item['destinations']
+        attempt = item['attempt'] + 1
+        if attempt >= config['retry_max_attempts']:
+            log.error('Giving up on forward after retries', messageId=item['message_id'],
+                      alias=log.redact_address(recipient), destinations=len(destinations or []), attempts=attempt,
+                      error=str(error))
+            sentry_sdk.capture_exception(error)
+            gave_up += 1
+        else:
+            retries.append((record_id, retry_item(item['message_id'], recipient, destinations, attempt, error,
+                                                  item.get('verdict'))))
+
+    if retries and not enqueue_retries([item for _, item in retries]):
+        # SQS redelivers the original records after their visibility timeout
+        batch_failures.extend(record_id for record_id, _ in retries)
+
+    telemetry.emit_summary('Drained retry queue', {
+        **timer.metrics(),
+        'Received': (len(records), 'Count'),
+        'Forwarded': (sum(message['forwarded'] for message in messages.values()), 'Count'),
+        'Sends': (sum(message['sends'] for message in messages.values()), 'Count'),
+        'Skipped': (sum(message['skipped'] for message in messages.values()), 'Count'),
+        'Suppressed': (sum(message['suppressed'] for message in messages.values()), 'Count'),
+        'LedgerErrors': (sum(message['ledger_errors'] for message in messages.values()), 'Count'),
+        'Requeued': (len(later) + len(retries), 'Count'),
+        'GaveUp': (gave_up, 'Count'),
+        'BatchItemFailures': (len(batch_failures), 'Count'),
+        **airtable_client.stats_metrics(airtable_stats),
+    }, {'Service': 'ses_email_forwarder'}, {'queue': 'retry'})
+
+    return {'batchItemFailures': [{'itemIdentifier': record_id} for record_id in batch_failures]}
+
+
+# Run the bootstrap during the Lambda init phase only, not when imported by tests
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+    bootstrap()
@@ -0,0 +1,106 @@
+"""
+Idempotency ledger for forwarded mail.
+
+Every successful SES send is recorded as an entry under the inbound message
+id, so a Lambda retry (or a duplicate SES delivery) of the same message skips
+the sends that already went out and only performs the remaining ones.
+
+Entries identify one send: the alias address it was sent for and the chunk
+of destinations it went to, hashed so no address is stored in the key.
+
+Stores:
+    S3Ledger: empty marker objects in the email bucket, written with a
+        conditional put so concurrent invocations cannot both record a send
+    LocalLedger: in-memory stand-in for tests, benchmarks and local runs
+"""
+import hashlib
+import threading
+
+
+def entry_key(recipient: str, destinations: list[str]) -> str:
+    """
+    Ledger entry for one send.
+
+    Args:
+        recipient: The original recipient address (alias@coders.operationcode.org)
+        destinations: The destination addresses of the send
+
+    Returns:
+        str: Hex digest identifying the (recipient, destinations) pair
+    """
+    material = '\n'.join([recipient.lower(), *sorted(d.lower() for d in destinations)])
+    return hashlib.sha256(material.encode()).hexdigest()[:32]
+
+
+class LocalLedger:
+    """In-memory ledger; entries live as long as the process."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def completed(self, message_id: str) -> set[str]:
+        """Return the entries recorded for a message."""
+        with self._lock:
+            return set(self._entries.get(message_id, ()))
+
+    def mark(self, message_id: str, entry: str) -> bool:
+        """
+        Record a completed send.
+
+        Returns:
+            bool: False if the entry was already recorded
+        """
+        with self._lock:
+            entries = self._entries.setdefault(message_id, set())
+            if entry in entries:
+                return False
+            entries.add(entry)
+            return True
+
+
+class S3Ledger:
+    """
+    Ledger stored as empty objects at <prefix><message id>/<entry> in S3.
+    Reading a message's entries is a single ListObjectsV2 call; markers
+    expire with the bucket's lifecycle rule.
+    """
+
+    def __init__(self, s3_client, bucket: str, prefix: str):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def completed(self, message_id: str) -> set[str]:
+        """Return the entries recorded for a message."""
+        message_prefix = f"{self.prefix}{message_id}/"
+        entries = set()
+        kwargs = {'Bucket': self.bucket, 'Prefix': message_prefix}
+        while True:
+            response = self.s3_client.list_objects_v2(**kwargs)
+            for item in response.get('Contents', []):
+                entries.add(item['Key'][len(message_prefix):])
+            if not response.get('IsTruncated'):
+                return entries
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+    def mark(self, message_id: str, entry: str) -> bool:
+        """
+        Record a completed send with a conditional put (If-None-Match: *).
+
+        Returns:
+            bool: False if the marker already existed
+        """
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket,
+                Key=f"{self.prefix}{message_id}/{entry}",
+                Body=b'',
+                IfNoneMatch='*'
+            )
+            return True
+        except Exception as e:
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if code in ('PreconditionFailed', 'ConditionalRequestConflict', '412'):
+                return False
+            raise
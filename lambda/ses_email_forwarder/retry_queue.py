@@ -0,0 +1,98 @@
+"""
+Retry queue for forwards that failed to send.
+
+Instead of failing the whole invocation (and holding up every other
+recipient until Lambda's retries run out), lambda_handler puts each failed
+send on this queue and returns. handler.drain_retry_queue re-processes the
+queue in batches.
+
+Items are JSON objects:
+    message_id: SES message id (S3 key of the raw email)
+    recipient: The original recipient address (alias@coders.operationcode.org)
+    destinations: Destination addresses of the send, or null when the alias
+        lookup was rate limited and the drain has to resolve the recipient
+    attempt: Number of attempts made so far
+    next_attempt_at: Unix time before which the item should not be retried
+    error: The last error, for logs
+    verdict: X-Forward-Verdict header value if the verdict policy tagged the message
+
+Queues:
+    SQSRetryQueue: an SQS queue; the delay until next_attempt_at is applied
+        with DelaySeconds (capped by SQS at 15 minutes)
+    LocalRetryQueue: in-memory stand-in for tests and local runs
+"""
+import json
+import math
+import threading
+import time
+
+# SQS limits
+SQS_MAX_BATCH = 10
+SQS_MAX_DELAY_SECONDS = 900
+
+
+def retry_delay(attempt: int, base_seconds: int, max_seconds: int) -> int:
+    """Exponential backoff before the next attempt: base, 2x base, 4x base... capped at max_seconds."""
+    return min(max_seconds, base_seconds * 2 ** max(0, attempt - 1))
+
+
+class SQSRetryQueue:
+    """Retry queue backed by SQS."""
+
+    def __init__(self, sqs_client, queue_url: str):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+
+    def enqueue(self, items: list[dict]):
+        """
+        Send items to the queue in batches of 10.
+
+        Raises:
+            RuntimeError: If SQS rejected any item
+        """
+        now = time.time()
+        for start in range(0, len(items), SQS_MAX_BATCH):
+            entries = [
+                {
+                    'Id': str(index),
+                    'MessageBody': json.dumps(item, separators=(',', ':')),
+                    'DelaySeconds': min(SQS_MAX_DELAY_SECONDS, max(0, math.ceil(item['next_attempt_at'] - now)))
+                }
+                for index, item in enumerate(items[start:start + SQS_MAX_BATCH])
+            ]
+            response = self.sqs_client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+            if response.get('Failed'):
+                codes = sorted({failure.get('Code') for failure in response['Failed']})
+                raise RuntimeError(f"SQS rejected {len(response['Failed'])} retry items: {', '.join(codes)}")
+
+
+class LocalRetryQueue:
+    """In-memory retry queue; items live as long as the process."""
+
+    def __init__(self):
+        self.items = []
+        self._lock = threading.Lock()
+        self._received = 0
+
+    def enqueue(self, items: list[dict]):
+        """Append items to the queue (copied, as SQS would serialize them)."""
+        with self._lock:
+            self.items.extend(json.loads(json.dumps(item)) for item in items)
+
+    def receive_event(self, max_items: int = SQS_MAX_BATCH) -> dict:
+        """
+        Remove up to max_items and wrap them in an SQS-shaped Lambda event
+        for handler.drain_retry_queue. Delays are not applied here; the
+        drain re-queues items that are not due yet.
+        """
+        with self._lock:
+            batch, self.items = self.items[:max_items], self.items[max_items:]
+            records = []
+            for item in batch:
+                self._received += 1
+                records.append({
+                    'messageId': f"local-{self._received}",
+                    'eventSource': 'aws:sqs',
+                    'body': json.dumps(item)
+                })
+        return {'Records': records}
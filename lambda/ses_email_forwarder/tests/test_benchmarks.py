@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+from email import policy
+from email.parser import BytesParser
+
+# Add parent directory, the shared layer and the benchmarks to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared', 'python')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+import bench_forward
+import corpus
+import handler
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Smoke test so the benchmark suite keeps working as the handler changes."""
+
+    def setUp(self):
+        os.environ['FORWARD_FROM_EMAIL'] = 'noreply@coders.operationcode.org'
+        handler._config_cache = None
+        self.addCleanup(os.environ.pop, 'FORWARD_MODE', None)
+        self.addCleanup(setattr, handler, '_config_cache', None)
+
+    def test_corpus_shapes_parse(self):
+        """Test that every corpus shape is a well-formed message"""
+        for shape, raw in corpus.build_corpus(scale=0.01).items():
+            msg = BytesParser(policy=policy.default).parsebytes(raw)
+            self.assertEqual(msg['To'], corpus.ALIAS, shape)
+            self.assertEqual(msg.defects, [], shape)
+
+    def test_run_case_reports_metrics(self):
+        """Test that a benchmark case forwards the message and reports every metric"""
+        raw = corpus.non_utf8(scale=0.01)
+
+        for mode in ('rebuild', 'passthrough'):
+            result = bench_forward.run_case('non_utf8', raw, mode, iterations=2, time_budget=5, min_iterations=1)
+
+            self.assertEqual(result['mode'], mode)
+            self.assertEqual(result['iterations'], 2)
+            self.assertGreater(result['forwarded_bytes'], 0)
+            self.assertGreater(result['peak_memory_bytes'], 0)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(bench_forward.percentile(values, 50), 50.0)
+        self.assertEqual(bench_forward.percentile(values, 99), 99.0)
+        self.assertEqual(bench_forward.percentile([], 50), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,30 @@
 import json
 import os
+import shutil
 import sys
+import tempfile
+import threading
 import unittest
 from unittest.mock import Mock, patch, MagicMock
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email import policy
+from email.parser import BytesParser
 import base64
 
-# Add parent directory to path for imports
+# Add parent directory and the shared layer to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'shared', 'python')))
 
+import airtable_client
 import handler
+import log
+import suppression
+
+
+def resolve_all_to(mapping):
+    """Side effect for lookup_aliases_in_airtable resolving every alias to mapping."""
+    return lambda aliases: {alias: mapping for alias in aliases}
 
 
 class TestLambdaHandler(unittest.TestCase):
@@ -31,12 +45,33 @@ class TestLambdaHandler(unittest.TestCase):
         handler._s3_client = None
         handler._ses_client = None
         handler._secrets_client = None
+        handler._secrets_loaded_at = 0.0
+        handler._sentry_initialized = False
+        handler._alias_cache.clear()
+        handler._alias_index = None
+        handler._alias_index_record_aliases = {}
+        handler._ledger = None
+        handler._retry_queue = None
+        handler._suppression = None
+        handler._suppression_etag = None
+        handler._suppression_checked_at = 0.0
+        log._settings = None
+        self.addCleanup(setattr, log, '_settings', None)
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
 
         # Load sample SES event
         fixture_path = os.path.join(os.path.dirname(__file__), 'fixtures', 'sample_ses_event.json')
         with open(fixture_path, 'r') as f:
             self.sample_event = json.load(f)
 
+    def set_recipients(self, recipients):
+        """Address the sample event to the given recipients."""
+        ses = self.sample_event['Records'][0]['ses']
+        ses['mail']['destination'] = list(recipients)
+        ses['receipt']['recipients'] = list(recipients)
+
     def tearDown(self):
         """Clean up after tests."""
         handler._secrets_cache = None
@@ -44,6 +79,13 @@ class TestLambdaHandler(unittest.TestCase):
         handler._s3_client = None
         handler._ses_client = None
         handler._secrets_client = None
+        handler._secrets_loaded_at = 0.0
+        handler._sentry_initialized = False
+        handler._alias_cache.clear()
+        handler._alias_index = None
+        handler._alias_index_record_aliases = {}
+        handler._ledger = None
+        handler._retry_queue = None
 
     def test_get_airtable_credentials_caching(self):
         """Test that credentials are cached after first retrieval."""
@@ -72,75 +114,355 @@ class TestLambdaHandler(unittest.TestCase):
             self.assertEqual(creds1['airtable_api_key'], 'test_key')
             self.assertEqual(creds1, creds2)
 
-    @patch('handler.urllib.request.urlopen')
-    def test_lookup_alias_active(self, mock_urlopen):
+    @patch('handler.sentry_sdk')
+    @patch('handler.time.monotonic')
+    def test_get_airtable_credentials_refreshes_after_ttl(self, mock_monotonic, mock_sentry_sdk):
+        """Test that the secret is re-fetched after its TTL and kept if the refresh fails."""
+        os.environ['SECRET_TTL_SECONDS'] = '100'
+        self.addCleanup(os.environ.pop, 'SECRET_TTL_SECONDS')
+
+        mock_secrets_client = Mock()
+        mock_secrets_client.get_secret_value.side_effect = [
+            {'SecretString': json.dumps({'airtable_api_key': 'old_key'})},
+            {'SecretString': json.dumps({'airtable_api_key': 'new_key'})},
+            Exception("Secrets Manager unavailable"),
+        ]
+
+        with patch.object(handler, 'get_secrets_client', return_value=mock_secrets_client):
+            mock_monotonic.return_value = 1000.0
+            self.assertEqual(handler.get_airtable_credentials()['airtable_api_key'], 'old_key')
+
+            mock_monotonic.return_value = 1050.0
+            self.assertEqual(handler.get_airtable_credentials()['airtable_api_key'], 'old_key')
+
+            mock_monotonic.return_value = 1100.0
+            self.assertEqual(handler.get_airtable_credentials()['airtable_api_key'], 'new_key')
+
+            # A failed refresh keeps serving the stale secret until the next TTL window
+            mock_monotonic.return_value = 1200.0
+            self.assertEqual(handler.get_airtable_credentials()['airtable_api_key'], 'new_key')
+            mock_monotonic.return_value = 1250.0
+            self.assertEqual(handler.get_airtable_credentials()['airtable_api_key'], 'new_key')
+
+        self.assertEqual(mock_secrets_client.get_secret_value.call_count, 3)
+        mock_sentry_sdk.capture_exception.assert_called_once()
+
+    @patch('handler.sentry_sdk')
+    @patch('handler.get_airtable_credentials')
+    def test_init_sentry_runs_once(self, mock_credentials, mock_sentry_sdk):
+        """Test that Sentry is initialized only once per container."""
+        mock_credentials.return_value = {'sentry_dsn': 'https://test@test.ingest.sentry.io/test'}
+
+        handler.init_sentry()
+        handler.init_sentry()
+
+        mock_sentry_sdk.init.assert_called_once()
+
+    @patch('handler.init_sentry')
+    @patch('handler.get_ses_client')
+    @patch('handler.get_s3_client')
+    @patch('handler.get_airtable_credentials')
+    def test_bootstrap_prefetches_and_tolerates_failures(self, mock_credentials, mock_s3, mock_ses, mock_sentry):
+        """Test that bootstrap warms the secret and clients and never raises."""
+        mock_credentials.side_effect = Exception("Secrets Manager unavailable")
+
+        handler.bootstrap()
+
+        mock_credentials.assert_called_once()
+        mock_s3.assert_called_once()
+        mock_ses.assert_called_once()
+        mock_sentry.assert_called_once()
+
+    @patch('handler.get_airtable_client')
+    def test_lookup_alias_active(self, mock_get_client):
         """Test looking up an active alias in Airtable."""
-        # Mock Secrets Manager
-        with patch.object(handler, 'get_airtable_credentials', return_value={
-            'airtable_api_key': 'test_key',
-            'airtable_base_id': 'test_base',
-            'airtable_table_name': 'Email Aliases'
-        }):
-            # Mock Airtable API response
-            mock_response = MagicMock()
-            mock_response.read.return_value = json.dumps({
-                'records': [{
-                    'id': 'rec123',
-                    'fields': {
-                        'Alias': 'testuser',
-                        'Email': 'test@example.com',
-                        'Name': 'Test User',
-                        'Status': 'active'
-                    }
-                }]
-            }).encode()
-            mock_response.__enter__.return_value = mock_response
-            mock_urlopen.return_value = mock_response
+        # Mock Airtable API response
+        mock_get_client.return_value.list_records.return_value = iter([{
+            'id': 'rec123',
+            'fields': {
+                'Alias': 'testuser',
+                'Email': 'test@example.com',
+                'Name': 'Test User',
+                'Status': 'active'
+            }
+        }])
 
-            result = handler.lookup_alias_in_airtable('testuser')
+        result = handler.lookup_aliases_in_airtable(['testuser'])['testuser']
 
-            self.assertIsNotNone(result)
-            self.assertEqual(result['Email'], 'test@example.com')
-            self.assertEqual(result['Name'], 'Test User')
+        self.assertIsNotNone(result)
+        self.assertEqual(result['Email'], 'test@example.com')
+        self.assertEqual(result['Name'], 'Test User')
+        formula = mock_get_client.return_value.list_records.call_args[0][0]
+        self.assertEqual(formula, "AND({Status} = 'active', OR({Alias} = 'testuser'))")
 
-    @patch('handler.urllib.request.urlopen')
-    def test_lookup_alias_not_found(self, mock_urlopen):
+    @patch('handler.get_airtable_client')
+    def test_lookup_alias_not_found(self, mock_get_client):
         """Test looking up a non-existent alias."""
-        with patch.object(handler, 'get_airtable_credentials', return_value={
-            'airtable_api_key': 'test_key',
-            'airtable_base_id': 'test_base',
-            'airtable_table_name': 'Email Aliases'
-        }):
-            # Mock empty Airtable response
-            mock_response = MagicMock()
-            mock_response.read.return_value = json.dumps({'records': []}).encode()
-            mock_response.__enter__.return_value = mock_response
-            mock_urlopen.return_value = mock_response
+        # Mock empty Airtable response
+        mock_get_client.return_value.list_records.return_value = iter([])
 
-            result = handler.lookup_alias_in_airtable('nonexistent')
+        result = handler.lookup_aliases_in_airtable(['nonexistent'])['nonexistent']
 
-            self.assertIsNone(result)
+        self.assertIsNone(result)
 
-    def test_get_email_from_s3(self):
-        """Test retrieving email from S3."""
-        mock_email_content = b"From: sender@example.com\nTo: test@coders.operationcode.org\n\nTest body"
+    @patch('handler.get_airtable_client')
+    def test_lookup_alias_api_error_not_cached(self, mock_get_client):
+        """Test that Airtable errors propagate without caching the miss."""
+        mock_get_client.return_value.list_records.side_effect = airtable_client.AirtableError(
+            503, 'unavailable', 'GET', '/v0/base/table'
+        )
 
-        mock_response = {
-            'Body': MagicMock()
-        }
-        mock_response['Body'].read.return_value = mock_email_content
+        with self.assertRaises(airtable_client.AirtableError):
+            handler.lookup_aliases_in_airtable(['testuser'])['testuser']
+        self.assertEqual(handler.get_cached_alias('testuser'), (False, None))
+
+    @patch('handler.get_airtable_client')
+    def test_lookup_aliases_batches_into_one_request(self, mock_get_client):
+        """Test that several aliases are resolved with a single OR() query."""
+        mock_list = mock_get_client.return_value.list_records
+        mock_list.return_value = iter([
+            {'id': 'rec1', 'fields': {'Alias': 'alice', 'Email': 'alice@example.com', 'Status': 'active'}},
+            {'id': 'rec2', 'fields': {'Alias': "o'brien", 'Email': 'ob@example.com', 'Status': 'active'}}
+        ])
+
+        result = handler.lookup_aliases_in_airtable(['alice', "o'brien", 'nobody', 'alice'])
+
+        self.assertEqual(mock_list.call_count, 1)
+        formula, fields = mock_list.call_args[0]
+        self.assertEqual(
+            formula,
+            "AND({Status} = 'active', OR({Alias} = 'alice', {Alias} = 'o\\'brien', {Alias} = 'nobody'))"
+        )
+        self.assertEqual(fields, ['Alias', 'Email', 'Name', 'Status'])
+        self.assertEqual(result['alice']['Email'], 'alice@example.com')
+        self.assertEqual(result["o'brien"]['Email'], 'ob@example.com')
+        self.assertIsNone(result['nobody'])
+
+        # All three results are now cached
+        handler.lookup_aliases_in_airtable(['alice', "o'brien", 'nobody'])
+        self.assertEqual(mock_list.call_count, 1)
+
+    @patch('handler.get_airtable_client')
+    def test_lookup_alias_uses_cache(self, mock_get_client):
+        """Test that repeated lookups of the same alias hit Airtable once."""
+        mock_request = mock_get_client.return_value.list_records
+        mock_request.return_value = iter([{'id': 'rec123', 'fields': {'Alias': 'testuser', 'Email': 'test@example.com'}}])
+
+        first = handler.lookup_aliases_in_airtable(['testuser'])['testuser']
+        second = handler.lookup_aliases_in_airtable(['testuser'])['testuser']
 
+        self.assertEqual(first, second)
+        self.assertEqual(mock_request.call_count, 1)
+
+    @patch('handler.get_airtable_client')
+    def test_lookup_alias_negative_cache_expires(self, mock_get_client):
+        """Test that misses are cached with the shorter negative TTL."""
+        os.environ['ALIAS_CACHE_TTL_SECONDS'] = '300'
+        os.environ['ALIAS_CACHE_NEGATIVE_TTL_SECONDS'] = '10'
+        self.addCleanup(os.environ.pop, 'ALIAS_CACHE_TTL_SECONDS')
+        self.addCleanup(os.environ.pop, 'ALIAS_CACHE_NEGATIVE_TTL_SECONDS')
+
+        mock_request = mock_get_client.return_value.list_records
+        mock_request.side_effect = lambda *args: iter([])
+
+        with patch('handler.time.monotonic') as mock_monotonic:
+            mock_monotonic.return_value = 1000.0
+            self.assertIsNone(handler.lookup_aliases_in_airtable(['nonexistent'])['nonexistent'])
+            mock_monotonic.return_value = 1005.0
+            self.assertIsNone(handler.lookup_aliases_in_airtable(['nonexistent'])['nonexistent'])
+            self.assertEqual(mock_request.call_count, 1)
+
+            # Past the negative TTL the alias is looked up again
+            mock_monotonic.return_value = 1011.0
+            handler.lookup_aliases_in_airtable(['nonexistent'])['nonexistent']
+            self.assertEqual(mock_request.call_count, 2)
+
+    def test_alias_cache_evicts_least_recently_used(self):
+        """Test that the cache is bounded by ALIAS_CACHE_MAX_SIZE."""
+        os.environ['ALIAS_CACHE_MAX_SIZE'] = '2'
+        self.addCleanup(os.environ.pop, 'ALIAS_CACHE_MAX_SIZE')
+
+        handler.cache_alias('alice', {'Email': 'alice@example.com'})
+        handler.cache_alias('bob', {'Email': 'bob@example.com'})
+        handler.get_cached_alias('alice')  # alice is now most recently used
+        handler.cache_alias('carol', {'Email': 'carol@example.com'})
+
+        self.assertEqual(handler.get_cached_alias('alice'), (True, {'Email': 'alice@example.com'}))
+        self.assertEqual(handler.get_cached_alias('bob'), (False, None))
+        self.assertEqual(handler.get_cached_alias('carol'), (True, {'Email': 'carol@example.com'}))
+
+    @patch('handler.save_alias_snapshot')
+    @patch('handler.load_alias_snapshot', return_value=False)
+    @patch('handler.list_airtable_records')
+    def test_alias_index_load_and_incremental_refresh(self, mock_list, mock_load_snapshot, mock_save_snapshot):
+        """Test the alias index loads active aliases and applies incremental changes."""
+        os.environ['ALIAS_LOOKUP_MODE'] = 'index'
+        os.environ['ALIAS_INDEX_REFRESH_SECONDS'] = '60'
+        self.addCleanup(os.environ.pop, 'ALIAS_LOOKUP_MODE')
+        self.addCleanup(os.environ.pop, 'ALIAS_INDEX_REFRESH_SECONDS')
+
+        mock_list.return_value = iter([
+            {'id': 'rec1', 'fields': {'Alias': 'TestUser', 'Email': 'test@example.com', 'Status': 'active'}},
+            {'id': 'rec2', 'fields': {'Alias': 'other', 'Email': 'other@example.com', 'Status': 'active'}}
+        ])
+
+        with patch('handler.time.time', return_value=1000.0):
+            self.assertEqual(handler.resolve_aliases(['testuser'])['testuser']['Email'], 'test@example.com')
+            # Within the refresh interval: no further Airtable calls
+            self.assertEqual(handler.resolve_aliases(['other'])['other']['Email'], 'other@example.com')
+        self.assertEqual(mock_list.call_count, 1)
+        self.assertEqual(mock_list.call_args[0][1], ['Alias', 'Email', 'Name', 'Status'])
+
+        # rec1 is renamed, rec2 is deactivated
+        mock_list.return_value = iter([
+            {'id': 'rec1', 'fields': {'Alias': 'renamed', 'Email': 'test@example.com', 'Status': 'active'}},
+            {'id': 'rec2', 'fields': {'Alias': 'other', 'Email': 'other@example.com', 'Status': 'inactive'}}
+        ])
+        with patch('handler.time.time', return_value=1061.0):
+            self.assertIsNone(handler.resolve_aliases(['testuser'])['testuser'])
+            self.assertIsNone(handler.resolve_aliases(['other'])['other'])
+            self.assertEqual(handler.resolve_aliases(['renamed'])['renamed']['Email'], 'test@example.com')
+        self.assertEqual(mock_list.call_count, 2)
+        self.assertIn('LAST_MODIFIED_TIME()', mock_list.call_args[0][0])
+
+    @patch('handler.load_alias_snapshot', return_value=False)
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.list_airtable_records')
+    def test_alias_index_falls_back_to_query(self, mock_list, mock_lookup, mock_load_snapshot):
+        """Test that a failed index load falls back to per-alias lookups."""
+        os.environ['ALIAS_LOOKUP_MODE'] = 'index'
+        self.addCleanup(os.environ.pop, 'ALIAS_LOOKUP_MODE')
+
+        mock_list.side_effect = Exception("Airtable unavailable")
+        mock_lookup.return_value = {'testuser': {'Email': 'test@example.com'}}
+
+        with patch('handler.sentry_sdk'):
+            result = handler.resolve_aliases(['testuser'])['testuser']
+
+        self.assertEqual(result['Email'], 'test@example.com')
+        mock_lookup.assert_called_once_with(['testuser'])
+
+    @patch('handler.list_airtable_records')
+    def test_alias_snapshot_round_trip_skips_airtable(self, mock_list):
+        """Test that a cold start with a fresh snapshot in S3 routes without Airtable."""
+        os.environ['ALIAS_LOOKUP_MODE'] = 'index'
+        os.environ['ALIAS_SNAPSHOT_PATH'] = os.path.join(self.tmp_dir, 'missing.json.gz')
+        self.addCleanup(os.environ.pop, 'ALIAS_LOOKUP_MODE')
+        self.addCleanup(os.environ.pop, 'ALIAS_SNAPSHOT_PATH')
+
+        # Build a snapshot from a loaded index
+        handler._alias_index = {'testuser': {'Alias': 'testuser', 'Email': 'test@example.com', 'Name': 'Test User'}}
+        handler._alias_index_record_aliases = {'rec1': 'testuser'}
+        handler._alias_index_loaded_at = handler._alias_index_refreshed_at = 1000.0
+        handler._alias_index_synced_through = '2026-01-28T12:00:00.000Z'
+        snapshot = handler.serialize_alias_snapshot()
+
+        # Simulate a cold start
+        handler._alias_index = None
+        handler._alias_index_record_aliases = {}
         mock_s3_client = Mock()
-        mock_s3_client.get_object.return_value = mock_response
+        mock_s3_client.get_object.return_value = {'Body': MagicMock(read=Mock(return_value=snapshot))}
+
+        with patch.object(handler, 'get_s3_client', return_value=mock_s3_client), \
+                patch('handler.time.time', return_value=1100.0):
+            mapping = handler.resolve_aliases(['testuser'])['testuser']
+
+        self.assertEqual(mapping['Email'], 'test@example.com')
+        self.assertEqual(mapping['Name'], 'Test User')
+        self.assertEqual(handler._alias_index_synced_through, '2026-01-28T12:00:00.000Z')
+        mock_s3_client.get_object.assert_called_once_with(Bucket='test-bucket', Key='alias-index/snapshot.json.gz')
+        mock_list.assert_not_called()
+
+    def test_alias_snapshot_rejects_stale_or_unknown_version(self):
+        """Test that stale snapshots and other format versions are ignored."""
+        handler._alias_index = {}
+        handler._alias_index_record_aliases = {}
+        handler._alias_index_loaded_at = handler._alias_index_refreshed_at = 1000.0
+        handler._alias_index_synced_through = '2026-01-28T12:00:00.000Z'
+        snapshot = handler.serialize_alias_snapshot()
+
+        with patch('handler.time.time', return_value=1000.0 + 86400 + 1):
+            self.assertFalse(handler.apply_alias_snapshot(snapshot))
+
+        with patch.object(handler, 'ALIAS_SNAPSHOT_VERSION', 2), patch('handler.time.time', return_value=1001.0):
+            self.assertFalse(handler.apply_alias_snapshot(snapshot))
+
+    def _mock_s3_stream(self, content):
+        """Build an S3 client mock whose body streams content in small chunks."""
+        body = MagicMock()
+        body.iter_chunks.side_effect = lambda chunk_size: (
+            content[i:i + 7] for i in range(0, len(content), 7)
+        )
+        mock_s3_client = Mock()
+        mock_s3_client.get_object.return_value = {'Body': body}
+        return mock_s3_client
+
+    def test_open_email_from_s3_spools_in_chunks(self):
+        """Test that the S3 body is streamed into a spool without calling read()."""
+        content = b"From: sender@example.com\nSubject: Test\n\nTest body"
+        mock_s3_client = self._mock_s3_stream(content)
 
         with patch.object(handler, 'get_s3_client', return_value=mock_s3_client):
-            result = handler.get_email_from_s3('test-message-id')
+            spool, size = handler.open_email_from_s3('test-message-id')
 
-            self.assertEqual(result, mock_email_content)
-            mock_s3_client.get_object.assert_called_once_with(
-                Bucket='test-bucket',
-                Key='test-message-id'
-            )
+        with spool:
+            self.assertEqual(size, len(content))
+            self.assertEqual(spool.read(), content)
+        mock_s3_client.get_object.return_value['Body'].read.assert_not_called()
+
+    def test_fetch_and_prepare_large_email_uses_passthrough(self):
+        """Test that messages spilled to /tmp are memory-mapped and passed through."""
+        os.environ['EMAIL_SPOOL_THRESHOLD_BYTES'] = '64'
+        os.environ['EMAIL_SPOOL_DIR'] = self.tmp_dir
+        self.addCleanup(os.environ.pop, 'EMAIL_SPOOL_THRESHOLD_BYTES')
+        self.addCleanup(os.environ.pop, 'EMAIL_SPOOL_DIR')
+
+        body = b'x' * 500 + b'\r\n'
+        content = b'From: sender@example.com\r\nSubject: Big\r\n\r\n' + body
+        mock_s3_client = self._mock_s3_stream(content)
+
+        with patch.object(handler, 'get_s3_client', return_value=mock_s3_client):
+            prepared = handler.fetch_and_prepare_forward('test-message-id')
+
+        self.assertFalse(prepared['set_to'])
+        rendered = handler.render_forward(prepared, 'testuser@coders.operationcode.org')
+        self.assertTrue(rendered.endswith(b'\r\n\r\n' + body))
+        self.assertIn(b'Reply-To: sender@example.com\r\n', rendered)
+
+    def test_fetch_and_prepare_small_email_rebuilds(self):
+        """Test that small messages are parsed incrementally and rebuilt by default."""
+        original_msg = MIMEText('Test email body', 'plain')
+        original_msg['From'] = 'sender@example.com'
+        original_msg['Subject'] = 'Test Subject'
+        mock_s3_client = self._mock_s3_stream(original_msg.as_bytes())
+
+        with patch.object(handler, 'get_s3_client', return_value=mock_s3_client):
+            prepared = handler.fetch_and_prepare_forward('test-message-id')
+
+        self.assertTrue(prepared['set_to'])
+        rendered = BytesParser(policy=policy.default).parsebytes(
+            handler.render_forward(prepared, 'testuser@coders.operationcode.org')
+        )
+        self.assertEqual(rendered['Subject'], 'Test Subject')
+        self.assertIn('Test email body', rendered.get_body(('plain',)).get_content())
+
+    def test_fetch_and_prepare_records_phase_timings(self):
+        """Test that S3 fetch and parse/build are timed along with size and attachment count."""
+        msg = MIMEMultipart()
+        msg['From'] = 'sender@example.com'
+        msg.attach(MIMEText('Email body', 'plain'))
+        attachment = MIMEText('attachment content', 'plain')
+        attachment.add_header('Content-Disposition', 'attachment', filename='test.txt')
+        msg.attach(attachment)
+        raw = msg.as_bytes()
+        mock_s3_client = self._mock_s3_stream(raw)
+
+        with patch.object(handler, 'get_s3_client', return_value=mock_s3_client):
+            prepared = handler.fetch_and_prepare_forward('test-message-id')
+
+        self.assertEqual(prepared['size'], len(raw))
+        self.assertEqual(prepared['attachments'], 1)
+        self.assertEqual(set(prepared['timer'].metrics()), {'S3FetchMs', 'ParseBuildMs'})
 
     def test_forward_email_simple(self):
         """Test forwarding a simple text email."""
@@ -193,79 +515,802 @@ class TestLambdaHandler(unittest.TestCase):
 
             self.assertEqual(result['MessageId'], 'ses-msg-456')
 
+    def test_parse_destinations_accepts_lists_and_separated_strings(self):
+        """Test that shared aliases may list several addresses in their Email field."""
+        self.assertEqual(handler.parse_destinations('a@example.com'), ['a@example.com'])
+        self.assertEqual(
+            handler.parse_destinations(' a@example.com, b@example.com;\nA@example.com,, '),
+            ['a@example.com', 'b@example.com']
+        )
+        self.assertEqual(handler.parse_destinations(['a@example.com', '', 'c@example.com']),
+                         ['a@example.com', 'c@example.com'])
+        self.assertEqual(handler.parse_destinations(None), [])
+
+    def test_forward_email_to_several_destinations_in_one_send(self):
+        """Test that a multi-destination forward is a single SES call addressed to all of them."""
+        original_msg = MIMEText('Test email body', 'plain')
+        original_msg['From'] = 'sender@example.com'
+        original_msg['Subject'] = 'Test Subject'
+
+        mock_ses_client = Mock()
+        mock_ses_client.send_raw_email.return_value = {'MessageId': 'ses-msg-789'}
+        destinations = ['a@example.com', 'b@example.com']
+
+        with patch.object(handler, 'get_ses_client', return_value=mock_ses_client):
+            handler.forward_email(original_msg.as_bytes(), destinations, 'team@coders.operationcode.org')
+
+        call_args = mock_ses_client.send_raw_email.call_args[1]
+        self.assertEqual(call_args['Destinations'], destinations)
+        sent = BytesParser(policy=policy.default).parsebytes(call_args['RawMessage']['Data'])
+        self.assertEqual(sent['To'], 'team@coders.operationcode.org')
+        self.assertNotIn(b'a@example.com', call_args['RawMessage']['Data'])
+
+        with self.assertRaises(ValueError):
+            handler.send_forward({}, [f'user{i}@example.com' for i in range(51)], 'team@coders.operationcode.org')
+
+    def test_render_forward_adds_per_alias_headers(self):
+        """Test that one prepared message renders correct headers per alias, addressed To the alias."""
+        original_msg = MIMEText('Test email body', 'plain')
+        original_msg['From'] = 'sender@example.com'
+        original_msg['Subject'] = 'Test Subject'
+
+        prepared = handler.prepare_forward(original_msg.as_bytes())
+
+        for recipient in ['alice@coders.operationcode.org', 'bob@coders.operationcode.org']:
+            rendered = BytesParser(policy=policy.default).parsebytes(
+                handler.render_forward(prepared, recipient)
+            )
+            self.assertEqual(rendered['To'], recipient)
+            self.assertEqual(rendered['X-Original-To'], recipient)
+            self.assertEqual(rendered['X-Forwarded-For'], recipient)
+            self.assertEqual(rendered['From'], 'noreply@coders.operationcode.org')
+            self.assertEqual(rendered['Reply-To'], 'sender@example.com')
+            self.assertEqual(rendered['Subject'], 'Test Subject')
+            self.assertIn('Test email body', rendered.get_body(('plain',)).get_content())
+
+    def test_passthrough_forward_preserves_body_bytes(self):
+        """Test that passthrough mode rewrites top-level headers and keeps the body byte-for-byte."""
+        os.environ['FORWARD_MODE'] = 'passthrough'
+        self.addCleanup(os.environ.pop, 'FORWARD_MODE')
+
+        body = (
+            b'--outer\r\n'
+            b'Content-Type: multipart/related; boundary="inner"\r\n\r\n'
+            b'--inner\r\nContent-Type: text/html\r\n\r\n<img src="cid:logo">\r\n'
+            b'--inner\r\nContent-Type: image/png\r\nContent-ID: <logo>\r\n'
+            b'Content-Transfer-Encoding: base64\r\n\r\niVBORw0KGgo=\r\n--inner--\r\n'
+            b'--outer--\r\n'
+        )
+        raw_email = (
+            b'DKIM-Signature: v=1; a=rsa-sha256; d=example.com;\r\n\tb=abc123\r\n'
+            b'From: Sender <sender@example.com>\r\n'
+            b'To: testuser@coders.operationcode.org\r\n'
+            b'Subject: =?utf-8?q?Caf=C3=A9?=\r\n'
+            b'Content-Type: multipart/mixed; boundary="outer"\r\n'
+            b'\r\n' + body
+        )
+
+        prepared = handler.prepare_forward(raw_email)
+        self.assertIsInstance(prepared['body'], memoryview)
+
+        rendered = handler.render_forward(prepared, 'testuser@coders.operationcode.org')
+        self.assertTrue(rendered.endswith(b'\r\n\r\n' + body))
+
+        msg = BytesParser(policy=policy.default).parsebytes(rendered)
+        self.assertEqual(msg['From'], 'noreply@coders.operationcode.org')
+        self.assertEqual(msg['Reply-To'], 'Sender <sender@example.com>')
+        self.assertEqual(msg['X-Original-From'], 'Sender <sender@example.com>')
+        self.assertEqual(msg['X-Original-To'], 'testuser@coders.operationcode.org')
+        self.assertEqual(msg['To'], 'testuser@coders.operationcode.org')
+        self.assertEqual(msg['Subject'], 'Café')
+        self.assertIsNone(msg['DKIM-Signature'])
+        self.assertEqual(len(msg.get_all('From')), 1)
+
+    def test_passthrough_forward_lf_only_message(self):
+        """Test passthrough mode with LF line endings and no body."""
+        os.environ['FORWARD_MODE'] = 'passthrough'
+        self.addCleanup(os.environ.pop, 'FORWARD_MODE')
+
+        prepared = handler.prepare_forward(b'From: sender@example.com\nSubject: Hi\n\nBody\n')
+        rendered = handler.render_forward(prepared, 'testuser@coders.operationcode.org')
+
+        self.assertNotIn(b'\r\n', rendered)
+        self.assertTrue(rendered.endswith(b'Subject: Hi\n\nBody\n'))
+        self.assertIn(b'Reply-To: sender@example.com\n', rendered)
+
     @patch('handler.init_sentry')
-    @patch('handler.get_email_from_s3')
-    @patch('handler.forward_email')
-    @patch('handler.lookup_alias_in_airtable')
-    def test_lambda_handler_success(self, mock_lookup, mock_forward, mock_get_email, mock_sentry):
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    def test_lambda_handler_success(self, mock_lookup, mock_send, mock_fetch, mock_sentry):
         """Test successful Lambda handler execution."""
         # Mock Airtable lookup
-        mock_lookup.return_value = {
+        mock_lookup.side_effect = resolve_all_to({
             'Email': 'recipient@example.com',
             'Name': 'Test User',
             'Status': 'active'
-        }
+        })
 
         # Mock S3 email retrieval
-        mock_get_email.return_value = b"From: sender@example.com\nSubject: Test\n\nBody"
+        mock_fetch.return_value = {'body': b'prepared'}
 
         # Mock SES send
-        mock_forward.return_value = {'MessageId': 'test-msg-id'}
+        mock_send.return_value = {'MessageId': 'test-msg-id'}
 
         result = handler.lambda_handler(self.sample_event, None)
 
         self.assertEqual(result['statusCode'], 200)
         self.assertEqual(result['body'], 'Processed')
-        mock_lookup.assert_called_once_with('testuser')
-        mock_get_email.assert_called_once()
-        mock_forward.assert_called_once()
+        mock_lookup.assert_called_once_with(['testuser'])
+        mock_fetch.assert_called_once_with('abc123def456')
+        mock_send.assert_called_once_with(
+            {'body': b'prepared'}, ['recipient@example.com'], 'testuser@coders.operationcode.org'
+        )
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.telemetry.emit_metrics')
+    def test_lambda_handler_emits_phase_metrics(self, mock_emit, mock_lookup, mock_send, mock_fetch, mock_sentry):
+        """Test that the invocation and each forwarded message emit EMF timings."""
+        resolve = resolve_all_to({'Email': 'recipient@example.com', 'Status': 'active'})
+
+        def lookup(aliases):
+            pool = airtable_client.get_pool()
+            pool.count('requests', 2)
+            pool.count('connections_reused')
+            return resolve(aliases)
+
+        airtable_client.get_pool().count('requests', 5)  # An earlier invocation of the container
+        mock_lookup.side_effect = lookup
+        mock_fetch.return_value = {'body': b'prepared', 'size': 2048, 'attachments': 3}
+        mock_send.return_value = {'MessageId': 'test-msg-id'}
+
+        handler.lambda_handler(self.sample_event, None)
+
+        self.assertEqual(mock_emit.call_count, 2)
+        invocation_metrics = mock_emit.call_args_list[0][0][0]
+        self.assertIn('AliasLookupMs', invocation_metrics)
+        self.assertEqual(invocation_metrics['Forwards'], (1, 'Count'))
+        self.assertEqual(invocation_metrics['AirtableRequests'], (2, 'Count'))
+        self.assertEqual(invocation_metrics['AirtableConnectionsReused'], (1, 'Count'))
+        self.assertEqual(invocation_metrics['AirtableThrottled'], (0, 'Count'))
+
+        message_metrics, dimensions, properties = mock_emit.call_args_list[1][0]
+        self.assertIn('SesSendMs', message_metrics)
+        self.assertEqual(message_metrics['MessageSize'], (2048, 'Bytes'))
+        self.assertEqual(message_metrics['Attachments'], (3, 'Count'))
+        self.assertEqual(message_metrics['Forwarded'], (1, 'Count'))
+        self.assertEqual(dimensions, {'Service': 'ses_email_forwarder'})
+        self.assertEqual(properties['messageId'], 'abc123def456')
+        self.assertEqual(properties['message'], 'Processed message')
+
+    @patch('handler.init_sentry')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('builtins.print')
+    def test_lambda_handler_logs_one_redacted_summary_per_message(self, mock_print, mock_lookup, mock_sentry):
+        """Test that a dropped message produces a single summary line and no event dump."""
+        os.environ['METRICS_ENABLED'] = 'false'
+        self.addCleanup(os.environ.pop, 'METRICS_ENABLED')
+        mock_lookup.side_effect = resolve_all_to(None)
+
+        handler.lambda_handler(self.sample_event, None)
+
+        lines = [json.loads(c[0][0]) for c in mock_print.call_args_list]
+        self.assertEqual([line['message'] for line in lines], ['Processed event', 'Processed message'])
+        summary = lines[1]
+        self.assertEqual(summary['unknownAliases'], 1)
+        self.assertEqual(summary['Forwarded'], 0)
+        self.assertNotIn('sender@example.com', json.dumps(lines))
+        self.assertTrue(summary['source'].startswith('s***@example.com#'))
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    def test_lambda_handler_fetches_once_for_many_aliases(self, mock_lookup, mock_send, mock_fetch, mock_sentry):
+        """Test that a message to several aliases is downloaded and parsed once."""
+        mock_lookup.side_effect = lambda aliases: {alias: {'Email': f'{alias}@example.com'} for alias in aliases}
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.return_value = {'MessageId': 'test-msg-id'}
+
+        self.set_recipients([
+            'alice@coders.operationcode.org',
+            'bob@coders.operationcode.org',
+            'carol@coders.operationcode.org'
+        ])
+
+        handler.lambda_handler(self.sample_event, None)
+
+        mock_fetch.assert_called_once_with('abc123def456')
+        self.assertEqual(
+            [c[0][1] for c in mock_send.call_args_list],
+            [['alice@example.com'], ['bob@example.com'], ['carol@example.com']]
+        )
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.telemetry.emit_metrics')
+    def test_lambda_handler_chunks_shared_alias_destinations(self, mock_emit, mock_lookup, mock_send,
+                                                             mock_fetch, mock_sentry):
+        """Test that a shared alias is forwarded with one SES call per 50 destinations."""
+        team = [f'member{i}@example.com' for i in range(120)]
+        mock_lookup.side_effect = resolve_all_to({'Email': ', '.join(team), 'Status': 'active'})
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.return_value = {'MessageId': 'test-msg-id'}
+
+        handler.lambda_handler(self.sample_event, None)
+
+        chunks = [c[0][1] for c in mock_send.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [50, 50, 20])
+        self.assertEqual([address for chunk in chunks for address in chunk], team)
+        message_metrics = mock_emit.call_args_list[1][0][0]
+        self.assertEqual(message_metrics['Forwarded'], (120, 'Count'))
+        self.assertEqual(message_metrics['Sends'], (3, 'Count'))
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    def test_lambda_handler_concurrent_sends(self, mock_lookup, mock_send, mock_fetch, mock_sentry):
+        """Test that FORWARD_MAX_WORKERS sends to several aliases concurrently."""
+        os.environ['FORWARD_MAX_WORKERS'] = '3'
+        self.addCleanup(os.environ.pop, 'FORWARD_MAX_WORKERS')
+
+        # Each send waits until all three are in flight at once
+        barrier = threading.Barrier(3, timeout=5)
+
+        def send(prepared, forward_to, recipient):
+            barrier.wait()
+            return {'MessageId': f'id-{forward_to}'}
+
+        mock_lookup.side_effect = lambda aliases: {alias: {'Email': f'{alias}@example.com'} for alias in aliases}
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.side_effect = send
+        self.set_recipients([
+            'alice@coders.operationcode.org',
+            'bob@coders.operationcode.org',
+            'carol@coders.operationcode.org'
+        ])
+
+        result = handler.lambda_handler(self.sample_event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(mock_send.call_count, 3)
+        mock_fetch.assert_called_once_with('abc123def456')
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.sentry_sdk')
+    def test_lambda_handler_isolates_recipient_errors(self, mock_sentry_sdk, mock_lookup, mock_send,
+                                                      mock_fetch, mock_sentry):
+        """Test that one failing destination does not stop the others."""
+        os.environ['FORWARD_MAX_WORKERS'] = '4'
+        self.addCleanup(os.environ.pop, 'FORWARD_MAX_WORKERS')
+
+        def send(prepared, forward_to, recipient):
+            if forward_to == ['bob@example.com']:
+                raise Exception("SES error")
+            return {'MessageId': 'ok'}
+
+        mock_lookup.side_effect = lambda aliases: {alias: {'Email': f'{alias}@example.com'} for alias in aliases}
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.side_effect = send
+        self.set_recipients([
+            'alice@coders.operationcode.org',
+            'bob@coders.operationcode.org',
+            'carol@coders.operationcode.org'
+        ])
+
+        with self.assertRaisesRegex(Exception, 'SES error'):
+            handler.lambda_handler(self.sample_event, None)
+
+        self.assertEqual(
+            sorted(c[0][1] for c in mock_send.call_args_list),
+            [['alice@example.com'], ['bob@example.com'], ['carol@example.com']]
+        )
+        mock_sentry_sdk.capture_exception.assert_called_once()
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.sentry_sdk')
+    def test_lambda_handler_retry_skips_delivered_sends(self, mock_sentry_sdk, mock_lookup, mock_send,
+                                                        mock_fetch, mock_sentry):
+        """Test that a retried event only performs the sends the failed attempt did not deliver."""
+        os.environ['FORWARD_LEDGER'] = 'local'
+        self.addCleanup(os.environ.pop, 'FORWARD_LEDGER')
+        failing = {'bob@example.com'}
+
+        def send(prepared, forward_to, recipient):
+            if failing & set(forward_to):
+                raise Exception("SES error")
+            return {'MessageId': 'ok'}
+
+        mock_lookup.side_effect = lambda aliases: {alias: {'Email': f'{alias}@example.com'} for alias in aliases}
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.side_effect = send
+        self.set_recipients([
+            'alice@coders.operationcode.org',
+            'bob@coders.operationcode.org'
+        ])
+
+        with self.assertRaisesRegex(Exception, 'SES error'):
+            handler.lambda_handler(self.sample_event, None)
+
+        failing.clear()
+        mock_send.reset_mock()
+        handler.lambda_handler(self.sample_event, None)
+        self.assertEqual([c[0][1] for c in mock_send.call_args_list], [['bob@example.com']])
+
+        # A third delivery of the same event has nothing left to send or download
+        mock_send.reset_mock()
+        mock_fetch.reset_mock()
+        handler.lambda_handler(self.sample_event, None)
+        mock_send.assert_not_called()
+        mock_fetch.assert_not_called()
+
+    @patch('handler.sentry_sdk')
+    def test_get_ledger_disabled_when_runtime_lacks_conditional_puts(self, mock_sentry_sdk):
+        """Test that an S3 client without If-None-Match disables the ledger loudly, once."""
+        os.environ['FORWARD_LEDGER'] = 's3'
+        self.addCleanup(os.environ.pop, 'FORWARD_LEDGER')
+        s3_client = MagicMock()
+        s3_client.meta.service_model.operation_model.return_value.input_shape.members = {'Bucket': None, 'Key': None}
+        handler._s3_client = s3_client
+
+        self.assertIsNone(handler.get_ledger())
+        self.assertIsNone(handler.get_ledger())
+
+        mock_sentry_sdk.capture_exception.assert_called_once()
+        self.assertIn('IfNoneMatch', str(mock_sentry_sdk.capture_exception.call_args[0][0]))
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.telemetry.emit_metrics')
+    @patch('handler.sentry_sdk')
+    def test_lambda_handler_counts_ledger_errors(self, mock_sentry_sdk, mock_emit, mock_lookup, mock_send,
+                                                 mock_fetch, mock_sentry):
+        """Test that a send the ledger fails to record is delivered and counted as LedgerErrors."""
+        os.environ['FORWARD_LEDGER'] = 'local'
+        self.addCleanup(os.environ.pop, 'FORWARD_LEDGER')
+        mock_lookup.side_effect = resolve_all_to({'Email': 'recipient@example.com'})
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.return_value = {'MessageId': 'ok'}
+
+        with patch.object(handler.get_ledger(), 'mark', side_effect=Exception('SlowDown')):
+            result = handler.lambda_handler(self.sample_event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        mock_send.assert_called_once()
+        event_metrics, message_metrics = mock_emit.call_args_list[0][0][0], mock_emit.call_args_list[1][0][0]
+        self.assertEqual(event_metrics['LedgerErrors'], (1, 'Count'))
+        self.assertEqual(message_metrics['LedgerErrors'], (1, 'Count'))
+        self.assertEqual(message_metrics['Forwarded'], (1, 'Count'))
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.sentry_sdk')
+    def test_lambda_handler_queues_failed_sends(self, mock_sentry_sdk, mock_lookup, mock_send, mock_fetch,
+                                                mock_sentry):
+        """Test that with a retry queue a failed destination is queued instead of failing the invocation."""
+        os.environ['RETRY_QUEUE'] = 'local'
+        self.addCleanup(os.environ.pop, 'RETRY_QUEUE')
+
+        def send(prepared, forward_to, recipient):
+            if forward_to == ['bob@example.com']:
+                raise Exception("SES error")
+            return {'MessageId': 'ok'}
+
+        mock_lookup.side_effect = lambda aliases: {alias: {'Email': f'{alias}@example.com'} for alias in aliases}
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.side_effect = send
+        self.set_recipients([
+            'alice@coders.operationcode.org',
+            'bob@coders.operationcode.org'
+        ])
+
+        with patch('handler.time.time', return_value=1000.0):
+            result = handler.lambda_handler(self.sample_event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(handler.get_retry_queue().items, [{
+            'message_id': 'abc123def456',
+            'recipient': 'bob@coders.operationcode.org',
+            'destinations': ['bob@example.com'],
+            'attempt': 1,
+            'next_attempt_at': 1060.0,
+            'error': 'SES error',
+            'verdict': None
+        }])
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.sentry_sdk')
+    def test_lambda_handler_raises_when_retries_cannot_be_queued(self, mock_sentry_sdk, mock_lookup, mock_send,
+                                                                 mock_fetch, mock_sentry):
+        """Test that the invocation still fails if the retry queue rejects the failed sends."""
+        os.environ['RETRY_QUEUE'] = 'local'
+        self.addCleanup(os.environ.pop, 'RETRY_QUEUE')
+        mock_lookup.side_effect = resolve_all_to({'Email': 'recipient@example.com'})
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.side_effect = Exception("SES error")
+
+        with patch.object(handler.get_retry_queue(), 'enqueue', side_effect=Exception('queue down')):
+            with self.assertRaisesRegex(Exception, 'SES error'):
+                handler.lambda_handler(self.sample_event, None)
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.sentry_sdk')
+    def test_rate_limited_lookup_queues_recipients_unresolved(self, mock_sentry_sdk, mock_lookup, mock_send,
+                                                              mock_fetch, mock_sentry):
+        """Test that a 429 on the alias lookup queues the recipients and the drain resolves and sends them."""
+        os.environ['RETRY_QUEUE'] = 'local'
+        self.addCleanup(os.environ.pop, 'RETRY_QUEUE')
+        mock_lookup.side_effect = airtable_client.AirtableError(429, 'rate limited', 'GET', '/v0/appTEST/Aliases')
+        self.set_recipients(['alice@coders.operationcode.org', 'bob+news@coders.operationcode.org'])
+
+        with patch('handler.time.time', return_value=1000.0):
+            result = handler.lambda_handler(self.sample_event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        queue = handler.get_retry_queue()
+        self.assertEqual([(item['recipient'], item['destinations'], item['next_attempt_at']) for item in queue.items], [
+            ('alice@coders.operationcode.org', None, 1060.0),
+            ('bob+news@coders.operationcode.org', None, 1060.0)
+        ])
+        mock_send.assert_not_called()
+        mock_sentry_sdk.capture_exception.assert_not_called()
+
+        # Still locked out: the items are queued again with the next attempt
+        event = queue.receive_event()
+        queue.items = []
+        with patch('handler.time.time', return_value=1060.0):
+            self.assertEqual(handler.drain_retry_queue(event, None), {'batchItemFailures': []})
+        self.assertEqual([(item['destinations'], item['attempt']) for item in queue.items], [(None, 2), (None, 2)])
+        self.assertEqual(mock_lookup.call_count, 2)
+        mock_lookup.assert_called_with(['alice', 'bob'])
+
+        mock_lookup.side_effect = lambda aliases: {'alice': {'Email': 'alice@example.com'}, 'bob': None}
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.return_value = {'MessageId': 'ok'}
+        event = queue.receive_event()
+        queue.items = []
+        with patch('handler.time.time', return_value=2000.0):
+            self.assertEqual(handler.drain_retry_queue(event, None), {'batchItemFailures': []})
+
+        mock_send.assert_called_once_with({'body': b'prepared'}, ['alice@example.com'],
+                                          'alice@coders.operationcode.org')
+        self.assertEqual(queue.items, [])
+
+    @patch('handler.init_sentry')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.sentry_sdk')
+    def test_rate_limited_lookup_fails_without_retry_queue(self, mock_sentry_sdk, mock_lookup, mock_sentry):
+        """Test that without a retry queue a 429 on the alias lookup fails the invocation so SES retries."""
+        mock_lookup.side_effect = airtable_client.AirtableError(429, 'rate limited', 'GET', '/v0/appTEST/Aliases')
+
+        with self.assertRaises(airtable_client.AirtableError):
+            handler.lambda_handler(self.sample_event, None)
 
     @patch('handler.init_sentry')
-    @patch('handler.lookup_alias_in_airtable')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.sentry_sdk')
+    def test_drain_retry_queue(self, mock_sentry_sdk, mock_send, mock_fetch, mock_sentry):
+        """Test that the drain sends due items, backs off failures, re-queues early items and gives up."""
+        os.environ['RETRY_QUEUE'] = 'local'
+        os.environ['FORWARD_LEDGER'] = 'local'
+        os.environ['RETRY_MAX_ATTEMPTS'] = '3'
+        for name in ('RETRY_QUEUE', 'FORWARD_LEDGER', 'RETRY_MAX_ATTEMPTS'):
+            self.addCleanup(os.environ.pop, name)
+
+        def item(destination, attempt=1, next_attempt_at=900.0):
+            return {'message_id': 'msg1', 'recipient': 'team@coders.operationcode.org',
+                    'destinations': [destination], 'attempt': attempt, 'next_attempt_at': next_attempt_at,
+                    'error': 'SES error'}
+
+        def send(prepared, forward_to, recipient):
+            if forward_to != ['ok@example.com']:
+                raise Exception("still failing")
+            return {'MessageId': 'ok'}
+
+        queue = handler.get_retry_queue()
+        queue.enqueue([
+            item('ok@example.com'),
+            item('ok@example.com'),  # duplicate delivery
+            item('flaky@example.com'),
+            item('broken@example.com', attempt=2),
+            item('later@example.com', next_attempt_at=5000.0)
+        ])
+        event = queue.receive_event()
+        event['Records'].append({'messageId': 'bad', 'body': 'not json'})
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.side_effect = send
+
+        with patch('handler.time.time', return_value=1000.0):
+            result = handler.drain_retry_queue(event, None)
+
+        self.assertEqual(result, {'batchItemFailures': [{'itemIdentifier': 'bad'}]})
+        mock_fetch.assert_called_once_with('msg1')
+        self.assertEqual(mock_send.call_count, 3)
+        requeued = {entry['destinations'][0]: entry for entry in queue.items}
+        self.assertEqual(set(requeued), {'later@example.com', 'flaky@example.com'})
+        self.assertEqual(requeued['later@example.com']['attempt'], 1)
+        self.assertEqual(requeued['flaky@example.com']['attempt'], 2)
+        self.assertEqual(requeued['flaky@example.com']['next_attempt_at'], 1120.0)
+        mock_sentry_sdk.capture_exception.assert_called()
+
+        # The delivered send is in the ledger, so a redelivery of it is skipped
+        queue.items = []
+        queue.enqueue([item('ok@example.com')])
+        mock_send.reset_mock()
+        with patch('handler.time.time', return_value=1000.0):
+            handler.drain_retry_queue(queue.receive_event(), None)
+        mock_send.assert_not_called()
+
+    def use_suppression_set(self, *addresses):
+        """Enable SUPPRESSION_SET=s3 with a mocked S3 copy of a set holding addresses."""
+        os.environ['SUPPRESSION_SET'] = 's3'
+        self.addCleanup(os.environ.pop, 'SUPPRESSION_SET')
+        published = suppression.SuppressionSet([suppression.address_hash(a) for a in addresses], version=3)
+        s3_client = MagicMock()
+        s3_client.get_object.return_value = {
+            'Body': MagicMock(read=MagicMock(return_value=published.serialize())), 'ETag': '"e3"'
+        }
+        handler._s3_client = s3_client
+        return s3_client
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.telemetry.emit_metrics')
+    def test_lambda_handler_drops_suppressed_destinations(self, mock_emit, mock_lookup, mock_send, mock_fetch,
+                                                          mock_sentry):
+        """Test that destinations in the suppression set are never sent to."""
+        self.use_suppression_set('Bounced@example.com')
+        mock_lookup.side_effect = resolve_all_to({'Email': 'bounced@example.com, ok@example.com', 'Status': 'active'})
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.return_value = {'MessageId': 'test-msg-id'}
+
+        handler.lambda_handler(self.sample_event, None)
+
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args[0][1], ['ok@example.com'])
+        self.assertEqual(mock_emit.call_args_list[0][0][0]['Suppressed'], (1, 'Count'))
+
+        # Every destination suppressed: nothing is downloaded or sent
+        mock_lookup.side_effect = resolve_all_to({'Email': 'bounced@example.com', 'Status': 'active'})
+        mock_send.reset_mock()
+        mock_fetch.reset_mock()
+        handler.lambda_handler(self.sample_event, None)
+        mock_fetch.assert_not_called()
+        mock_send.assert_not_called()
+
+    @patch('handler.time.monotonic')
+    def test_get_suppression_set_checks_for_new_version(self, mock_monotonic):
+        """Test that the set is loaded once and re-checked with a conditional GET per interval."""
+        s3_client = self.use_suppression_set('bounced@example.com')
+
+        mock_monotonic.return_value = 1000.0
+        self.assertIn('bounced@example.com', handler.get_suppression_set())
+        mock_monotonic.return_value = 1299.0
+        handler.get_suppression_set()
+        self.assertEqual(s3_client.get_object.call_count, 1)
+
+        # Not modified, then S3 unavailable: the loaded set keeps being used
+        not_modified = Exception('Not Modified')
+        not_modified.response = {'Error': {'Code': '304'}}
+        s3_client.get_object.side_effect = not_modified
+        mock_monotonic.return_value = 1300.0
+        self.assertEqual(handler.get_suppression_set().version, 3)
+        self.assertEqual(s3_client.get_object.call_args[1]['IfNoneMatch'], '"e3"')
+        s3_client.get_object.side_effect = Exception('S3 unavailable')
+        mock_monotonic.return_value = 1600.0
+        self.assertEqual(handler.get_suppression_set().version, 3)
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    def test_drain_retry_queue_drops_suppressed_destinations(self, mock_send, mock_fetch, mock_sentry):
+        """Test that a retry to a destination that started bouncing is dropped."""
+        self.use_suppression_set('bounced@example.com')
+        event = {'Records': [{'messageId': 'r1', 'body': json.dumps({
+            'message_id': 'msg1', 'recipient': 'team@coders.operationcode.org',
+            'destinations': ['bounced@example.com'], 'attempt': 1, 'next_attempt_at': 0, 'error': 'SES error'
+        })}]}
+
+        self.assertEqual(handler.drain_retry_queue(event, None), {'batchItemFailures': []})
+
+        mock_fetch.assert_not_called()
+        mock_send.assert_not_called()
+
+    def test_parse_alias(self):
+        """Test that aliases are validated and normalized without any network call."""
+        self.assertEqual(handler.parse_alias('John482@Coders.OperationCode.org'), ('ok', 'john482'))
+        self.assertEqual(handler.parse_alias('john482+news@coders.operationcode.org'), ('ok', 'john482'))
+        self.assertEqual(handler.parse_alias("o'brien@coders.operationcode.org"), ('ok', "o'brien"))
+        self.assertEqual(handler.parse_alias('someone@example.com'), ('external', None))
+        self.assertEqual(handler.parse_alias('no-at-sign'), ('invalid', None))
+        self.assertEqual(handler.parse_alias('+tag@coders.operationcode.org'), ('invalid', None))
+        self.assertEqual(handler.parse_alias('a..b@coders.operationcode.org'), ('invalid', None))
+        self.assertEqual(handler.parse_alias('"quoted"@coders.operationcode.org'), ('invalid', None))
+        self.assertEqual(handler.parse_alias(f"{'a' * 65}@coders.operationcode.org"), ('invalid', None))
+
+        os.environ['ALIAS_DOMAINS'] = 'coders.operationcode.org, lists.operationcode.org'
+        self.addCleanup(os.environ.pop, 'ALIAS_DOMAINS')
+        handler._config_cache = None
+        self.assertEqual(handler.parse_alias('team@lists.operationcode.org'), ('ok', 'team'))
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.telemetry.emit_metrics')
+    def test_lambda_handler_routes_on_receipt_recipients(self, mock_emit, mock_lookup, mock_send, mock_fetch,
+                                                         mock_sentry):
+        """Test that only our domain's envelope recipients are looked up, once per base alias."""
+        mock_lookup.side_effect = lambda aliases: {alias: {'Email': f'{alias}@example.com'} for alias in aliases}
+        mock_fetch.return_value = {'body': b'prepared'}
+        mock_send.return_value = {'MessageId': 'ok'}
+        ses = self.sample_event['Records'][0]['ses']
+        ses['mail']['destination'] = [
+            'john@coders.operationcode.org', 'friend@example.com', 'other@gmail.com'
+        ]
+        ses['receipt']['recipients'] = [
+            'john@coders.operationcode.org', 'John+news@coders.operationcode.org', 'bad..alias@coders.operationcode.org'
+        ]
+
+        handler.lambda_handler(self.sample_event, None)
+
+        mock_lookup.assert_called_once_with(['john'])
+        mock_send.assert_called_once_with({'body': b'prepared'}, ['john@example.com'], 'john@coders.operationcode.org')
+        message_metrics, _, properties = mock_emit.call_args_list[1][0]
+        self.assertEqual(properties['invalidRecipients'], 1)
+
+        # Without receipt recipients, mail.destination is used and external domains are skipped
+        del ses['receipt']['recipients']
+        mock_emit.reset_mock()
+        handler.lambda_handler(self.sample_event, None)
+        properties = mock_emit.call_args_list[1][0][2]
+        self.assertEqual(properties['externalRecipients'], 2)
+        self.assertEqual(mock_emit.call_args_list[1][0][0]['Recipients'], (3, 'Count'))
+
+    def test_verdict_policy(self):
+        """Test parsing VERDICT_POLICY and picking the strongest action for the failed verdicts."""
+        self.assertEqual(handler.parse_verdict_policy('spam=tag, DMARC=drop'), {
+            'spam': 'tag', 'virus': 'allow', 'spf': 'allow', 'dkim': 'allow', 'dmarc': 'drop'
+        })
+        with self.assertRaises(ValueError):
+            handler.parse_verdict_policy('spam=quarantine')
+
+        os.environ['VERDICT_POLICY'] = 'spam=tag,spf=tag,virus=drop'
+        self.addCleanup(os.environ.pop, 'VERDICT_POLICY')
+        receipt = {'spamVerdict': {'status': 'FAIL'}, 'spfVerdict': {'status': 'FAIL'},
+                   'virusVerdict': {'status': 'GRAY'}, 'dkimVerdict': {'status': 'FAIL'}}
+        self.assertEqual(handler.evaluate_verdicts(receipt), ('tag', ['spam', 'spf', 'dkim']))
+        receipt['virusVerdict']['status'] = 'FAIL'
+        self.assertEqual(handler.evaluate_verdicts(receipt)[0], 'drop')
+        self.assertEqual(handler.evaluate_verdicts({}), ('allow', []))
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.telemetry.emit_metrics')
+    def test_lambda_handler_drops_failed_verdicts_without_io(self, mock_emit, mock_lookup, mock_send,
+                                                             mock_fetch, mock_sentry):
+        """Test that spam is dropped before any Airtable, S3 or SES call and counted."""
+        self.sample_event['Records'][0]['ses']['receipt']['spamVerdict']['status'] = 'FAIL'
+
+        result = handler.lambda_handler(self.sample_event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        mock_lookup.assert_not_called()
+        mock_fetch.assert_not_called()
+        mock_send.assert_not_called()
+        self.assertEqual(mock_emit.call_args_list[0][0][0]['ShortCircuited'], (1, 'Count'))
+        properties = mock_emit.call_args_list[1][0][2]
+        self.assertEqual((properties['verdictAction'], properties['failedVerdicts']), ('drop', ['spam']))
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    def test_lambda_handler_tags_failed_verdicts(self, mock_lookup, mock_fetch, mock_sentry):
+        """Test that a tagged message is forwarded with an X-Forward-Verdict header."""
+        os.environ['VERDICT_POLICY'] = 'dmarc=tag'
+        self.addCleanup(os.environ.pop, 'VERDICT_POLICY')
+        self.sample_event['Records'][0]['ses']['receipt']['dmarcVerdict'] = {'status': 'FAIL'}
+        mock_lookup.side_effect = resolve_all_to({'Email': 'recipient@example.com'})
+        mock_fetch.side_effect = lambda message_id: handler.prepare_forward(
+            MIMEText('Body', 'plain').as_bytes()
+        )
+        mock_ses_client = Mock()
+        mock_ses_client.send_raw_email.return_value = {'MessageId': 'ok'}
+
+        with patch.object(handler, 'get_ses_client', return_value=mock_ses_client):
+            handler.lambda_handler(self.sample_event, None)
+
+        raw = mock_ses_client.send_raw_email.call_args[1]['RawMessage']['Data']
+        sent = BytesParser(policy=policy.default).parsebytes(raw)
+        self.assertEqual(sent['X-Forward-Verdict'], 'dmarc=FAIL')
+
+    @patch('handler.init_sentry')
+    @patch('handler.lookup_aliases_in_airtable')
     def test_lambda_handler_inactive_alias(self, mock_lookup, mock_sentry):
         """Test Lambda handler with inactive alias (should not forward)."""
         # Mock Airtable lookup returning None (inactive or not found)
-        mock_lookup.return_value = None
+        mock_lookup.side_effect = resolve_all_to(None)
 
         result = handler.lambda_handler(self.sample_event, None)
 
         self.assertEqual(result['statusCode'], 200)
         self.assertEqual(result['body'], 'Processed')
-        mock_lookup.assert_called_once_with('testuser')
+        mock_lookup.assert_called_once_with(['testuser'])
 
     @patch('handler.init_sentry')
-    @patch('handler.get_email_from_s3')
-    @patch('handler.lookup_alias_in_airtable')
-    def test_lambda_handler_missing_personal_email(self, mock_lookup, mock_get_email, mock_sentry):
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    @patch('handler.sentry_sdk')
+    def test_lambda_handler_lookup_error_raises(self, mock_sentry_sdk, mock_lookup, mock_fetch, mock_sentry):
+        """Test that an exhausted Airtable retry fails the invocation instead of dropping mail."""
+        mock_lookup.side_effect = airtable_client.AirtableError(429, 'rate limited', 'GET', '/v0/base/table')
+
+        with self.assertRaises(airtable_client.AirtableError):
+            handler.lambda_handler(self.sample_event, None)
+
+        mock_fetch.assert_not_called()
+        mock_sentry_sdk.capture_exception.assert_called_once()
+
+    @patch('handler.init_sentry')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.lookup_aliases_in_airtable')
+    def test_lambda_handler_missing_personal_email(self, mock_lookup, mock_fetch, mock_sentry):
         """Test Lambda handler when Email is missing from mapping."""
         # Mock Airtable lookup with missing Email
-        mock_lookup.return_value = {
+        mock_lookup.side_effect = resolve_all_to({
             'Name': 'Test User',
             'Status': 'active'
             # Email is missing
-        }
+        })
 
         result = handler.lambda_handler(self.sample_event, None)
 
         self.assertEqual(result['statusCode'], 200)
         self.assertEqual(result['body'], 'Processed')
         # Should not attempt to get email from S3
-        mock_get_email.assert_not_called()
+        mock_fetch.assert_not_called()
 
     @patch('handler.init_sentry')
-    @patch('handler.get_email_from_s3')
-    @patch('handler.forward_email')
-    @patch('handler.lookup_alias_in_airtable')
+    @patch('handler.fetch_and_prepare_forward')
+    @patch('handler.send_forward')
+    @patch('handler.lookup_aliases_in_airtable')
     @patch('handler.sentry_sdk')
-    def test_lambda_handler_forward_error(self, mock_sentry_sdk, mock_lookup, mock_forward, mock_get_email, mock_sentry):
+    def test_lambda_handler_forward_error(self, mock_sentry_sdk, mock_lookup, mock_forward, mock_fetch, mock_sentry):
         """Test Lambda handler error handling when forwarding fails."""
-        mock_lookup.return_value = {
+        mock_lookup.side_effect = resolve_all_to({
             'Email': 'recipient@example.com',
             'Name': 'Test User',
             'Status': 'active'
-        }
+        })
 
-        mock_get_email.return_value = b"test email"
+        mock_fetch.return_value = {'body': b'test email'}
         mock_forward.side_effect = Exception("SES error")
 
         with self.assertRaises(Exception):
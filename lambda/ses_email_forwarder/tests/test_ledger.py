@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+from unittest.mock import Mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ledger
+
+
+class ConditionalWriteFailed(Exception):
+    """Shape of the botocore ClientError raised when If-None-Match fails."""
+
+    def __init__(self):
+        super().__init__('PreconditionFailed')
+        self.response = {'Error': {'Code': 'PreconditionFailed'}}
+
+
+class TestLedger(unittest.TestCase):
+    """Test suite for the forward idempotency ledger."""
+
+    def test_entry_key_ignores_case_and_destination_order(self):
+        """Test that the same send always maps to the same entry."""
+        key = ledger.entry_key('Team@coders.operationcode.org', ['b@example.com', 'a@example.com'])
+        self.assertEqual(key, ledger.entry_key('team@coders.operationcode.org', ['A@example.com', 'b@example.com']))
+        self.assertNotEqual(key, ledger.entry_key('team@coders.operationcode.org', ['a@example.com']))
+        self.assertNotIn('example', key)
+
+    def test_local_ledger(self):
+        """Test that the local stand-in records each entry once per message."""
+        store = ledger.LocalLedger()
+        self.assertEqual(store.completed('msg1'), set())
+        self.assertTrue(store.mark('msg1', 'entry'))
+        self.assertFalse(store.mark('msg1', 'entry'))
+        self.assertEqual(store.completed('msg1'), {'entry'})
+        self.assertEqual(store.completed('msg2'), set())
+
+    def test_s3_ledger_lists_markers_across_pages(self):
+        """Test that a message's entries are read with paginated ListObjectsV2 calls."""
+        s3_client = Mock()
+        s3_client.list_objects_v2.side_effect = [
+            {'Contents': [{'Key': 'forward-ledger/msg1/aaa'}], 'IsTruncated': True, 'NextContinuationToken': 't1'},
+            {'Contents': [{'Key': 'forward-ledger/msg1/bbb'}], 'IsTruncated': False}
+        ]
+        store = ledger.S3Ledger(s3_client, 'test-bucket', 'forward-ledger/')
+
+        self.assertEqual(store.completed('msg1'), {'aaa', 'bbb'})
+        self.assertEqual(s3_client.list_objects_v2.call_args_list[0][1],
+                         {'Bucket': 'test-bucket', 'Prefix': 'forward-ledger/msg1/'})
+        self.assertEqual(s3_client.list_objects_v2.call_args_list[1][1]['ContinuationToken'], 't1')
+
+    def test_s3_ledger_mark_is_conditional(self):
+        """Test that markers are written with If-None-Match and an existing marker is reported."""
+        s3_client = Mock()
+        store = ledger.S3Ledger(s3_client, 'test-bucket', 'forward-ledger/')
+
+        self.assertTrue(store.mark('msg1', 'aaa'))
+        s3_client.put_object.assert_called_once_with(
+            Bucket='test-bucket', Key='forward-ledger/msg1/aaa', Body=b'', IfNoneMatch='*'
+        )
+
+        s3_client.put_object.side_effect = ConditionalWriteFailed()
+        self.assertFalse(store.mark('msg1', 'aaa'))
+
+        s3_client.put_object.side_effect = Exception('AccessDenied')
+        with self.assertRaises(Exception):
+            store.mark('msg1', 'aaa')
+
+
+if __name__ == '__main__':
+    unittest.main()
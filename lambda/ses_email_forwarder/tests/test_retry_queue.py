@@ -0,0 +1,65 @@
+import json
+import unittest
+import sys
+import os
+from unittest.mock import Mock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import retry_queue
+
+
+def item(index, next_attempt_at=1000.0):
+    return {'message_id': f'msg{index}', 'recipient': 'team@coders.operationcode.org',
+            'destinations': ['a@example.com'], 'attempt': 1, 'next_attempt_at': next_attempt_at, 'error': 'x'}
+
+
+class TestRetryQueue(unittest.TestCase):
+    """Test suite for the forward retry queue."""
+
+    def test_retry_delay_backs_off_exponentially(self):
+        """Test that the delay doubles per attempt up to the cap."""
+        self.assertEqual([retry_queue.retry_delay(n, 60, 600) for n in range(1, 6)], [60, 120, 240, 480, 600])
+
+    @patch('retry_queue.time.time', return_value=1000.0)
+    def test_sqs_queue_batches_and_delays(self, mock_time):
+        """Test that items are sent 10 per batch with their delay capped at 15 minutes."""
+        sqs_client = Mock()
+        sqs_client.send_message_batch.return_value = {'Successful': []}
+        queue = retry_queue.SQSRetryQueue(sqs_client, 'https://sqs/retry')
+
+        items = [item(i, next_attempt_at=1060.5) for i in range(11)] + [item(11, next_attempt_at=9000.0)]
+        queue.enqueue(items)
+
+        batches = [c[1] for c in sqs_client.send_message_batch.call_args_list]
+        self.assertEqual([len(batch['Entries']) for batch in batches], [10, 2])
+        self.assertEqual(batches[0]['QueueUrl'], 'https://sqs/retry')
+        self.assertEqual(batches[0]['Entries'][0]['DelaySeconds'], 61)
+        self.assertEqual(batches[1]['Entries'][1]['DelaySeconds'], 900)
+        self.assertEqual(json.loads(batches[1]['Entries'][1]['MessageBody']), items[11])
+
+    def test_sqs_queue_raises_on_rejected_items(self):
+        """Test that a partially failed batch is reported so the caller can fall back."""
+        sqs_client = Mock()
+        sqs_client.send_message_batch.return_value = {'Failed': [{'Id': '0', 'Code': 'InternalError'}]}
+        queue = retry_queue.SQSRetryQueue(sqs_client, 'https://sqs/retry')
+
+        with self.assertRaisesRegex(RuntimeError, 'InternalError'):
+            queue.enqueue([item(0)])
+
+    def test_local_queue_receive_event(self):
+        """Test that the local stand-in hands out SQS-shaped events in batches."""
+        queue = retry_queue.LocalRetryQueue()
+        queue.enqueue([item(i) for i in range(12)])
+
+        first = queue.receive_event()
+        self.assertEqual(len(first['Records']), 10)
+        self.assertEqual(json.loads(first['Records'][0]['body']), item(0))
+        self.assertEqual(len({record['messageId'] for record in first['Records']}), 10)
+        self.assertEqual(len(queue.receive_event()['Records']), 2)
+        self.assertEqual(queue.receive_event(), {'Records': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,491 @@
+"""
+Airtable REST client shared by the SES Lambda functions.
+
+Connections to api.airtable.com are pooled at module level and kept alive
+across invocations in a warm container, so only the first request pays for
+the TCP + TLS handshake. Packaged as a Lambda layer (python/ is added to
+sys.path by the Lambda runtime).
+"""
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+import log
+
+AIRTABLE_HOST = 'api.airtable.com'
+
+# Budget for the URL-encoded filterByFormula of a single request. Airtable
+# rejects URLs longer than 16k characters; the rest is left for the path,
+# field selection and pagination parameters.
+MAX_FORMULA_URL_LENGTH = 12000
+
+# Airtable accepts at most 10 records per create/update request
+MAX_RECORDS_PER_WRITE = 10
+
+# Responses worth retrying: transient server errors. A 429 is not retried:
+# Airtable locks the base out for 30 seconds after one, longer than any
+# backoff that fits in a Lambda invocation, and requests sent during the
+# lockout still count against the limit.
+RETRYABLE_STATUSES = frozenset({500, 502, 503, 504})
+
+# Errors raised when a pooled keep-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+def formula_string(value: str) -> str:
+    """
+    Quote a value as an Airtable formula string literal.
+
+    Args:
+        value: Raw string value (may contain quotes or backslashes)
+
+    Returns:
+        str: Single-quoted, escaped literal, e.g. 'o\\'brien'
+    """
+    escaped = value.replace('\\', '\\\\').replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def match_any_formulas(field: str, values, condition: str | None = None,
+                       max_length: int = MAX_FORMULA_URL_LENGTH, contains: bool = False):
+    """
+    Build filterByFormula expressions matching records whose field equals any of
+    the values, split so each URL-encoded formula stays under max_length.
+
+    Args:
+        field: Airtable field name
+        values: Values to match
+        condition: Optional extra formula every record must also satisfy
+        contains: Match records whose field contains any of the values
+            (case-insensitively) instead, e.g. one address in a list of
+            addresses; callers must check the matched records exactly
+
+    Yields:
+        tuple: (formula, values covered by that formula)
+    """
+    def build(terms):
+        formula = f"OR({', '.join(terms)})"
+        if condition:
+            formula = f"AND({condition}, {formula})"
+        return formula
+
+    terms = []
+    chunk = []
+    for value in values:
+        if contains:
+            term = f"FIND({formula_string(value.lower())}, LOWER({{{field}}} & ''))"
+        else:
+            term = f"{{{field}}} = {formula_string(value)}"
+        if terms and len(urllib.parse.quote(build(terms + [term]))) > max_length:
+            yield build(terms), chunk
+            terms, chunk = [], []
+        terms.append(term)
+        chunk.append(value)
+
+    if terms:
+        yield build(terms), chunk
+
+
+class AirtableError(Exception):
+    """
+    Raised when Airtable responds with an HTTP error status. The message only
+    names the table path (without the query string, whose filterByFormula
+    holds the addresses looked up) and Airtable's error type, since it is
+    logged and sent to Sentry. The response body is kept in body.
+    """
+
+    def __init__(self, status: int, body: str, method: str, path: str):
+        self.status = status
+        self.body = body
+        self.method = method
+        self.path = path.split('?', 1)[0]
+        self.error_type = error_type(body)
+        message = f"{method} {self.path} failed: {status}"
+        if self.error_type:
+            message += f" {self.error_type}"
+        super().__init__(message)
+
+
+def error_type(body: str) -> str | None:
+    """The error type of an Airtable error response body (e.g. 'INVALID_FILTER_BY_FORMULA'), or None."""
+    try:
+        error = json.loads(body).get('error')
+    except (ValueError, AttributeError):
+        return None
+    if isinstance(error, dict):
+        error = error.get('type')
+    return error if isinstance(error, str) else None
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent HTTPS connections to a single host.
+    Idle connections older than idle_timeout are discarded rather than reused,
+    since the server (or a frozen Lambda container) may have dropped them.
+    """
+
+    def __init__(self, host: str, connect_timeout: float, read_timeout: float,
+                 max_idle: int, idle_timeout: float):
+        self.host = host
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle = []  # (last_used, connection), most recently used last
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'connections_opened': 0,
+            'connections_reused': 0,
+            'stale_retries': 0,
+            'throttled': 0,
+            'locked_out': 0,
+            'retried': 0,
+        }
+
+    def acquire(self) -> tuple[http.client.HTTPSConnection, bool]:
+        """
+        Get a connection, reusing an idle one when possible.
+
+        Returns:
+            tuple: (connection, True if it was reused)
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                last_used, conn = self._idle.pop()
+                if now - last_used < self.idle_timeout:
+                    self.stats['connections_reused'] += 1
+                    return conn, True
+                conn.close()
+            self.stats['connections_opened'] += 1
+
+        conn = http.client.HTTPSConnection(self.host, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        return conn, False
+
+    def count(self, stat: str, amount: int = 1):
+        """Increment a statistics counter."""
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + amount
+
+    def get_stats(self) -> dict:
+        """Return a copy of the statistics counters."""
+        with self._lock:
+            return dict(self.stats)
+
+    def release(self, conn: http.client.HTTPSConnection):
+        """Return a healthy connection to the pool."""
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((time.monotonic(), conn))
+                return
+        conn.close()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the request rate of a container.
+    A 429 response pauses the bucket for Airtable's lockout window, and
+    clients fail fast instead of sending while it is paused.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'rate_limit_waits': 0, 'rate_limit_wait_seconds': 0.0}
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        if self.rate <= 0:
+            return
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    if waited:
+                        self.stats['rate_limit_waits'] += 1
+                        self.stats['rate_limit_wait_seconds'] += waited
+                    return
+                delay = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for the given number of seconds."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    def paused_for(self) -> float:
+        """Seconds left in the current pause, or 0."""
+        with self._lock:
+            return max(0.0, self._paused_until - time.monotonic())
+
+    def get_stats(self) -> dict:
+        """Return a copy of the statistics counters."""
+        with self._lock:
+            return dict(self.stats)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_rate_limiter = None
+
+
+def get_pool() -> ConnectionPool:
+    """Get the container-wide Airtable connection pool, configured from the environment."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    AIRTABLE_HOST,
+                    connect_timeout=float(os.environ.get('AIRTABLE_CONNECT_TIMEOUT_SECONDS', '3')),
+                    read_timeout=float(os.environ.get('AIRTABLE_READ_TIMEOUT_SECONDS', '10')),
+                    max_idle=int(os.environ.get('AIRTABLE_MAX_IDLE_CONNECTIONS', '8')),
+                    idle_timeout=float(os.environ.get('AIRTABLE_IDLE_TIMEOUT_SECONDS', '50')),
+                )
+    return _pool
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Get the container-wide token bucket shared by every Airtable request."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _pool_lock:
+            if _rate_limiter is None:
+                rate = float(os.environ.get('AIRTABLE_RATE_LIMIT_PER_SECOND', '5'))
+                _rate_limiter = TokenBucket(
+                    rate,
+                    capacity=float(os.environ.get('AIRTABLE_RATE_LIMIT_BURST', str(rate)))
+                )
+    return _rate_limiter
+
+
+def get_stats() -> dict:
+    """Return a copy of the connection reuse, retry and rate limiting statistics for this container."""
+    return {**get_pool().get_stats(), **get_rate_limiter().get_stats()}
+
+
+def stats_metrics(since: dict) -> dict:
+    """
+    The statistics counted since a get_stats() snapshot, as EMF metrics:
+    'requests' becomes AirtableRequests, 'connections_reused'
+    AirtableConnectionsReused and so on, and the rate limit wait time
+    AirtableRateLimitWaitMs. The counters live as long as the container, so
+    a handler takes a snapshot when an invocation starts and reports the
+    difference.
+
+    Args:
+        since: get_stats() at the start of the invocation
+
+    Returns:
+        dict: Metric name -> (value, unit)
+    """
+    metrics = {}
+    for stat, value in get_stats().items():
+        delta = value - since.get(stat, 0)
+        if stat == 'rate_limit_wait_seconds':
+            metrics['AirtableRateLimitWaitMs'] = (round(delta * 1000, 3), 'Milliseconds')
+        else:
+            metrics['Airtable' + ''.join(part.title() for part in stat.split('_'))] = (delta, 'Count')
+    return metrics
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given in seconds; HTTP dates are ignored."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class AirtableClient:
+    """Client for one Airtable table."""
+
+    def __init__(self, api_key: str, base_id: str, table_name: str, pool: ConnectionPool | None = None,
+                 rate_limiter: TokenBucket | None = None):
+        self.api_key = api_key
+        self.table_path = f"/v0/{base_id}/{urllib.parse.quote(table_name)}"
+        self.pool = pool or get_pool()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_retries = int(os.environ.get('AIRTABLE_MAX_RETRIES', '4'))
+        self.backoff_base = float(os.environ.get('AIRTABLE_BACKOFF_BASE_SECONDS', '0.5'))
+        self.max_backoff = float(os.environ.get('AIRTABLE_MAX_BACKOFF_SECONDS', '8'))
+        self.lockout_seconds = float(os.environ.get('AIRTABLE_LOCKOUT_SECONDS', '30'))
+
+    def _retry_delay(self, attempt: int, retry_after: float | None) -> float | None:
+        """
+        Seconds to wait before the next attempt, using jittered exponential backoff
+        or the server's Retry-After. None means the wait would exceed the backoff
+        cap and the error should be raised instead.
+        """
+        if retry_after is not None:
+            if retry_after > self.max_backoff:
+                return None
+            return retry_after + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.max_backoff, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, record_id: str | None = None, params=None, body=None) -> dict:
+        """
+        Send a request to the table (or one of its records) and decode the JSON response.
+        Requests wait for the shared token bucket. 5xx responses are retried with
+        jittered exponential backoff that honors Retry-After. A 429 is raised at once
+        and pauses the bucket for the lockout window (Retry-After, or
+        AIRTABLE_LOCKOUT_SECONDS); until it has passed, requests from this container
+        raise a 429 without being sent. A request that fails on a reused keep-alive
+        connection is retried once on a fresh connection.
+
+        Args:
+            method: HTTP method
+            record_id: Optional record ID appended to the table path
+            params: Optional query parameters (dict or list of tuples)
+            body: Optional JSON-serializable request body
+
+        Returns:
+            dict: Decoded response body
+
+        Raises:
+            AirtableError: If Airtable responds with a status of 400 or above
+        """
+        path = self.table_path
+        if record_id:
+            path += f"/{record_id}"
+        if params:
+            path += f"?{urllib.parse.urlencode(params)}"
+
+        headers = {'Authorization': f'Bearer {self.api_key}'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        attempt = 0
+        while True:
+            locked_out = self.rate_limiter.paused_for()
+            if locked_out > 0:
+                self.pool.count('locked_out')
+                raise AirtableError(429, f"rate limited, locked out for {locked_out:.1f}s more", method, path)
+
+            self.rate_limiter.acquire()
+            status, retry_after, data = self._send(method, path, payload, headers)
+            if status < 400:
+                return json.loads(data.decode('utf-8'))
+
+            if status == 429:
+                self.pool.count('throttled')
+                # Hold back every thread in the container, not just this one
+                self.rate_limiter.pause(retry_after if retry_after is not None else self.lockout_seconds)
+
+            if status in RETRYABLE_STATUSES and attempt < self.max_retries:
+                delay = self._retry_delay(attempt, retry_after)
+                if delay is not None:
+                    self.pool.count('retried')
+                    log.warning('Airtable request retried', status=status, delay_seconds=round(delay, 2))
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+
+            raise AirtableError(status, data.decode('utf-8', errors='replace'), method, path)
+
+    def _send(self, method: str, path: str, payload: bytes | None, headers: dict) -> tuple:
+        """
+        Send one HTTP request over a pooled connection.
+
+        Returns:
+            tuple: (status, Retry-After seconds or None, response body bytes)
+        """
+        while True:
+            conn, reused = self.pool.acquire()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    self.pool.count('stale_retries')
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+            self.pool.count('requests')
+            if response.will_close:
+                conn.close()
+            else:
+                self.pool.release(conn)
+            return response.status, parse_retry_after(response.getheader('Retry-After')), data
+
+    def list_records(self, filter_formula: str | None = None, fields: list[str] | None = None,
+                     page_size: int = 100):
+        """
+        List records, following pagination.
+
+        Args:
+            filter_formula: Optional filterByFormula expression
+            fields: Optional field names to return (everything else is omitted)
+            page_size: Records per page (Airtable maximum is 100)
+
+        Yields:
+            dict: Airtable records with 'id' and 'fields'
+        """
+        offset = None
+        while True:
+            params = [('pageSize', page_size)]
+            if filter_formula:
+                params.append(('filterByFormula', filter_formula))
+            params += [('fields[]', field) for field in fields or []]
+            if offset:
+                params.append(('offset', offset))
+
+            data = self.request('GET', params=params)
+            yield from data.get('records', [])
+
+            offset = data.get('offset')
+            if not offset:
+                return
+
+    def update_records(self, records: list[dict], written: list | None = None) -> list[dict]:
+        """
+        Update several records with multi-record PATCH requests of at most
+        MAX_RECORDS_PER_WRITE records each.
+
+        Args:
+            records: [{'id': record ID, 'fields': {field: new value}}]
+            written: Optional list the ids of each request's records are
+                appended to once it succeeds, so a caller can tell how far a
+                call that raised got
+
+        Returns:
+            list: The updated records
+        """
+        updated = []
+        for start in range(0, len(records), MAX_RECORDS_PER_WRITE):
+            chunk = records[start:start + MAX_RECORDS_PER_WRITE]
+            data = self.request('PATCH', body={'records': [{'id': r['id'], 'fields': r['fields']} for r in chunk]})
+            updated.extend(data.get('records', []))
+            if written is not None:
+                written.extend(r['id'] for r in chunk)
+        return updated
@@ -0,0 +1,34 @@
+"""
+Deferred imports for modules that are expensive to load at cold start.
+
+A LazyModule stands in for a module at module level and imports it on first
+attribute access, so handlers can keep writing `sentry_sdk.capture_exception(e)`
+(and tests can keep patching `handler.sentry_sdk`) without paying for the import
+on paths that never use it.
+"""
+import importlib
+import threading
+
+
+class LazyModule:
+    """Proxy that imports the named module the first time an attribute is read."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Import the module now (e.g. to warm it during Lambda init) and return it."""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name!r} ({state})>"
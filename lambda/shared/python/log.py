@@ -0,0 +1,92 @@
+"""
+Leveled JSON logging for the SES Lambda functions.
+
+Each call prints at most one JSON line: {"level", "message", ...fields}.
+Lines below LOG_LEVEL are dropped before any formatting work is done, full
+event dumps are sampled (LOG_EVENT_SAMPLE_RATE), and email addresses are
+redacted (LOG_REDACT_ADDRESSES) so logs can be searched without storing who
+wrote to whom.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+ADDRESS_PATTERN = re.compile(r'[A-Za-z0-9.!#$%&\'*+/=?^_`{|}~-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+')
+
+_settings = None
+
+
+def get_settings() -> dict:
+    """Get logging settings from environment variables with caching."""
+    global _settings
+    if _settings is None:
+        _settings = {
+            'level': LEVELS.get(os.environ.get('LOG_LEVEL', 'INFO').upper(), LEVELS['INFO']),
+            'event_sample_rate': float(os.environ.get('LOG_EVENT_SAMPLE_RATE', '0')),
+            'redact_addresses': os.environ.get('LOG_REDACT_ADDRESSES', 'true').lower() not in ('0', 'false', 'no'),
+        }
+    return _settings
+
+
+def enabled(level: str) -> bool:
+    """Whether lines at this level are printed; use to skip building expensive fields."""
+    return LEVELS[level] >= get_settings()['level']
+
+
+def log(level: str, message: str, **fields):
+    """Print one JSON log line if the level is enabled."""
+    if not enabled(level):
+        return
+    print(json.dumps({'level': level, 'message': message, **fields}, default=str, separators=(',', ':')))
+
+
+def debug(message: str, **fields):
+    log('DEBUG', message, **fields)
+
+
+def info(message: str, **fields):
+    log('INFO', message, **fields)
+
+
+def warning(message: str, **fields):
+    log('WARNING', message, **fields)
+
+
+def error(message: str, **fields):
+    log('ERROR', message, **fields)
+
+
+def redact_address(address: str | None) -> str | None:
+    """
+    Redact the local part of an email address, keeping its first character,
+    the domain and a short hash so the same address can be correlated across
+    lines: "john482@example.com" -> "j***@example.com#1f3a9c2e".
+    """
+    if not address or not get_settings()['redact_addresses']:
+        return address
+    local, at, domain = address.rpartition('@')
+    if not at:
+        return '***'
+    digest = hashlib.sha256(address.lower().encode()).hexdigest()[:8]
+    return f"{local[:1]}***@{domain}#{digest}"
+
+
+def redact_text(text: str) -> str:
+    """Redact every email address found in free text."""
+    if not get_settings()['redact_addresses']:
+        return text
+    return ADDRESS_PATTERN.sub(lambda m: redact_address(m.group(0)), text)
+
+
+def log_event(event: dict):
+    """
+    Dump a full invocation event (addresses redacted) at INFO for a sample of
+    invocations, or for every invocation when LOG_LEVEL is DEBUG.
+    """
+    if not enabled('DEBUG') and random.random() >= get_settings()['event_sample_rate']:
+        return
+    info('Received event', event=json.loads(redact_text(json.dumps(event, default=str))))
@@ -0,0 +1,42 @@
+"""
+Runtime check for S3 conditional writes.
+
+Conditional puts (If-None-Match: * to create an object only if it does not
+exist, If-Match on an ETag to replace only the version that was read) are
+recent additions to the S3 API, and boto3 only accepts parameters its bundled
+service model knows. Lambda runs the runtime's bundled boto3, not the version
+pinned in requirements.txt, so on an older runtime every conditional put
+fails parameter validation. Callers check once, when they set up, so that
+shows up as one loud error instead of every write failing quietly.
+"""
+
+
+def missing_put_parameters(s3_client, *parameters: str) -> list[str]:
+    """
+    Conditional put parameters the client's service model does not know.
+
+    Args:
+        s3_client: boto3 S3 client
+        parameters: PutObject parameter names, e.g. 'IfNoneMatch', 'IfMatch'
+
+    Returns:
+        list: The parameters the client would reject
+    """
+    members = s3_client.meta.service_model.operation_model('PutObject').input_shape.members
+    return [parameter for parameter in parameters if parameter not in members]
+
+
+def require_put_parameters(s3_client, *parameters: str):
+    """
+    Check that the client can send the given conditional put parameters.
+
+    Raises:
+        RuntimeError: If the runtime's boto3 is too old for any of them
+    """
+    missing = missing_put_parameters(s3_client, *parameters)
+    if missing:
+        import botocore
+        raise RuntimeError(
+            f"botocore {botocore.__version__} on this runtime does not support PutObject "
+            f"{', '.join(missing)}; package a newer boto3 or move to a newer runtime"
+        )
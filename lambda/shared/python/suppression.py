@@ -0,0 +1,178 @@
+"""
+Suppression set of destination addresses that must not be forwarded to.
+
+The bounce handler publishes the addresses of aliases it disabled (permanent
+bounces and complaints) to S3; the forwarder loads the set once per container
+and checks destinations against it in memory before sending, so it stops
+sending to a known-bad address even while its own alias data is stale.
+
+The set is a sorted array of truncated SHA-256 hashes of the normalized
+addresses (no address is stored in S3), serialized as gzipped JSON with a
+version stamp that grows by one on every publish:
+
+    {"format": 1, "version": 42, "published_at": 1769601600.0, "rebuilt_at": 1769601000.0,
+     "hashes": ["0a1b...", ...]}
+
+rebuilt_at is the time of the last rebuild from Airtable (0 if there was
+none), which the next rebuild reads changes from.
+
+Publishing is a read-modify-write guarded by a conditional put (If-Match on
+the ETag that was read, or If-None-Match for the first publish), so
+concurrent publishers cannot lose each other's additions.
+"""
+import bisect
+import hashlib
+import json
+import time
+
+SUPPRESSION_FORMAT = 1
+
+# 64-bit hashes: collisions are negligible for a few thousand addresses
+HASH_HEX_CHARS = 16
+
+# Error codes S3 uses for a failed conditional put
+CONFLICT_CODES = ('PreconditionFailed', 'ConditionalRequestConflict', '412')
+
+
+def address_hash(address: str) -> str:
+    """
+    Hash of a normalized (trimmed, lowercased) address.
+
+    Args:
+        address: Email address
+
+    Returns:
+        str: HASH_HEX_CHARS hex characters
+    """
+    return hashlib.sha256((address or '').strip().lower().encode()).hexdigest()[:HASH_HEX_CHARS]
+
+
+def error_code(error: Exception) -> str | None:
+    """The S3 error code of a botocore ClientError, or None."""
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+class SuppressionSet:
+    """Sorted, hashed addresses with membership tests by binary search."""
+
+    def __init__(self, hashes=(), version: int = 0, published_at: float = 0.0, rebuilt_at: float = 0.0):
+        self.hashes = sorted(set(hashes))
+        self.version = version
+        self.published_at = published_at
+        self.rebuilt_at = rebuilt_at
+
+    def __contains__(self, address: str) -> bool:
+        digest = address_hash(address)
+        index = bisect.bisect_left(self.hashes, digest)
+        return index < len(self.hashes) and self.hashes[index] == digest
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def serialize(self) -> bytes:
+        """Gzipped JSON form of the set."""
+        document = {
+            'format': SUPPRESSION_FORMAT,
+            'version': self.version,
+            'published_at': self.published_at,
+            'rebuilt_at': self.rebuilt_at,
+            'hashes': self.hashes
+        }
+        import gzip
+        return gzip.compress(json.dumps(document, separators=(',', ':')).encode(), compresslevel=6)
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> 'SuppressionSet':
+        """
+        Parse bytes produced by serialize.
+
+        Raises:
+            ValueError: If the format is unknown
+        """
+        import gzip
+        document = json.loads(gzip.decompress(data))
+        if document.get('format') != SUPPRESSION_FORMAT:
+            raise ValueError(f"Unknown suppression set format: {document.get('format')}")
+        return cls(document['hashes'], document['version'], document.get('published_at', 0.0),
+                   document.get('rebuilt_at', 0.0))
+
+
+def load(s3_client, bucket: str, key: str, etag: str | None = None) -> tuple[SuppressionSet | None, str | None]:
+    """
+    Load the published set.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Bucket holding the set
+        key: Object key of the set
+        etag: ETag of the copy the caller already has; if it is still current
+            S3 answers 304 and no body is transferred
+
+    Returns:
+        tuple: (the set, its ETag); the set is None if the caller's copy is
+        current, and empty (with no ETag) if nothing was published yet
+    """
+    kwargs = {'Bucket': bucket, 'Key': key}
+    if etag:
+        kwargs['IfNoneMatch'] = etag
+    try:
+        response = s3_client.get_object(**kwargs)
+    except Exception as e:
+        code = error_code(e)
+        if code in ('304', 'NotModified'):
+            return None, etag
+        if code in ('NoSuchKey', '404'):
+            return SuppressionSet(), None
+        raise
+    return SuppressionSet.deserialize(response['Body'].read()), response.get('ETag')
+
+
+def publish(s3_client, bucket: str, key: str, update, max_age_seconds: float | None = None,
+            attempts: int = 5, rebuilt_at: float | None = None) -> SuppressionSet:
+    """
+    Apply an update to the published set and write it back with a
+    conditional put, starting over when another publisher won the race.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Bucket holding the set
+        key: Object key of the set
+        update: Function (set of current hashes) -> set of new hashes
+        max_age_seconds: If the update changes nothing, republish anyway once
+            the set is older than this (so bucket lifecycle rules never expire
+            it); None never republishes an unchanged set. A set's first
+            rebuilt_at stamp is always written.
+        attempts: Conditional puts to try before giving up
+        rebuilt_at: Time of the rebuild this publish completes; None keeps
+            the current set's rebuilt_at
+
+    Returns:
+        SuppressionSet: The published (or unchanged current) set
+
+    Raises:
+        RuntimeError: If every attempt lost a race
+    """
+    for _ in range(attempts):
+        current, etag = load(s3_client, bucket, key)
+        hashes = set(update(set(current.hashes)))
+        if hashes == set(current.hashes) and etag and (rebuilt_at is None or current.rebuilt_at) and (
+                max_age_seconds is None or time.time() - current.published_at < max_age_seconds):
+            return current
+
+        published = SuppressionSet(hashes, current.version + 1, time.time(),
+                                   current.rebuilt_at if rebuilt_at is None else rebuilt_at)
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        try:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=published.serialize(),
+                ContentType='application/json',
+                ContentEncoding='gzip',
+                **condition
+            )
+            return published
+        except Exception as e:
+            if error_code(e) not in CONFLICT_CODES:
+                raise
+    raise RuntimeError(f"Suppression set publish lost {attempts} races for s3://{bucket}/{key}")
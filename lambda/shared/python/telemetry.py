@@ -0,0 +1,130 @@
+"""
+Per-phase timings for the SES Lambda functions.
+
+Phases are timed with a PhaseTimer and published as CloudWatch Embedded
+Metric Format (EMF) log lines: CloudWatch Logs extracts the metrics from the
+JSON, so no PutMetricData calls are made. When Sentry has been imported and
+initialized by the handler, every phase is also recorded as a Sentry span so
+sampled traces show the same breakdown.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import log
+
+DEFAULT_NAMESPACE = 'OperationCode/EmailForwarding'
+
+
+def metrics_enabled() -> bool:
+    """Whether EMF lines should be printed (METRICS_ENABLED, default true)."""
+    return os.environ.get('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+
+def _sentry():
+    """The sentry_sdk module if the handler has already imported it, else None."""
+    return sys.modules.get('sentry_sdk')
+
+
+class PhaseTimer:
+    """
+    Accumulates wall-clock milliseconds per named phase. A phase entered more
+    than once (e.g. one SES send per recipient) is summed. Safe to share
+    between threads.
+    """
+
+    def __init__(self, span_prefix: str = ''):
+        self.span_prefix = span_prefix
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, description: str | None = None):
+        """
+        Time a block of code as the given phase.
+
+        Args:
+            name: Phase name, used as the metric name with an "Ms" suffix
+            description: Optional Sentry span description
+        """
+        sentry_sdk = _sentry()
+        span = None
+        if sentry_sdk is not None:
+            op = f"{self.span_prefix}.{name}" if self.span_prefix else name
+            span = sentry_sdk.start_span(op=op, name=description or name)
+            span.__enter__()
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+            if span is not None:
+                span.__exit__(*sys.exc_info())
+
+    def add(self, name: str, milliseconds: float):
+        """Add a duration measured elsewhere to a phase."""
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + milliseconds
+
+    def metrics(self) -> dict:
+        """Durations as EMF metrics: {'<Phase>Ms': (milliseconds, 'Milliseconds')}."""
+        with self._lock:
+            return {f"{name}Ms": (round(ms, 3), 'Milliseconds') for name, ms in self.durations.items()}
+
+
+def emf_record(metrics: dict, dimensions: dict, properties: dict | None = None,
+               namespace: str | None = None) -> dict:
+    """
+    Build an Embedded Metric Format record.
+
+    Args:
+        metrics: Metric name -> (value, unit); None values are skipped
+        dimensions: Dimension name -> value (keep these low cardinality)
+        properties: Extra searchable fields that are not metrics
+        namespace: CloudWatch namespace (default: METRICS_NAMESPACE env var)
+
+    Returns:
+        dict: JSON-serializable EMF record
+    """
+    metrics = {name: metric for name, metric in metrics.items() if metric[0] is not None}
+    record = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace or os.environ.get('METRICS_NAMESPACE', DEFAULT_NAMESPACE),
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()]
+            }]
+        },
+        **(properties or {}),
+        **dimensions,
+    }
+    for name, (value, _) in metrics.items():
+        record[name] = value
+    return record
+
+
+def emit_metrics(metrics: dict, dimensions: dict, properties: dict | None = None,
+                 namespace: str | None = None):
+    """Print an EMF record as a single log line (no-op when METRICS_ENABLED is false)."""
+    if metrics_enabled():
+        print(json.dumps(emf_record(metrics, dimensions, properties, namespace), separators=(',', ':')))
+
+
+def emit_summary(message: str, metrics: dict, dimensions: dict, properties: dict | None = None):
+    """
+    Print a summary log line that doubles as an EMF record, so one line per
+    message carries both the searchable fields and the metrics. With
+    METRICS_ENABLED=false the same fields are logged at INFO without the
+    EMF directive.
+    """
+    properties = properties or {}
+    if metrics_enabled():
+        emit_metrics(metrics, dimensions, {'level': 'INFO', 'message': message, **properties})
+    else:
+        values = {name: value for name, (value, _) in metrics.items() if value is not None}
+        log.info(message, **properties, **dimensions, **values)
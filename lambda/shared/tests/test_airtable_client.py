@@ -0,0 +1,356 @@
+import http.client
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add the layer's python directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+import airtable_client
+
+
+def make_response(payload, status=200, will_close=False, retry_after=None):
+    """Build a fake http.client response."""
+    response = MagicMock()
+    response.status = status
+    response.getheader.side_effect = lambda name: retry_after if name == 'Retry-After' else None
+    response.will_close = will_close
+    response.read.return_value = json.dumps(payload).encode('utf-8')
+    return response
+
+
+class TestAirtableClient(unittest.TestCase):
+
+    def setUp(self):
+        """Use a fresh pool for every test"""
+        self.pool = airtable_client.ConnectionPool(
+            'api.airtable.com', connect_timeout=2, read_timeout=7, max_idle=4, idle_timeout=30
+        )
+        self.limiter = airtable_client.TokenBucket(rate=0, capacity=0)
+        self.client = airtable_client.AirtableClient(
+            'test_key', 'appTEST123', 'Email Aliases', pool=self.pool, rate_limiter=self.limiter
+        )
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_connection_reused_across_requests(self, mock_connection_cls):
+        """Test that keep-alive connections are reused and timeouts applied"""
+        conn = mock_connection_cls.return_value
+        conn.getresponse.side_effect = [make_response({'records': []}), make_response({'records': []})]
+
+        self.client.request('GET', params={'filterByFormula': "{Email}='a@example.com'"})
+        self.client.request('GET', params={'filterByFormula': "{Email}='b@example.com'"})
+
+        mock_connection_cls.assert_called_once_with('api.airtable.com', timeout=2)
+        conn.sock.settimeout.assert_called_once_with(7)
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['connections_reused'], 1)
+        self.assertEqual(stats['stale_retries'], 0)
+
+        method, path = conn.request.call_args_list[0][0]
+        self.assertEqual(method, 'GET')
+        self.assertTrue(path.startswith('/v0/appTEST123/Email%20Aliases?filterByFormula='))
+        self.assertEqual(conn.request.call_args_list[0][1]['headers']['Authorization'], 'Bearer test_key')
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_stale_connection_retried_on_fresh_connection(self, mock_connection_cls):
+        """Test that a dropped keep-alive connection is replaced transparently"""
+        stale = MagicMock()
+        stale.getresponse.side_effect = [
+            make_response({'records': []}),
+            http.client.RemoteDisconnected('closed'),
+        ]
+        fresh = MagicMock()
+        fresh.getresponse.return_value = make_response({'records': [{'id': 'recABC123'}]})
+        mock_connection_cls.side_effect = [stale, fresh]
+
+        self.client.request('GET')
+        result = self.client.update_records([{'id': 'recABC123', 'fields': {'bounce_count': 1}}])
+
+        self.assertEqual(result, [{'id': 'recABC123'}])
+        stale.close.assert_called_once()
+        self.assertEqual(self.pool.get_stats()['stale_retries'], 1)
+        self.assertEqual(self.pool.get_stats()['connections_opened'], 2)
+        method, path = fresh.request.call_args[0]
+        self.assertEqual((method, path), ('PATCH', '/v0/appTEST123/Email%20Aliases'))
+        self.assertEqual(json.loads(fresh.request.call_args[1]['body']),
+                         {'records': [{'id': 'recABC123', 'fields': {'bounce_count': 1}}]})
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_idle_connection_expires(self, mock_connection_cls):
+        """Test that connections idle longer than the idle timeout are not reused"""
+        mock_connection_cls.return_value.getresponse.side_effect = [
+            make_response({'records': []}), make_response({'records': []})
+        ]
+
+        with patch('airtable_client.time.monotonic', return_value=100.0):
+            self.client.request('GET')
+        with patch('airtable_client.time.monotonic', return_value=131.0):
+            self.client.request('GET')
+
+        self.assertEqual(self.pool.get_stats()['connections_opened'], 2)
+        self.assertEqual(self.pool.get_stats()['connections_reused'], 0)
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_http_error_raises(self, mock_connection_cls):
+        """Test that error statuses raise AirtableError and keep the connection"""
+        mock_connection_cls.return_value.getresponse.return_value = make_response(
+            {'error': 'NOT_FOUND'}, status=404
+        )
+
+        with self.assertRaises(airtable_client.AirtableError) as ctx:
+            self.client.request('GET', record_id='recMISSING')
+
+        self.assertEqual(ctx.exception.status, 404)
+        self.assertIn('NOT_FOUND', ctx.exception.body)
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_http_error_message_leaves_out_formula_and_body(self, mock_connection_cls):
+        """Test that the logged error message holds neither the filter formula nor the response body"""
+        mock_connection_cls.return_value.getresponse.return_value = make_response(
+            {'error': {'type': 'INVALID_FILTER_BY_FORMULA', 'message': "Invalid formula: FIND('bob@example.com')"}},
+            status=422
+        )
+
+        with self.assertRaises(airtable_client.AirtableError) as ctx:
+            self.client.request('GET', params={'filterByFormula': "FIND('bob@example.com', {Email})"})
+
+        self.assertEqual(str(ctx.exception), 'GET /v0/appTEST123/Email%20Aliases failed: 422 INVALID_FILTER_BY_FORMULA')
+        self.assertNotIn('bob', str(ctx.exception))
+        self.assertIn('bob@example.com', ctx.exception.body)
+        self.assertEqual(ctx.exception.error_type, 'INVALID_FILTER_BY_FORMULA')
+
+    @patch('airtable_client.time.sleep')
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_server_errors_retried_with_backoff(self, mock_connection_cls, mock_sleep):
+        """Test that 5xx responses are retried, honoring Retry-After"""
+        mock_connection_cls.return_value.getresponse.side_effect = [
+            make_response({'errors': 'SERVER'}, status=503, retry_after='2'),
+            make_response({'errors': 'SERVER'}, status=502),
+            make_response({'records': []}),
+        ]
+
+        with patch('airtable_client.random.uniform', return_value=0.1):
+            result = self.client.request('GET')
+
+        self.assertEqual(result, {'records': []})
+        self.assertEqual([c[0][0] for c in mock_sleep.call_args_list], [2.1, 0.1])
+        self.assertEqual(self.pool.get_stats()['retried'], 2)
+
+    @patch('airtable_client.time.sleep')
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_throttled_request_fails_fast_and_locks_out(self, mock_connection_cls, mock_sleep):
+        """Test that a 429 is raised without retrying and later requests are not sent during the lockout"""
+        conn = mock_connection_cls.return_value
+        conn.getresponse.return_value = make_response({'errors': 'RATE_LIMIT'}, status=429)
+
+        with self.assertRaises(airtable_client.AirtableError) as ctx:
+            self.client.request('GET')
+        self.assertEqual(ctx.exception.status, 429)
+        self.assertGreater(self.limiter.paused_for(), 29)
+
+        with self.assertRaises(airtable_client.AirtableError) as ctx:
+            self.client.request('GET')
+        self.assertEqual(ctx.exception.status, 429)
+
+        self.assertEqual(conn.request.call_count, 1)
+        mock_sleep.assert_not_called()
+        stats = self.pool.get_stats()
+        self.assertEqual(stats['throttled'], 1)
+        self.assertEqual(stats['locked_out'], 1)
+        self.assertEqual(stats['retried'], 0)
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_throttled_request_pauses_for_retry_after(self, mock_connection_cls):
+        """Test that the lockout follows Retry-After when Airtable sends one"""
+        mock_connection_cls.return_value.getresponse.return_value = make_response({}, status=429, retry_after='5')
+
+        with self.assertRaises(airtable_client.AirtableError):
+            self.client.request('GET')
+
+        self.assertLessEqual(self.limiter.paused_for(), 5)
+        self.assertGreater(self.limiter.paused_for(), 4)
+
+    @patch('airtable_client.time.sleep')
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_retries_exhausted_raises(self, mock_connection_cls, mock_sleep):
+        """Test that persistent server errors raise once retries run out"""
+        os.environ['AIRTABLE_MAX_RETRIES'] = '2'
+        self.addCleanup(os.environ.pop, 'AIRTABLE_MAX_RETRIES')
+        client = airtable_client.AirtableClient(
+            'test_key', 'appTEST123', 'Email Aliases', pool=self.pool, rate_limiter=self.limiter
+        )
+        mock_connection_cls.return_value.getresponse.side_effect = lambda: make_response({}, status=503)
+
+        with self.assertRaises(airtable_client.AirtableError) as ctx:
+            client.request('GET')
+
+        self.assertEqual(ctx.exception.status, 503)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(self.pool.get_stats()['retried'], 2)
+
+    @patch('airtable_client.time.sleep')
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_retry_after_beyond_cap_raises_immediately(self, mock_connection_cls, mock_sleep):
+        """Test that a Retry-After longer than the backoff cap is not slept through"""
+        mock_connection_cls.return_value.getresponse.return_value = make_response({}, status=503, retry_after='30')
+
+        with self.assertRaises(airtable_client.AirtableError):
+            self.client.request('GET')
+
+        mock_sleep.assert_not_called()
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_client_errors_not_retried(self, mock_connection_cls):
+        """Test that 4xx errors other than 429 fail immediately"""
+        mock_connection_cls.return_value.getresponse.return_value = make_response({}, status=422)
+
+        with self.assertRaises(airtable_client.AirtableError):
+            self.client.request('GET')
+
+        self.assertEqual(mock_connection_cls.return_value.request.call_count, 1)
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_list_records_paginates(self, mock_connection_cls):
+        """Test that listing follows offsets and requests only the given fields"""
+        conn = mock_connection_cls.return_value
+        conn.getresponse.side_effect = [
+            make_response({'records': [{'id': 'rec1', 'fields': {}}], 'offset': 'itr1'}),
+            make_response({'records': [{'id': 'rec2', 'fields': {}}]}),
+        ]
+
+        records = list(self.client.list_records("{Status} = 'active'", ['Alias', 'Email']))
+
+        self.assertEqual([r['id'] for r in records], ['rec1', 'rec2'])
+        second_path = conn.request.call_args_list[1][0][1]
+        self.assertIn('offset=itr1', second_path)
+        self.assertIn('fields%5B%5D=Alias', second_path)
+        self.assertIn('pageSize=100', second_path)
+
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_update_records_batches_by_ten(self, mock_connection_cls):
+        """Test that multi-record updates are sent as PATCHes of at most 10 records"""
+        conn = mock_connection_cls.return_value
+        conn.getresponse.side_effect = [
+            make_response({'records': [{'id': f"rec{i}"} for i in range(10)]}),
+            make_response({'records': [{'id': f"rec{i}"} for i in range(10, 12)]}),
+        ]
+
+        records = [{'id': f"rec{i}", 'fields': {'bounce_count': i}} for i in range(12)]
+        updated = self.client.update_records(records)
+
+        self.assertEqual(len(updated), 12)
+        self.assertEqual(conn.request.call_count, 2)
+        method, path = conn.request.call_args_list[0][0][:2]
+        self.assertEqual((method, path), ('PATCH', '/v0/appTEST123/Email%20Aliases'))
+        second_body = json.loads(conn.request.call_args_list[1][1]['body'])
+        self.assertEqual(second_body['records'], records[10:])
+
+    @patch('airtable_client.http.client.HTTPSConnection')
+    def test_update_records_reports_written_chunks_on_failure(self, mock_connection_cls):
+        """Test that the ids of the requests that succeeded are known when a later request fails"""
+        mock_connection_cls.return_value.getresponse.side_effect = [
+            make_response({'records': []}),
+            make_response({'error': 'INVALID'}, status=422),
+        ]
+        records = [{'id': f"rec{i}", 'fields': {'bounce_count': i}} for i in range(12)]
+        written = []
+
+        with self.assertRaises(airtable_client.AirtableError):
+            self.client.update_records(records, written)
+
+        self.assertEqual(written, [f"rec{i}" for i in range(10)])
+
+class TestStatsMetrics(unittest.TestCase):
+
+    def test_stats_metrics_report_counts_since_snapshot(self):
+        """Test that only the counts since the snapshot are reported, named as EMF metrics"""
+        pool = airtable_client.get_pool()
+        limiter = airtable_client.get_rate_limiter()
+        pool.count('requests', 4)
+        since = airtable_client.get_stats()
+        pool.count('requests', 3)
+        pool.count('connections_reused', 2)
+        pool.count('throttled')
+        with limiter._lock:
+            limiter.stats['rate_limit_wait_seconds'] += 0.25
+
+        metrics = airtable_client.stats_metrics(since)
+
+        self.assertEqual(metrics['AirtableRequests'], (3, 'Count'))
+        self.assertEqual(metrics['AirtableConnectionsReused'], (2, 'Count'))
+        self.assertEqual(metrics['AirtableThrottled'], (1, 'Count'))
+        self.assertEqual(metrics['AirtableLockedOut'], (0, 'Count'))
+        self.assertEqual(metrics['AirtableRateLimitWaitMs'], (250.0, 'Milliseconds'))
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    @patch('airtable_client.time.sleep')
+    @patch('airtable_client.time.monotonic')
+    def test_waits_when_bucket_is_empty(self, mock_monotonic, mock_sleep):
+        """Test that requests beyond the burst wait for tokens to refill"""
+        clock = [100.0]
+        mock_monotonic.side_effect = lambda: clock[0]
+        mock_sleep.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+
+        bucket = airtable_client.TokenBucket(rate=5, capacity=2)
+        for _ in range(3):
+            bucket.acquire()
+
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args[0][0], 0.2)
+        self.assertEqual(bucket.get_stats()['rate_limit_waits'], 1)
+
+    @patch('airtable_client.time.sleep')
+    @patch('airtable_client.time.monotonic')
+    def test_pause_blocks_until_window_passes(self, mock_monotonic, mock_sleep):
+        """Test that a 429 pause holds every caller back"""
+        clock = [100.0]
+        mock_monotonic.side_effect = lambda: clock[0]
+        mock_sleep.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+
+        bucket = airtable_client.TokenBucket(rate=5, capacity=5)
+        bucket.pause(3)
+        bucket.acquire()
+
+        self.assertGreaterEqual(clock[0], 103.0)
+
+
+class TestFormulas(unittest.TestCase):
+
+    def test_formula_string_escapes_quotes_and_backslashes(self):
+        """Test that string literals cannot break out of the formula"""
+        self.assertEqual(airtable_client.formula_string("o'brien"), "'o\\'brien'")
+        self.assertEqual(airtable_client.formula_string("a\\b"), "'a\\\\b'")
+
+    def test_match_any_formulas_splits_on_url_length(self):
+        """Test that OR() formulas are chunked to stay within the URL budget"""
+        values = [f'alias{i:03d}' for i in range(300)]
+
+        chunks = list(airtable_client.match_any_formulas('Alias', values, "{Status} = 'active'", max_length=2000))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual([v for _, chunk in chunks for v in chunk], values)
+        for formula, chunk in chunks:
+            self.assertLessEqual(len(airtable_client.urllib.parse.quote(formula)), 2000)
+            self.assertTrue(formula.startswith("AND({Status} = 'active', OR({Alias} = "))
+
+
+    def test_match_any_formulas_contains(self):
+        """Test that contains mode matches a value anywhere in the field, case-insensitively"""
+        chunks = list(airtable_client.match_any_formulas('Email', ['Bob@Example.com', "o'neil@example.com"],
+                                                         contains=True))
+
+        self.assertEqual(chunks, [(
+            "OR(FIND('bob@example.com', LOWER({Email} & '')), FIND('o\\'neil@example.com', LOWER({Email} & '')))",
+            ['Bob@Example.com', "o'neil@example.com"]
+        )])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+
+# Add the layer's python directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+from lazy_module import LazyModule
+
+
+class TestLazyModule(unittest.TestCase):
+
+    def test_imports_on_first_attribute_access(self):
+        """Test that the module is only imported when an attribute is read"""
+        sys.modules.pop('colorsys', None)
+        module = LazyModule('colorsys')
+
+        self.assertIn('not loaded', repr(module))
+        self.assertNotIn('colorsys', sys.modules)
+
+        self.assertEqual(module.rgb_to_hsv(0, 0, 0), (0.0, 0.0, 0.0))
+        self.assertIn('colorsys', sys.modules)
+
+    def test_load_returns_module(self):
+        """Test that load() imports eagerly and returns the real module"""
+        module = LazyModule('json')
+
+        self.assertIs(module.load(), sys.modules['json'])
+        self.assertEqual(repr(module), "<LazyModule 'json' (loaded)>")
+
+    def test_missing_attribute_raises(self):
+        """Test that unknown attributes raise AttributeError like the real module"""
+        with self.assertRaises(AttributeError):
+            LazyModule('json').not_a_function
+
+
+if __name__ == '__main__':
+    unittest.main()
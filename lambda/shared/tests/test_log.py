@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add the layer's python directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+import log
+
+
+class TestLog(unittest.TestCase):
+
+    def setUp(self):
+        """Re-read settings from the environment for each test"""
+        log._settings = None
+        self.addCleanup(setattr, log, '_settings', None)
+
+    @patch.dict(os.environ, {'LOG_LEVEL': 'WARNING'})
+    @patch('builtins.print')
+    def test_levels_below_threshold_are_dropped(self, mock_print):
+        """Test that LOG_LEVEL filters lines before they are formatted"""
+        log.info('dropped')
+        log.warning('kept', count=2)
+
+        mock_print.assert_called_once()
+        self.assertEqual(json.loads(mock_print.call_args[0][0]), {'level': 'WARNING', 'message': 'kept', 'count': 2})
+
+    def test_redact_address(self):
+        """Test that the local part is masked and a stable hash is kept for correlation"""
+        redacted = log.redact_address('John482@Example.com')
+
+        self.assertTrue(redacted.startswith('J***@Example.com#'))
+        self.assertEqual(redacted.split('#')[1], log.redact_address('john482@example.com').split('#')[1])
+        self.assertIsNone(log.redact_address(None))
+        self.assertEqual(log.redact_address('not-an-address'), '***')
+
+    @patch.dict(os.environ, {'LOG_REDACT_ADDRESSES': 'false'})
+    def test_redaction_can_be_disabled(self):
+        """Test that LOG_REDACT_ADDRESSES=false leaves addresses intact"""
+        self.assertEqual(log.redact_text('to alice@example.com'), 'to alice@example.com')
+
+    def test_redact_text(self):
+        """Test that every address in free text is redacted"""
+        text = log.redact_text('from alice@example.com to bob@coders.operationcode.org')
+
+        self.assertNotIn('alice@', text)
+        self.assertNotIn('bob@', text)
+        self.assertIn('a***@example.com#', text)
+
+    @patch('log.random.random', return_value=0.5)
+    @patch('builtins.print')
+    def test_event_dumps_are_sampled(self, mock_print, mock_random):
+        """Test that events are only dumped for the sampled fraction of invocations"""
+        event = {'mail': {'source': 'alice@example.com'}}
+
+        with patch.dict(os.environ, {'LOG_EVENT_SAMPLE_RATE': '0.1'}):
+            log.log_event(event)
+        mock_print.assert_not_called()
+
+        log._settings = None
+        with patch.dict(os.environ, {'LOG_EVENT_SAMPLE_RATE': '0.9'}):
+            log.log_event(event)
+        line = json.loads(mock_print.call_args[0][0])
+        self.assertEqual(line['message'], 'Received event')
+        self.assertTrue(line['event']['mail']['source'].startswith('a***@example.com#'))
+
+    @patch.dict(os.environ, {'LOG_LEVEL': 'DEBUG', 'LOG_EVENT_SAMPLE_RATE': '0'})
+    @patch('builtins.print')
+    def test_debug_level_dumps_every_event(self, mock_print):
+        """Test that LOG_LEVEL=DEBUG dumps every event regardless of sampling"""
+        log.log_event({'Records': []})
+
+        mock_print.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
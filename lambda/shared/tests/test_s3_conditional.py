@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# Add the layer's python directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+import s3_conditional
+
+
+def make_client(members):
+    """Build a fake S3 client whose PutObject model has the given parameters."""
+    client = MagicMock()
+    client.meta.service_model.operation_model.return_value.input_shape.members = {
+        name: MagicMock() for name in members
+    }
+    return client
+
+
+class TestS3Conditional(unittest.TestCase):
+
+    def test_supported_parameters_pass(self):
+        """Test that a client that knows the parameters passes the check"""
+        client = make_client(['Bucket', 'Key', 'Body', 'IfMatch', 'IfNoneMatch'])
+
+        self.assertEqual(s3_conditional.missing_put_parameters(client, 'IfMatch', 'IfNoneMatch'), [])
+        s3_conditional.require_put_parameters(client, 'IfMatch', 'IfNoneMatch')
+
+        client.meta.service_model.operation_model.assert_called_with('PutObject')
+
+    def test_old_runtime_fails_loudly(self):
+        """Test that a client without If-Match is reported by name"""
+        client = make_client(['Bucket', 'Key', 'Body', 'IfNoneMatch'])
+
+        with self.assertRaises(RuntimeError) as ctx:
+            s3_conditional.require_put_parameters(client, 'IfMatch', 'IfNoneMatch')
+
+        self.assertIn('IfMatch', str(ctx.exception))
+        self.assertNotIn('IfNoneMatch', str(ctx.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+# Add the layer's python directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+import suppression
+
+
+class ClientError(Exception):
+    """Stand-in for botocore's ClientError."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+def s3_object(suppression_set, etag):
+    """Fake get_object response."""
+    return {'Body': MagicMock(read=MagicMock(return_value=suppression_set.serialize())), 'ETag': etag}
+
+
+class TestSuppressionSet(unittest.TestCase):
+
+    def test_membership_is_normalized(self):
+        """Test that addresses match regardless of case and surrounding whitespace"""
+        suppressed = suppression.SuppressionSet([suppression.address_hash('Bad@Example.com')])
+
+        self.assertIn(' bad@example.com', suppressed)
+        self.assertNotIn('good@example.com', suppressed)
+
+    def test_serialize_round_trip(self):
+        """Test that the set, version, publish and rebuild times survive serialization"""
+        original = suppression.SuppressionSet(
+            [suppression.address_hash(a) for a in ['c@example.com', 'a@example.com']], version=7, published_at=1.5,
+            rebuilt_at=1.0
+        )
+
+        loaded = suppression.SuppressionSet.deserialize(original.serialize())
+
+        self.assertEqual(loaded.hashes, sorted(original.hashes))
+        self.assertEqual((loaded.version, loaded.published_at, loaded.rebuilt_at), (7, 1.5, 1.0))
+        self.assertIn('a@example.com', loaded)
+
+
+class TestSuppressionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.s3_client = MagicMock()
+
+    def test_load_not_modified(self):
+        """Test that a current copy is not downloaded again"""
+        self.s3_client.get_object.side_effect = ClientError('304')
+
+        self.assertEqual(suppression.load(self.s3_client, 'bucket', 'key', etag='"e1"'), (None, '"e1"'))
+        self.assertEqual(self.s3_client.get_object.call_args[1]['IfNoneMatch'], '"e1"')
+
+    def test_load_missing_is_empty(self):
+        """Test that an unpublished set loads as empty"""
+        self.s3_client.get_object.side_effect = ClientError('NoSuchKey')
+
+        loaded, etag = suppression.load(self.s3_client, 'bucket', 'key')
+
+        self.assertEqual((len(loaded), etag), (0, None))
+
+    def test_publish_first_version(self):
+        """Test that the first publish only succeeds if nothing was published meanwhile"""
+        self.s3_client.get_object.side_effect = ClientError('NoSuchKey')
+
+        published = suppression.publish(self.s3_client, 'bucket', 'key',
+                                        lambda hashes: hashes | {suppression.address_hash('bad@example.com')})
+
+        self.assertEqual(published.version, 1)
+        kwargs = self.s3_client.put_object.call_args[1]
+        self.assertEqual(kwargs['IfNoneMatch'], '*')
+        self.assertIn('bad@example.com', suppression.SuppressionSet.deserialize(kwargs['Body']))
+
+    def test_publish_retries_lost_race(self):
+        """Test that a conflicting put re-reads the set so no addition is lost"""
+        first = suppression.SuppressionSet([suppression.address_hash('a@example.com')], version=3)
+        second = suppression.SuppressionSet([suppression.address_hash(a) for a in ['a@example.com', 'b@example.com']],
+                                            version=4)
+        self.s3_client.get_object.side_effect = [s3_object(first, '"e3"'), s3_object(second, '"e4"')]
+        self.s3_client.put_object.side_effect = [ClientError('PreconditionFailed'), {}]
+
+        published = suppression.publish(self.s3_client, 'bucket', 'key',
+                                        lambda hashes: hashes | {suppression.address_hash('c@example.com')})
+
+        self.assertEqual(published.version, 5)
+        self.assertEqual(len(published), 3)
+        self.assertEqual(published.rebuilt_at, 0.0)
+        self.assertEqual(self.s3_client.put_object.call_args[1]['IfMatch'], '"e4"')
+
+    def test_publish_skips_unchanged_set(self):
+        """Test that an update that changes nothing writes nothing until the set is old"""
+        current = suppression.SuppressionSet([suppression.address_hash('a@example.com')], version=3,
+                                             published_at=suppression.time.time())
+        self.s3_client.get_object.return_value = s3_object(current, '"e3"')
+
+        self.assertEqual(suppression.publish(self.s3_client, 'bucket', 'key', lambda hashes: hashes).version, 3)
+        self.s3_client.put_object.assert_not_called()
+
+        suppression.publish(self.s3_client, 'bucket', 'key', lambda hashes: hashes, max_age_seconds=0)
+        self.s3_client.put_object.assert_called_once()
+
+    def test_publish_stamps_rebuild_time(self):
+        """Test that a rebuild's time is stored and kept by later publishes"""
+        current = suppression.SuppressionSet([], version=1, rebuilt_at=100.0)
+        self.s3_client.get_object.return_value = s3_object(current, '"e1"')
+
+        rebuilt = suppression.publish(self.s3_client, 'bucket', 'key',
+                                      lambda hashes: hashes | {suppression.address_hash('a@example.com')},
+                                      rebuilt_at=200.0)
+        added = suppression.publish(self.s3_client, 'bucket', 'key',
+                                    lambda hashes: hashes | {suppression.address_hash('b@example.com')})
+
+        self.assertEqual((rebuilt.rebuilt_at, added.rebuilt_at), (200.0, 100.0))
+
+    def test_publish_writes_first_rebuild_stamp(self):
+        """Test that an unchanged set is written once to record its first rebuild"""
+        current = suppression.SuppressionSet([], version=1, published_at=suppression.time.time())
+        self.s3_client.get_object.return_value = s3_object(current, '"e1"')
+
+        published = suppression.publish(self.s3_client, 'bucket', 'key', lambda hashes: hashes, rebuilt_at=300.0)
+
+        self.assertEqual((published.version, published.rebuilt_at), (2, 300.0))
+        self.s3_client.put_object.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add the layer's python directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'python')))
+
+import telemetry
+
+
+class TestPhaseTimer(unittest.TestCase):
+
+    @patch.dict(sys.modules, {'sentry_sdk': None})
+    @patch('telemetry.time.perf_counter')
+    def test_phases_are_summed(self, mock_perf_counter):
+        """Test that repeated phases accumulate and are reported in milliseconds"""
+        mock_perf_counter.side_effect = [1.0, 1.25, 2.0, 2.5, 3.0, 3.1]
+        timer = telemetry.PhaseTimer()
+
+        with timer.phase('SesSend'):
+            pass
+        with timer.phase('SesSend'):
+            pass
+        with timer.phase('S3Fetch'):
+            pass
+
+        self.assertEqual(timer.metrics(), {
+            'SesSendMs': (750.0, 'Milliseconds'),
+            'S3FetchMs': (100.0, 'Milliseconds'),
+        })
+
+    @patch.dict(sys.modules, {'sentry_sdk': None})
+    def test_phase_recorded_when_block_raises(self):
+        """Test that a failing phase is still timed"""
+        timer = telemetry.PhaseTimer()
+
+        with self.assertRaises(ValueError):
+            with timer.phase('AirtablePatch'):
+                raise ValueError('boom')
+
+        self.assertIn('AirtablePatchMs', timer.metrics())
+
+    def test_sentry_span_per_phase(self):
+        """Test that each phase opens a Sentry span when sentry_sdk is loaded"""
+        mock_sentry = MagicMock()
+        timer = telemetry.PhaseTimer('forward')
+
+        with patch.dict(sys.modules, {'sentry_sdk': mock_sentry}):
+            with timer.phase('S3Fetch', 'msg-1'):
+                pass
+
+        mock_sentry.start_span.assert_called_once_with(op='forward.S3Fetch', name='msg-1')
+        mock_sentry.start_span.return_value.__exit__.assert_called_once()
+
+
+class TestEmbeddedMetrics(unittest.TestCase):
+
+    def test_emf_record(self):
+        """Test the Embedded Metric Format structure"""
+        record = telemetry.emf_record(
+            {'S3FetchMs': (12.5, 'Milliseconds'), 'Attachments': (None, 'Count')},
+            {'Service': 'ses_email_forwarder'},
+            {'messageId': 'abc'},
+            namespace='Test/Namespace'
+        )
+
+        directive = record['_aws']['CloudWatchMetrics'][0]
+        self.assertEqual(directive['Namespace'], 'Test/Namespace')
+        self.assertEqual(directive['Dimensions'], [['Service']])
+        self.assertEqual(directive['Metrics'], [{'Name': 'S3FetchMs', 'Unit': 'Milliseconds'}])
+        self.assertEqual(record['S3FetchMs'], 12.5)
+        self.assertEqual(record['Service'], 'ses_email_forwarder')
+        self.assertEqual(record['messageId'], 'abc')
+        self.assertNotIn('Attachments', record)
+
+    @patch('builtins.print')
+    def test_emit_metrics_prints_one_json_line(self, mock_print):
+        """Test that metrics are written as a single JSON log line"""
+        telemetry.emit_metrics({'Recipients': (2, 'Count')}, {'Service': 'test'})
+
+        line = mock_print.call_args[0][0]
+        self.assertNotIn('\n', line)
+        self.assertEqual(json.loads(line)['Recipients'], 2)
+
+    @patch.dict(os.environ, {'METRICS_ENABLED': 'false'})
+    @patch('builtins.print')
+    def test_emit_metrics_disabled(self, mock_print):
+        """Test that METRICS_ENABLED=false suppresses EMF output"""
+        telemetry.emit_metrics({'Recipients': (2, 'Count')}, {'Service': 'test'})
+
+        mock_print.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
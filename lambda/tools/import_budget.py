@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Cold-start import budget for the SES Lambda handlers.
+
+Imports each handler in a fresh interpreter with `python -X importtime`, reports
+the most expensive modules and fails when the handler's cumulative import time
+goes over budget, or when a module that should be loaded lazily is imported at
+module level. The Lambda bootstrap is not run (AWS_LAMBDA_FUNCTION_NAME is
+removed from the environment), so only the import itself is measured.
+
+Usage:
+    python lambda/tools/import_budget.py
+    python lambda/tools/import_budget.py --budget-ms 120 --runs 5 ses_email_forwarder
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+LAMBDA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SHARED_PYTHON_DIR = os.path.join(LAMBDA_DIR, 'shared', 'python')
+
+DEFAULT_FUNCTIONS = ['ses_email_forwarder', 'ses_bounce_handler']
+DEFAULT_BUDGET_MS = 150.0
+
+# Modules that must only be imported on the code paths that use them
+DEFAULT_FORBIDDEN = ['boto3', 'botocore', 'sentry_sdk', 'email.mime.multipart', 'email.mime.base']
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$')
+
+
+def parse_importtime(output: str) -> list[dict]:
+    """
+    Parse `-X importtime` output.
+
+    Args:
+        output: stderr of an interpreter run with -X importtime
+
+    Returns:
+        list: {'module', 'self_us', 'cumulative_us', 'depth'} in import order
+    """
+    modules = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append({
+                'module': module,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': (len(indent) - 1) // 2
+            })
+    return modules
+
+
+def measure_import(function: str) -> list[dict]:
+    """
+    Import a handler in a fresh interpreter and return its import timings.
+
+    Args:
+        function: Lambda directory under lambda/ (e.g. ses_email_forwarder)
+
+    Returns:
+        list: Parsed import timings, see parse_importtime
+    """
+    env = dict(os.environ)
+    env.pop('AWS_LAMBDA_FUNCTION_NAME', None)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.join(LAMBDA_DIR, function), SHARED_PYTHON_DIR])
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import handler'],
+        cwd=os.path.join(LAMBDA_DIR, function),
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {function} failed:\n{result.stderr}")
+    return parse_importtime(result.stderr)
+
+
+def handler_subtree(modules: list[dict]) -> list[dict]:
+    """
+    Return the handler module and everything its import pulled in, dropping
+    modules loaded by interpreter startup (site, .pth files).
+    importtime prints a module after its children, so the subtree is the run of
+    nested entries directly preceding the top-level handler entry.
+    """
+    for index, entry in enumerate(modules):
+        if entry['module'] == 'handler' and entry['depth'] == 0:
+            start = index
+            while start > 0 and modules[start - 1]['depth'] > 0:
+                start -= 1
+            return modules[start:index + 1]
+    raise ValueError("handler module not found in importtime output")
+
+
+def handler_cost_ms(modules: list[dict]) -> float:
+    """Cumulative import time of the top-level handler module in milliseconds."""
+    return handler_subtree(modules)[-1]['cumulative_us'] / 1000
+
+
+def forbidden_imports(modules: list[dict], forbidden: list[str]) -> list[str]:
+    """Return the forbidden modules (or their submodules) that the handler imported."""
+    imported = {entry['module'] for entry in handler_subtree(modules)}
+    return sorted(
+        name for name in forbidden
+        if any(module == name or module.startswith(name + '.') for module in imported)
+    )
+
+
+def check_function(function: str, budget_ms: float, runs: int, forbidden: list[str], top: int) -> bool:
+    """
+    Measure one handler, print a report and return whether it is within budget.
+    The median of several runs is used to smooth out noise from the machine.
+    """
+    samples = [measure_import(function) for _ in range(runs)]
+    costs = [handler_cost_ms(modules) for modules in samples]
+    cost = statistics.median(costs)
+    # Report the module breakdown of the run closest to the median
+    modules = samples[costs.index(min(costs, key=lambda c: abs(c - cost)))]
+
+    print(f"{function}: import handler {cost:.1f} ms (budget {budget_ms:.1f} ms, median of {runs})")
+    children = [entry for entry in handler_subtree(modules) if entry['depth'] == 1]
+    for entry in sorted(children, key=lambda e: e['cumulative_us'], reverse=True)[:top]:
+        print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+
+    ok = True
+    if cost > budget_ms:
+        print(f"  FAIL: over budget by {cost - budget_ms:.1f} ms")
+        ok = False
+
+    eager = forbidden_imports(modules, forbidden)
+    if eager:
+        print(f"  FAIL: imported at module level: {', '.join(eager)}")
+        ok = False
+    return ok
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('functions', nargs='*', default=DEFAULT_FUNCTIONS,
+                        help='Lambda directories under lambda/ to check')
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('IMPORT_BUDGET_MS', DEFAULT_BUDGET_MS)),
+                        help='Maximum cumulative import time of handler.py')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per handler; the median is compared')
+    parser.add_argument('--top', type=int, default=10, help='Number of direct imports to report')
+    parser.add_argument('--forbid', action='append', default=None,
+                        help='Module that must not be imported at module level (repeatable)')
+    args = parser.parse_args(argv)
+
+    forbidden = args.forbid if args.forbid is not None else DEFAULT_FORBIDDEN
+    results = [check_function(f, args.budget_ms, args.runs, forbidden, args.top) for f in args.functions]
+    return 0 if all(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+
+# Add the tools directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import import_budget
+
+SAMPLE_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       200 |        300 |   encodings.aliases
+import time:       900 |       1500 | site
+import time:       500 |        500 |     http.client
+import time:      1000 |       1500 |   airtable_client
+import time:       400 |        400 |     sentry_sdk.consts
+import time:       300 |        700 |   sentry_sdk
+import time:      2000 |       4200 | handler
+"""
+
+
+class TestImportBudget(unittest.TestCase):
+
+    def test_parse_importtime(self):
+        """Test that importtime lines are parsed with their nesting depth"""
+        modules = import_budget.parse_importtime(SAMPLE_OUTPUT)
+
+        self.assertEqual(len(modules), 7)
+        self.assertEqual(modules[0], {'module': 'encodings.aliases', 'self_us': 200, 'cumulative_us': 300, 'depth': 1})
+        self.assertEqual(modules[2]['depth'], 2)
+        self.assertEqual(modules[-1]['module'], 'handler')
+        self.assertEqual(modules[-1]['depth'], 0)
+
+    def test_handler_subtree_excludes_startup_imports(self):
+        """Test that modules imported by interpreter startup are not charged to the handler"""
+        modules = import_budget.parse_importtime(SAMPLE_OUTPUT)
+
+        subtree = import_budget.handler_subtree(modules)
+
+        self.assertEqual(
+            [entry['module'] for entry in subtree],
+            ['http.client', 'airtable_client', 'sentry_sdk.consts', 'sentry_sdk', 'handler']
+        )
+        self.assertEqual(import_budget.handler_cost_ms(modules), 4.2)
+
+    def test_forbidden_imports(self):
+        """Test that eager imports of lazily loaded modules (and their submodules) are reported"""
+        modules = import_budget.parse_importtime(SAMPLE_OUTPUT)
+
+        self.assertEqual(import_budget.forbidden_imports(modules, ['boto3', 'sentry_sdk', 'encodings']), ['sentry_sdk'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+# ============================================================================
+# Lambda Function Flushing the Bounce Counter Log
+# ============================================================================
+# The bounce handler appends bounce/complaint counter increments to
+# bounce-counters/ in the email bucket instead of writing them to Airtable;
+# this function folds them into Airtable on a schedule. Reserved concurrency
+# of 1 keeps two flushes from updating the same counters at once.
+
+resource "aws_lambda_function" "bounce_counter_flush" {
+  filename                       = data.archive_file.bounce_lambda_zip.output_path
+  function_name                  = "ses-bounce-counter-flush"
+  role                           = aws_iam_role.bounce_lambda_execution.arn
+  handler                        = "handler.flush_counters"
+  source_code_hash               = data.archive_file.bounce_lambda_zip.output_base64sha256
+  runtime                        = "python3.12"
+  timeout                        = 120
+  memory_size                    = 256
+  architectures                  = ["arm64"]
+  reserved_concurrent_executions = 1
+
+  layers = [
+    "arn:aws:lambda:us-east-1:943013980633:layer:SentryPythonServerlessSDK:188",
+    aws_lambda_layer_version.shared.arn
+  ]
+
+  # Counter updates need the current values, so the record id cache is never used here
+  environment {
+    variables = merge(local.bounce_handler_environment, { RECORD_CACHE_SEED_SECONDS = "0" })
+  }
+
+  depends_on = [
+    aws_cloudwatch_log_group.bounce_counter_flush,
+    aws_iam_role_policy_attachment.bounce_lambda_basic_execution,
+    aws_iam_role_policy.bounce_lambda_execution,
+    aws_iam_role_policy.bounce_counter_log
+  ]
+
+  tags = {
+    Name        = "SES Bounce Counter Flush"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "bounce_counter_flush" {
+  name              = "/aws/lambda/ses-bounce-counter-flush"
+  retention_in_days = 14
+
+  tags = {
+    Name        = "SES Bounce Counter Flush Lambda Logs"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+# ============================================================================
+# EventBridge Schedule
+# ============================================================================
+
+resource "aws_cloudwatch_event_rule" "bounce_counter_flush" {
+  name                = "ses-bounce-counter-flush"
+  description         = "Fold buffered bounce/complaint counters into Airtable"
+  schedule_expression = var.bounce_counter_flush_schedule
+
+  tags = {
+    Name        = "SES Bounce Counter Flush Schedule"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+resource "aws_cloudwatch_event_target" "bounce_counter_flush" {
+  rule = aws_cloudwatch_event_rule.bounce_counter_flush.name
+  arn  = aws_lambda_function.bounce_counter_flush.arn
+}
+
+resource "aws_lambda_permission" "eventbridge_bounce_counter_flush" {
+  statement_id  = "AllowEventBridgeInvoke"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.bounce_counter_flush.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.bounce_counter_flush.arn
+}
+
+# ============================================================================
+# IAM - Handler and Flush Share the Bounce Handler Role
+# ============================================================================
+
+resource "aws_iam_role_policy" "bounce_counter_log" {
+  name = "ses-bounce-handler-counter-log-policy"
+  role = aws_iam_role.bounce_lambda_execution.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "S3CounterLogObjects"
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject",
+          "s3:DeleteObject"
+        ]
+        Resource = "${aws_s3_bucket.incoming_emails.arn}/bounce-counters/*"
+      },
+      {
+        Sid    = "S3ListCounterLog"
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket"
+        ]
+        Resource = aws_s3_bucket.incoming_emails.arn
+        Condition = {
+          StringLike = {
+            "s3:prefix" = "bounce-counters/*"
+          }
+        }
+      }
+    ]
+  })
+}
@@ -26,6 +26,26 @@ resource "aws_sns_topic" "ses_complaints" {
 # Lambda Function for Bounce and Complaint Handling
 # ============================================================================
 
+# Shared by the bounce handler and the counter flush function
+locals {
+  bounce_handler_environment = {
+    AIRTABLE_SECRET_NAME  = var.airtable_secret_name
+    ENVIRONMENT           = var.environment
+    LOG_LEVEL             = var.log_level
+    LOG_EVENT_SAMPLE_RATE = var.log_event_sample_rate
+    COUNTER_LOG           = "s3"
+    COUNTER_LOG_BUCKET    = aws_s3_bucket.incoming_emails.id
+    COUNTER_LOG_PREFIX    = "bounce-counters/"
+    SUPPRESSION_SET       = "s3"
+    SUPPRESSION_BUCKET    = aws_s3_bucket.incoming_emails.id
+
+    # Reload the email -> record id cache hourly so status updates skip the
+    # lookup; each reload reads at most 10 pages (1000 records)
+    RECORD_CACHE_SEED_SECONDS   = "3600"
+    RECORD_CACHE_SEED_MAX_PAGES = "10"
+  }
+}
+
 resource "aws_lambda_function" "bounce_handler" {
   filename         = data.archive_file.bounce_lambda_zip.output_path
   function_name    = "ses-bounce-handler"
@@ -37,14 +57,14 @@ resource "aws_lambda_function" "bounce_handler" {
   memory_size      = 256
   architectures    = ["arm64"]
 
-  # Sentry layer for error monitoring
-  layers = ["arn:aws:lambda:us-east-1:943013980633:layer:SentryPythonServerlessSDK:188"]
+  # Sentry layer for error monitoring, shared layer for the Airtable client
+  layers = [
+    "arn:aws:lambda:us-east-1:943013980633:layer:SentryPythonServerlessSDK:188",
+    aws_lambda_layer_version.shared.arn
+  ]
 
   environment {
-    variables = {
-      AIRTABLE_SECRET_NAME = var.airtable_secret_name
-      ENVIRONMENT          = var.environment
-    }
+    variables = local.bounce_handler_environment
   }
 
   depends_on = [
@@ -134,39 +154,23 @@ resource "aws_iam_role_policy_attachment" "bounce_lambda_basic_execution" {
 }
 
 # ============================================================================
-# SNS Subscriptions - Connect SNS Topics to Lambda
-# ============================================================================
-
-resource "aws_sns_topic_subscription" "bounces_to_lambda" {
-  topic_arn = aws_sns_topic.ses_bounces.arn
-  protocol  = "lambda"
-  endpoint  = aws_lambda_function.bounce_handler.arn
-}
-
-resource "aws_sns_topic_subscription" "complaints_to_lambda" {
-  topic_arn = aws_sns_topic.ses_complaints.arn
-  protocol  = "lambda"
-  endpoint  = aws_lambda_function.bounce_handler.arn
-}
-
-# ============================================================================
-# Lambda Permissions - Allow SNS to Invoke Lambda
+# SNS Subscriptions - Buffer Notifications in the SQS Notification Queue
 # ============================================================================
-
-resource "aws_lambda_permission" "sns_bounces_invoke" {
-  statement_id  = "AllowSNSBouncesInvoke"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.bounce_handler.function_name
-  principal     = "sns.amazonaws.com"
-  source_arn    = aws_sns_topic.ses_bounces.arn
+# The handler reads the queue in batches (see bounce_queue.tf) instead of
+# being invoked once per notification by SNS.
+
+resource "aws_sns_topic_subscription" "bounces_to_queue" {
+  topic_arn            = aws_sns_topic.ses_bounces.arn
+  protocol             = "sqs"
+  endpoint             = aws_sqs_queue.bounce_notifications.arn
+  raw_message_delivery = true
 }
 
-resource "aws_lambda_permission" "sns_complaints_invoke" {
-  statement_id  = "AllowSNSComplaintsInvoke"
-  action        = "lambda:InvokeFunction"
-  function_name = aws_lambda_function.bounce_handler.function_name
-  principal     = "sns.amazonaws.com"
-  source_arn    = aws_sns_topic.ses_complaints.arn
+resource "aws_sns_topic_subscription" "complaints_to_queue" {
+  topic_arn            = aws_sns_topic.ses_complaints.arn
+  protocol             = "sqs"
+  endpoint             = aws_sqs_queue.bounce_notifications.arn
+  raw_message_delivery = true
 }
 
 # ============================================================================
@@ -0,0 +1,102 @@
+# ============================================================================
+# SQS Queue Buffering Bounce and Complaint Notifications
+# ============================================================================
+# Both SNS topics deliver into this queue; the bounce handler receives it in
+# large batches, so many notifications share one Airtable lookup and write,
+# and the event source mapping's maximum concurrency caps how many
+# invocations call Airtable at once.
+
+resource "aws_sqs_queue" "bounce_notifications" {
+  name                       = "ses-bounce-notifications"
+  visibility_timeout_seconds = 180 # 6x the bounce handler timeout
+  message_retention_seconds  = 345600
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.bounce_notifications_dlq.arn
+    maxReceiveCount     = 5
+  })
+
+  tags = {
+    Name        = "SES Bounce Notifications"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+# Notifications the handler could not parse or write after repeated deliveries
+resource "aws_sqs_queue" "bounce_notifications_dlq" {
+  name                      = "ses-bounce-notifications-dlq"
+  message_retention_seconds = 1209600
+
+  tags = {
+    Name        = "SES Bounce Notifications DLQ"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+resource "aws_sqs_queue_policy" "bounce_notifications" {
+  queue_url = aws_sqs_queue.bounce_notifications.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "AllowSNSTopics"
+        Effect = "Allow"
+        Principal = {
+          Service = "sns.amazonaws.com"
+        }
+        Action   = "sqs:SendMessage"
+        Resource = aws_sqs_queue.bounce_notifications.arn
+        Condition = {
+          ArnEquals = {
+            "aws:SourceArn" = [
+              aws_sns_topic.ses_bounces.arn,
+              aws_sns_topic.ses_complaints.arn
+            ]
+          }
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_lambda_event_source_mapping" "bounce_notifications" {
+  event_source_arn                   = aws_sqs_queue.bounce_notifications.arn
+  function_name                      = aws_lambda_function.bounce_handler.arn
+  batch_size                         = var.bounce_batch_size
+  maximum_batching_window_in_seconds = var.bounce_batching_window_seconds
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  scaling_config {
+    maximum_concurrency = var.bounce_max_concurrency
+  }
+
+  depends_on = [aws_iam_role_policy.bounce_notification_queue]
+}
+
+# ============================================================================
+# IAM - Bounce Handler Reads the Notification Queue
+# ============================================================================
+
+resource "aws_iam_role_policy" "bounce_notification_queue" {
+  name = "ses-bounce-handler-notification-queue-policy"
+  role = aws_iam_role.bounce_lambda_execution.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "SQSReceiveNotifications"
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.bounce_notifications.arn
+      }
+    ]
+  })
+}
@@ -7,6 +7,8 @@ data "archive_file" "lambda_zip" {
   excludes = [
     "tests",
     "tests/*",
+    "benchmarks",
+    "benchmarks/*",
     "README.md",
     "__pycache__",
     "__pycache__/*",
@@ -24,6 +26,26 @@ data "archive_file" "lambda_zip" {
   ]
 }
 
+# Package code shared by both Lambda functions as a layer (python/ is added to sys.path)
+data "archive_file" "shared_layer_zip" {
+  type        = "zip"
+  source_dir  = "${path.module}/../../lambda/shared"
+  output_path = "${path.module}/shared_layer.zip"
+
+  excludes = [
+    "tests",
+    "tests/*",
+    "README.md",
+    "__pycache__",
+    "__pycache__/*",
+    "python/__pycache__",
+    "python/__pycache__/*",
+    "*.pyc",
+    ".pytest_cache",
+    ".pytest_cache/*"
+  ]
+}
+
 # Reference Secrets Manager secret (in us-east-2)
 # Note: We construct the ARN manually since the secret is in a different region
 # Lambda in us-east-1 can access secrets in us-east-2 cross-region
@@ -9,7 +9,8 @@ resource "aws_s3_bucket" "incoming_emails" {
   }
 }
 
-# S3 Bucket lifecycle rule - delete emails after 7 days
+# S3 Bucket lifecycle rule - delete emails (and forward-ledger markers, unflushed bounce counters) after 7 days;
+# the bounce counter flush republishes the suppression set daily so it never expires
 resource "aws_s3_bucket_lifecycle_configuration" "incoming_emails" {
   bucket = aws_s3_bucket.incoming_emails.id
 
@@ -101,6 +102,35 @@ resource "aws_iam_role_policy" "lambda_execution" {
         ]
         Resource = "${aws_s3_bucket.incoming_emails.arn}/*"
       },
+      {
+        Sid    = "S3PutAliasSnapshot"
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject"
+        ]
+        Resource = "${aws_s3_bucket.incoming_emails.arn}/alias-index/*"
+      },
+      {
+        Sid    = "S3PutForwardLedger"
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject"
+        ]
+        Resource = "${aws_s3_bucket.incoming_emails.arn}/forward-ledger/*"
+      },
+      {
+        Sid    = "S3ListForwardLedger"
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket"
+        ]
+        Resource = aws_s3_bucket.incoming_emails.arn
+        Condition = {
+          StringLike = {
+            "s3:prefix" = "forward-ledger/*"
+          }
+        }
+      },
       {
         Sid    = "SESSendRawEmail"
         Effect = "Allow"
@@ -149,6 +179,36 @@ resource "aws_cloudwatch_log_group" "lambda" {
   }
 }
 
+# Lambda Layer - code shared by the forwarder and bounce handler
+resource "aws_lambda_layer_version" "shared" {
+  layer_name               = "ses-email-shared"
+  description              = "Shared Airtable client for the SES email Lambda functions"
+  filename                 = data.archive_file.shared_layer_zip.output_path
+  source_code_hash         = data.archive_file.shared_layer_zip.output_base64sha256
+  compatible_runtimes      = ["python3.12"]
+  compatible_architectures = ["arm64"]
+}
+
+# Environment shared by the forwarder and the retry queue drain (retry_queue.tf)
+locals {
+  forwarder_environment = {
+    EMAIL_BUCKET          = aws_s3_bucket.incoming_emails.id
+    AIRTABLE_SECRET_NAME  = var.airtable_secret_name
+    FORWARD_FROM_EMAIL    = var.forward_from_email
+    AWS_SES_REGION        = "us-east-1"
+    ENVIRONMENT           = var.environment
+    LOG_LEVEL             = var.log_level
+    LOG_EVENT_SAMPLE_RATE = var.log_event_sample_rate
+    FORWARD_LEDGER        = "s3"
+    VERDICT_POLICY        = var.verdict_policy
+    ALIAS_DOMAINS         = var.domain
+    RETRY_QUEUE           = "sqs"
+    RETRY_QUEUE_URL       = aws_sqs_queue.forward_retries.url
+    RETRY_MAX_ATTEMPTS    = var.forward_retry_max_attempts
+    SUPPRESSION_SET       = "s3"
+  }
+}
+
 # Lambda Function
 resource "aws_lambda_function" "ses_email_forwarder" {
   filename         = data.archive_file.lambda_zip.output_path
@@ -160,16 +220,13 @@ resource "aws_lambda_function" "ses_email_forwarder" {
   timeout          = 30
   memory_size      = 256
   architectures    = ["arm64"]
-  layers           = ["arn:aws:lambda:us-east-1:943013980633:layer:SentryPythonServerlessSDK:188"]
+  layers = [
+    "arn:aws:lambda:us-east-1:943013980633:layer:SentryPythonServerlessSDK:188",
+    aws_lambda_layer_version.shared.arn
+  ]
 
   environment {
-    variables = {
-      EMAIL_BUCKET         = aws_s3_bucket.incoming_emails.id
-      AIRTABLE_SECRET_NAME = var.airtable_secret_name
-      FORWARD_FROM_EMAIL   = var.forward_from_email
-      AWS_SES_REGION       = "us-east-1"
-      ENVIRONMENT          = var.environment
-    }
+    variables = local.forwarder_environment
   }
 
   depends_on = [
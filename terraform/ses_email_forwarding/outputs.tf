@@ -63,3 +63,25 @@ output "mail_from_spf_record" {
   description = "SPF TXT record value for the custom MAIL FROM domain (add this to DNS)"
   value       = "v=spf1 include:amazonses.com ~all"
 }
+
+# Retry queue outputs
+output "forward_retry_queue_url" {
+  description = "URL of the SQS queue holding failed forwards"
+  value       = aws_sqs_queue.forward_retries.url
+}
+
+output "forward_retry_dlq_arn" {
+  description = "ARN of the dead-letter queue for retry records the drain could not process"
+  value       = aws_sqs_queue.forward_retries_dlq.arn
+}
+
+# Bounce notification queue outputs
+output "bounce_notification_queue_url" {
+  description = "URL of the SQS queue buffering bounce and complaint notifications"
+  value       = aws_sqs_queue.bounce_notifications.url
+}
+
+output "bounce_notification_dlq_arn" {
+  description = "ARN of the dead-letter queue for notifications the bounce handler could not process"
+  value       = aws_sqs_queue.bounce_notifications_dlq.arn
+}
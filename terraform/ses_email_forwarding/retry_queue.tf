@@ -0,0 +1,123 @@
+# ============================================================================
+# SQS Retry Queue for Failed Forwards
+# ============================================================================
+# The forwarder puts sends that failed on this queue instead of failing the
+# whole invocation; the drain function below re-processes them in batches.
+
+resource "aws_sqs_queue" "forward_retries" {
+  name                       = "ses-email-forward-retries"
+  visibility_timeout_seconds = 360 # 6x the drain function timeout
+  message_retention_seconds  = 345600
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.forward_retries_dlq.arn
+    maxReceiveCount     = 5
+  })
+
+  tags = {
+    Name        = "SES Email Forward Retries"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+# Records the drain could not process (malformed, or repeatedly failing to re-queue)
+resource "aws_sqs_queue" "forward_retries_dlq" {
+  name                      = "ses-email-forward-retries-dlq"
+  message_retention_seconds = 1209600
+
+  tags = {
+    Name        = "SES Email Forward Retries DLQ"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+# ============================================================================
+# Lambda Function Draining the Retry Queue
+# ============================================================================
+
+resource "aws_lambda_function" "forward_retry_drain" {
+  filename         = data.archive_file.lambda_zip.output_path
+  function_name    = "ses-email-forward-retry-drain"
+  role             = aws_iam_role.lambda_execution.arn
+  handler          = "handler.drain_retry_queue"
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+  runtime          = "python3.12"
+  timeout          = 60
+  memory_size      = 256
+  architectures    = ["arm64"]
+  layers = [
+    "arn:aws:lambda:us-east-1:943013980633:layer:SentryPythonServerlessSDK:188",
+    aws_lambda_layer_version.shared.arn
+  ]
+
+  environment {
+    variables = local.forwarder_environment
+  }
+
+  depends_on = [
+    aws_cloudwatch_log_group.forward_retry_drain,
+    aws_iam_role_policy_attachment.lambda_basic_execution,
+    aws_iam_role_policy.lambda_execution,
+    aws_iam_role_policy.lambda_retry_queue
+  ]
+
+  tags = {
+    Name        = "SES Email Forward Retry Drain"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+resource "aws_cloudwatch_log_group" "forward_retry_drain" {
+  name              = "/aws/lambda/ses-email-forward-retry-drain"
+  retention_in_days = 14
+
+  tags = {
+    Name        = "SES Email Forward Retry Drain Lambda Logs"
+    Environment = var.environment
+    ManagedBy   = "Terraform"
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "forward_retries" {
+  event_source_arn                   = aws_sqs_queue.forward_retries.arn
+  function_name                      = aws_lambda_function.forward_retry_drain.arn
+  batch_size                         = 10
+  maximum_batching_window_in_seconds = 30
+  function_response_types            = ["ReportBatchItemFailures"]
+}
+
+# ============================================================================
+# IAM - Forwarder and Drain Share the Forwarder Role
+# ============================================================================
+
+resource "aws_iam_role_policy" "lambda_retry_queue" {
+  name = "ses-email-forwarder-retry-queue-policy"
+  role = aws_iam_role.lambda_execution.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "SQSSendRetries"
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage"
+        ]
+        Resource = aws_sqs_queue.forward_retries.arn
+      },
+      {
+        Sid    = "SQSReceiveRetries"
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.forward_retries.arn
+      }
+    ]
+  })
+}
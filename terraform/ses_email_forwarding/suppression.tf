@@ -0,0 +1,43 @@
+# ============================================================================
+# Suppression Set - Published by the Bounce Handler, Read by the Forwarder
+# ============================================================================
+# The bounce handler adds the addresses it disables to
+# suppression/addresses.json.gz in the email bucket, and the counter flush
+# rebuilds it from Airtable. The forwarder reads it with its existing
+# s3:GetObject permission.
+
+resource "aws_iam_role_policy" "bounce_suppression_set" {
+  name = "ses-bounce-handler-suppression-set-policy"
+  role = aws_iam_role.bounce_lambda_execution.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "S3SuppressionSet"
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject"
+        ]
+        Resource = "${aws_s3_bucket.incoming_emails.arn}/suppression/*"
+      },
+      {
+        # Without ListBucket a missing object is reported as 403 instead of
+        # 404, and the first publish could never tell it is the first. Only
+        # the suppression prefix can be listed, not the stored emails.
+        Sid    = "S3ListBucketForMissingKeys"
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket"
+        ]
+        Resource = aws_s3_bucket.incoming_emails.arn
+        Condition = {
+          StringLike = {
+            "s3:prefix" = "suppression/*"
+          }
+        }
+      }
+    ]
+  })
+}
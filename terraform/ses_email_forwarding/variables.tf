@@ -22,3 +22,51 @@ variable "airtable_secret_name" {
   description = "Name of secret in Secrets Manager containing Airtable credentials"
   type        = string
 }
+
+variable "log_level" {
+  description = "Log level for both Lambda functions (DEBUG/INFO/WARNING/ERROR)"
+  type        = string
+  default     = "INFO"
+}
+
+variable "log_event_sample_rate" {
+  description = "Fraction of invocations whose full event is logged (addresses redacted)"
+  type        = number
+  default     = 0.01
+}
+
+variable "forward_retry_max_attempts" {
+  description = "Attempts per failed forward (including the first) before the retry queue drain gives up"
+  type        = number
+  default     = 5
+}
+
+variable "verdict_policy" {
+  description = "Action (allow/tag/drop) per failed SES receipt verdict, e.g. \"virus=drop,spam=drop,dmarc=tag\""
+  type        = string
+  default     = "virus=drop,spam=drop,spf=allow,dkim=allow,dmarc=allow"
+}
+
+variable "bounce_counter_flush_schedule" {
+  description = "EventBridge schedule for folding buffered bounce/complaint counters into Airtable"
+  type        = string
+  default     = "rate(15 minutes)"
+}
+
+variable "bounce_batch_size" {
+  description = "Bounce/complaint notifications per bounce handler invocation"
+  type        = number
+  default     = 100
+}
+
+variable "bounce_batching_window_seconds" {
+  description = "Seconds the notification queue gathers a batch before invoking the bounce handler"
+  type        = number
+  default     = 30
+}
+
+variable "bounce_max_concurrency" {
+  description = "Maximum concurrent bounce handler invocations reading the notification queue (minimum 2)"
+  type        = number
+  default     = 2
+}